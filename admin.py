@@ -1,28 +1,41 @@
 # admin.py
 import logging
 import asyncio
-import csv
-from flask import Flask, render_template, redirect, url_for, request
-from flask_basicauth import BasicAuth
-from tg_bot import bot, ADMIN_CHAT_IDS, CSV_FILE, bot_loop  # loop бота
+import hashlib
+import hmac
+import datetime
+import json
+import re
+from typing import Optional, Set
+
+from aiohttp import BasicAuth, web
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+import config
+from tg_bot import bot, ADMIN_CHAT_IDS, webhook_server
+from storage import store, writer, FIELDS, FIELDNAMES, STATUS_FILTERS, SORTS
+from export import csv_chunks, xlsx_chunks
+from registration_index import registration_index
+from proxy_manager import proxy_manager
+from session_store import session_store
+from loop_monitor import loop_monitor
+from outbox import outbound_limiter, send_in_lane, Lane
 
 # ---------------- ЛОГИ ----------------
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# ---------------- FLASK ----------------
-app = Flask(__name__)
-app.config['BASIC_AUTH_USERNAME'] = 'admin'
-app.config['BASIC_AUTH_PASSWORD'] = 'admin'
-app.config['BASIC_AUTH_FORCE'] = True
-basic_auth = BasicAuth(app)
+# ---------------- НАСТРОЙКИ ----------------
+ADMIN_USERNAME = getattr(config, "ADMIN_USERNAME", "admin")
+ADMIN_PASSWORD = getattr(config, "ADMIN_PASSWORD", "admin")
+ADMIN_HOST = getattr(config, "ADMIN_HOST", "0.0.0.0")
+ADMIN_PORT = getattr(config, "ADMIN_PORT", 5002)
 
 # ---------------- КОНСТАНТЫ ----------------
-FIELDNAMES = [
-    "ПІБ", "Телефон", "Instagram", "TikTok", "YouTube Shorts",
-    "Підписники / Перегляди", "Ідея", "Telegram username",
-    "Дата", "Статус", "chat_id",
-]
+PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+SSE_HEARTBEAT = 15  # сек: комментарий в SSE-поток, чтобы прокси не рвали соединение
+MAX_BULK_ITEMS = 500
 
 ACCEPT_TEXT = (
     "✅Ваша заявка на участь у розіграші прийнята! \n\n"
@@ -42,107 +55,458 @@ REJECT_REASONS = {
     "4": "❌ Ваша заявка відхилена\nМаксимальна кількість учасників досягнута. Дякуємо, що ви є частиною Proove Gaming👾",
 }
 
+routes = web.RouteTableDef()
+
+# ---------------- АВТОРИЗАЦИЯ ----------------
+@web.middleware
+async def basic_auth(request: web.Request, handler):
+    header = request.headers.get("Authorization", "")
+    try:
+        auth = BasicAuth.decode(header) if header else None
+    except ValueError:
+        auth = None
+    if auth is None or not (hmac.compare_digest(auth.login, ADMIN_USERNAME)
+                            and hmac.compare_digest(auth.password, ADMIN_PASSWORD)):
+        raise web.HTTPUnauthorized(headers={"WWW-Authenticate": 'Basic realm="admin"'})
+    request["admin_user"] = auth.login
+    return await handler(request)
+
+# ---------------- ШАБЛОНЫ ----------------
+templates = Environment(loader=FileSystemLoader("templates"), autoescape=select_autoescape(["html"]))
+
+def url_for(name: str, **params) -> str:
+    """Как во Flask: параметры пути подставляются в маршрут, остальные уходят в query string."""
+    resource = app.router[name]
+    info = resource.get_info()
+    path_keys = set(re.findall(r"\{(\w+)", info.get("formatter", "")))
+    url = resource.url_for(**{k: str(v) for k, v in params.items() if k in path_keys})
+    query = {k: str(v) for k, v in params.items() if k not in path_keys}
+    return str(url.with_query(query) if query else url)
+
+templates.globals["url_for"] = url_for
+
+def render(template: str, **context) -> web.Response:
+    return web.Response(text=templates.get_template(template).render(**context), content_type="text/html")
+
 # ---------------- ВСПОМОГАТЕЛЬНЫЕ ----------------
-def read_csv():
-    with open(CSV_FILE, "r", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
-
-def write_csv(rows):
-    with open(CSV_FILE, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
-        writer.writeheader()
-        writer.writerows(rows)
-
-def send_async_message(chat_id: int, text: str):
-    """Отправка сообщений через Aiogram из синхронного Flask."""
+async def notify(chat_id: int, text: str, lane: Lane = Lane.NOTICE) -> bool:
+    """Отправка сообщения пользователю; False — не доставлено (ошибка уже в логе)."""
     try:
-        asyncio.run_coroutine_threadsafe(bot.send_message(chat_id, text), bot_loop)
+        await send_in_lane(bot, lane, chat_id, text)
+        return True
     except Exception as e:
         logger.error(f"Не удалось отправить сообщение пользователю {chat_id}: {e}")
+        return False
 
-def update_status_and_notify(chat_id: str, status: str, reason_key: str = None):
-    """Обновление статуса заявки и отправка сообщений пользователю."""
-    rows = read_csv()
-    updated = False
+# фоновые рассылки (массовые решения): держим ссылки, on_shutdown их дожидается
+_notify_tasks: Set[asyncio.Task] = set()
 
-    for row in rows:
-        if str(row.get("chat_id")) == str(chat_id):
-            if status == "Відхилено" and reason_key:
-                row["Статус"] = f"Відхилено ({reason_key})"
-            else:
-                row["Статус"] = status
-            updated = True
+async def notify_many(chat_ids, text: str, label: str):
+    """Разослать text пачкой через outbox (он и ограничивает скорость); ошибки не прерывают рассылку."""
+    results = await asyncio.gather(*(notify(chat_id, text) for chat_id in chat_ids), return_exceptions=True)
+    failed = [chat_id for chat_id, ok in zip(chat_ids, results) if ok is not True]
+    logger.info(f"{label}: уведомлено {len(chat_ids) - len(failed)} из {len(chat_ids)}"
+                + (f", не доставлено: {failed}" if failed else ""))
 
-    if not updated:
-        logger.warning(f"⚠ Заявка с chat_id={chat_id} не найдена")
-        return
+def notify_in_background(chat_ids, text: str, label: str):
+    task = asyncio.create_task(notify_many(chat_ids, text, label))
+    _notify_tasks.add(task)
+    task.add_done_callback(_notify_tasks.discard)
 
-    write_csv(rows)
+async def notify_admins(text: str):
+    await asyncio.gather(*(notify(admin, text, Lane.ADMIN) for admin in ADMIN_CHAT_IDS))
 
-    # Отправка уведомления пользователю
+def full_status(status: str, reason_key: str = None) -> str:
+    if status == "Відхилено" and reason_key:
+        return f"Відхилено ({reason_key})"
+    return status
+
+def decision_text(status: str, reason_key: str = None) -> str:
+    """Текст уведомления пользователю о решении модератора."""
     if status == "Прийнято":
-        send_async_message(int(chat_id), ACCEPT_TEXT)
-    elif status == "Відхилено":
-        send_async_message(int(chat_id), REJECT_REASONS.get(reason_key, "❌ Ваша заявка відхилена."))
+        return ACCEPT_TEXT
+    return REJECT_REASONS.get(reason_key, "❌ Ваша заявка відхилена.")
 
-# ---------------- ROUTES ----------------
-@app.route("/")
-@basic_auth.required
-def index():
-    return render_template("admin_table.html", rows=read_csv())
-
-@app.route("/action/<chat_id>/<action>", methods=["POST"])
-@basic_auth.required
-def action(chat_id, action):
+def current_moderator(request: web.Request) -> str:
+    return f"admin-panel:{request['admin_user']}"
+
+async def update_status_and_notify(request: web.Request, chat_id: int, status: str,
+                                   reason_key: str = None) -> Optional[bool]:
+    """Обновление статуса и уведомление пользователя. None — заявка не найдена, иначе — доставлено ли."""
+    if not await writer.submit("update_status", chat_id, full_status(status, reason_key),
+                               reason_key=reason_key, moderator=current_moderator(request)):
+        logger.warning(f"⚠ Заявка с chat_id={chat_id} не найдена")
+        return None
+    return await notify(chat_id, decision_text(status, reason_key))
+
+async def apply_action(request: web.Request, chat_id: int, action: str) -> Optional[bool]:
+    """accept / reject_<причина>; None — неизвестное действие или заявка не найдена."""
     if action == "accept":
-        update_status_and_notify(chat_id, "Прийнято")
-    elif action.startswith("reject_"):
+        return await update_status_and_notify(request, chat_id, "Прийнято")
+    if action.startswith("reject_"):
         reason_key = action.split("_", 1)[1]
-        update_status_and_notify(chat_id, "Відхилено", reason_key)
-    return redirect(url_for('index'))
-
-@app.route("/delete/<chat_id>", methods=["POST"])
-@basic_auth.required
-def delete(chat_id):
-    rows = read_csv()
-    target = next((r for r in rows if str(r["chat_id"]) == str(chat_id)), None)
+        return await update_status_and_notify(request, chat_id, "Відхилено", reason_key)
+    return None
+
+async def delete_application(chat_id: int) -> Optional[dict]:
+    """Удалить заявки пользователя и сообщить админам; возвращает удалённую заявку или None."""
+    target = await writer.submit("delete", chat_id)
+    registration_index.remove_chat(chat_id)
     if target:
-        notify_admin = (
+        await notify_admins(
             f"🗑 Заявку видалено через адмін-панель:\n"
             f"👤 {target.get('ПІБ', '')}\n"
             f"@{target.get('Telegram username', '')} ({chat_id})\n"
             f"Статус: {target.get('Статус', '')}"
         )
-        for admin in ADMIN_CHAT_IDS:
-            send_async_message(admin, notify_admin)
+    return target
+
+def to_api(row: dict) -> dict:
+    """Заявка для JSON API: ключи — имена колонок, а не заголовки CSV."""
+    return {column: row[title] for title, column in FIELDS}
+
+async def changes_to_api(changes: list) -> list:
+    """Изменения ленты с текущими заявками; заявки читаются одним запросом на всю пачку."""
+    items = await store.aio.get_many([c["chat_id"] for c in changes if c["chat_id"] is not None])
+    return [{**c, "item": to_api(items[c["chat_id"]]) if c["chat_id"] in items else None} for c in changes]
+
+def int_arg(request: web.Request, name: str, default=None):
+    try:
+        return int(request.query[name])
+    except (KeyError, ValueError):
+        return default
+
+def list_params(request: web.Request) -> dict:
+    """Параметры страницы из query string (неизвестные значения отбрасываются)."""
+    args = request.query
+    limit = min(max(int_arg(request, "limit", PAGE_LIMIT), 1), MAX_PAGE_LIMIT)
+    page = max(int_arg(request, "page", 1), 1)
+
+    def day(name):
+        value = args.get(name, "")
+        try:
+            return datetime.date.fromisoformat(value).isoformat()
+        except ValueError:
+            return ""
+
+    return {
+        "status": args.get("status") if args.get("status") in STATUS_FILTERS else "",
+        "date_from": day("date_from"),
+        "date_to": day("date_to"),
+        "sort": args.get("sort") if args.get("sort") in SORTS else "id",
+        "order": "asc" if args.get("order") == "asc" else "desc",
+        "limit": limit,
+        "page": page,
+    }
+
+def query_args(request: web.Request) -> dict:
+    """Текущий query string — чтобы после действий вернуться на ту же страницу."""
+    return dict(request.query)
+
+async def query_page(params: dict):
+    return await store.aio.query(
+        status=params["status"] or None, date_from=params["date_from"] or None,
+        date_to=params["date_to"] or None, sort=params["sort"], order=params["order"],
+        limit=params["limit"], offset=(params["page"] - 1) * params["limit"],
+    )
+
+def chat_id_of(request: web.Request) -> int:
+    try:
+        return int(request.match_info["chat_id"])
+    except ValueError:
+        raise web.HTTPNotFound()
+
+# ---------------- ROUTES ----------------
+@routes.get("/", name="index")
+async def index(request: web.Request):
+    params = list_params(request)
+    version, modified_at = await store.aio.version()
+    etag = hashlib.sha1(f"{version}|{sorted(params.items())}".encode()).hexdigest()
+    last_modified = datetime.datetime.fromtimestamp(int(modified_at), datetime.timezone.utc)
+
+    # страница не менялась — не читаем базу и не рендерим шаблон
+    if_none_match = request.if_none_match
+    if_modified_since = request.if_modified_since
+    if (if_none_match and any(e.value in (etag, "*") for e in if_none_match)) or (
+            not if_none_match and if_modified_since and if_modified_since >= last_modified):
+        resp = web.Response(status=304)
+    else:
+        rows, total = await query_page(params)
+        pages = max(1, -(-total // params["limit"]))
+        resp = render(
+            "admin_table.html", rows=rows, total=total, pages=pages, params=params,
+            query=query_args(request), cursor=version,
+        )
+    resp.etag = etag
+    resp.last_modified = last_modified
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
 
-        # Удаление заявки из CSV
-        rows = [r for r in rows if str(r["chat_id"]) != str(chat_id)]
-        write_csv(rows)
+@routes.post("/action/{chat_id}/{action}", name="action")
+async def action(request: web.Request):
+    await apply_action(request, chat_id_of(request), request.match_info["action"])
+    raise web.HTTPFound(url_for("index", **query_args(request)))
 
-    return redirect(url_for('index'))
+@routes.post("/delete/{chat_id}", name="delete")
+async def delete(request: web.Request):
+    await delete_application(chat_id_of(request))
+    raise web.HTTPFound(url_for("index", **query_args(request)))
 
-@app.route("/delete_all", methods=["POST"])
-@basic_auth.required
-def delete_all():
-    rows = read_csv()
-    count = len(rows)
+@routes.post("/delete_all", name="delete_all")
+async def delete_all(request: web.Request):
+    count, last = await writer.submit("delete_all")
+    registration_index.clear()
     if count > 0:
-        text_admin_message = (
+        await notify_admins(
             f"🔥 Всі заявки ({count}) були видалені через адмін-панель!\n"
             f"Останній запис:\n"
-            f"👤 {rows[-1].get('ПІБ', '')}\n"
-            f"@{rows[-1].get('Telegram username', '')} ({rows[-1].get('chat_id', '')})"
+            f"👤 {last.get('ПІБ', '')}\n"
+            f"@{last.get('Telegram username', '')} ({last.get('chat_id', '')})"
         )
-        for admin in ADMIN_CHAT_IDS:
-            send_async_message(admin, text_admin_message)
+    raise web.HTTPFound(url_for("index"))
+
+# ---------------- JSON API ----------------
+@routes.get("/api/applications", name="api_applications")
+async def api_applications(request: web.Request):
+    params = list_params(request)
+    # курсор берём до чтения: изменения, пришедшие во время запроса, клиент получит из ленты
+    cursor, _ = await store.aio.version()
+    rows, total = await query_page(params)
+    return web.json_response({
+        "items": [to_api(r) for r in rows],
+        "total": total,
+        "page": params["page"],
+        "pages": max(1, -(-total // params["limit"])),
+        "cursor": cursor,
+    })
+
+@routes.get("/api/applications/{chat_id}", name="api_application")
+async def api_application(request: web.Request):
+    row = await store.aio.get(chat_id_of(request))
+    if row is None:
+        return web.json_response({"error": "not found"}, status=404)
+    return web.json_response(to_api(row))
+
+@routes.post("/api/applications/{chat_id}/{action}", name="api_action")
+async def api_action(request: web.Request):
+    chat_id = chat_id_of(request)
+    notified = await apply_action(request, chat_id, request.match_info["action"])
+    if notified is None:
+        return web.json_response({"error": "not found or unknown action"}, status=404)
+    return web.json_response({**to_api(await store.aio.get(chat_id)), "notified": notified})
+
+@routes.delete("/api/applications/{chat_id}", name="api_delete")
+async def api_delete(request: web.Request):
+    chat_id = chat_id_of(request)
+    if not await delete_application(chat_id):
+        return web.json_response({"error": "not found"}, status=404)
+    return web.json_response({"deleted": chat_id})
+
+@routes.post("/api/bulk", name="api_bulk")
+async def api_bulk(request: web.Request):
+    """
+    Массовое решение: {"chat_ids": [...], "action": "accept" | "reject", "reason_key": "1"}.
+    Все статусы пишутся одной транзакцией, ответ уходит сразу после коммита; уведомления
+    рассылаются в фоне одной пачкой с ограничением скорости ("notification": "queued").
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict):
+        body = {}
+    action = body.get("action")
+    reason_key = str(body.get("reason_key") or "") or None
+    if action == "accept":
+        status, reason_key = "Прийнято", None
+    elif action == "reject" and reason_key in REJECT_REASONS:
+        status = "Відхилено"
+    else:
+        return web.json_response({"error": "action must be accept or reject with a known reason_key"}, status=400)
+
+    chat_ids, results = [], []
+    for raw in body.get("chat_ids") or []:
+        try:
+            chat_id = int(raw)
+        except (TypeError, ValueError):
+            results.append({"chat_id": raw, "ok": False, "error": "invalid chat_id"})
+            continue
+        if chat_id not in chat_ids:
+            chat_ids.append(chat_id)
+    if not chat_ids and not results:
+        return web.json_response({"error": "chat_ids is empty"}, status=400)
+    if len(chat_ids) > MAX_BULK_ITEMS:
+        return web.json_response({"error": f"at most {MAX_BULK_ITEMS} chat_ids per request"}, status=400)
+
+    new_status = full_status(status, reason_key)
+    counts = await writer.submit("update_statuses", chat_ids, new_status,
+                                 reason_key=reason_key, moderator=current_moderator(request)) if chat_ids else []
+    applied = [chat_id for chat_id, count in zip(chat_ids, counts) if count]
+    for chat_id, count in zip(chat_ids, counts):
+        if count:
+            results.append({"chat_id": chat_id, "ok": True, "status": new_status, "notification": "queued"})
+        else:
+            results.append({"chat_id": chat_id, "ok": False, "error": "not found"})
+    logger.info(f"Массовое решение «{new_status}»: {len(applied)} из {len(results)} заявок")
+    if applied:
+        notify_in_background(applied, decision_text(status, reason_key), f"Массовое решение «{new_status}»")
+    return web.json_response({"applied": len(applied), "results": results})
+
+@routes.get("/api/changes", name="api_changes")
+async def api_changes(request: web.Request):
+    """Лента изменений после курсора since; reset=true — курсор устарел, перечитайте список."""
+    since = int_arg(request, "since", 0)
+    changes = await store.aio.changes(since)
+    reset = bool(changes) and since > 0 and changes[0]["seq"] != since + 1
+    return web.json_response({
+        "changes": await changes_to_api(changes),
+        "cursor": changes[-1]["seq"] if changes else since,
+        "reset": reset,
+    })
+
+# ожидающие SSE-потоки; будятся из потока писателя после коммита
+_change_waiters: Set[asyncio.Future] = set()
+_closing = False
+
+def _wake_change_waiters():
+    for future in _change_waiters:
+        if not future.done():
+            future.set_result(None)
+    _change_waiters.clear()
+
+async def wait_for_change(generation: int, timeout: float) -> int:
+    """Ждать коммита после generation; возвращает новый generation (тот же — по таймауту)."""
+    if store.generation == generation:
+        future = asyncio.get_running_loop().create_future()
+        _change_waiters.add(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            _change_waiters.discard(future)
+    return store.generation
+
+@routes.get("/api/stream", name="api_stream")
+async def api_stream(request: web.Request):
+    """SSE: новые заявки и смены статуса по мере коммитов (id события = seq ленты)."""
+    try:
+        cursor = int(request.headers["Last-Event-ID"])
+    except (KeyError, ValueError):
+        cursor = int_arg(request, "since")
+    if cursor is None:
+        cursor, _ = await store.aio.version()
+
+    resp = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    await resp.prepare(request)
+    try:
+        while not _closing:
+            generation = store.generation
+            for change in await changes_to_api(await store.aio.changes(cursor)):
+                cursor = change["seq"]
+                data = json.dumps(change, ensure_ascii=False)
+                await resp.write(f"id: {cursor}\nevent: change\ndata: {data}\n\n".encode())
+            if await wait_for_change(generation, SSE_HEARTBEAT) == generation:
+                await resp.write(b": heartbeat\n\n")
+    except ConnectionResetError:
+        # клиент закрыл страницу; отмену (остановка сервера) не глотаем
+        pass
+    return resp
+
+async def stream_export(request: web.Request, chunks, content_type: str, ext: str) -> web.StreamResponse:
+    """Отдать выгрузку кусками; строки читаются из базы в потоке, loop не блокируется."""
+    filename = f"applications_{datetime.date.today().isoformat()}.{ext}"
+    resp = web.StreamResponse(headers={
+        "Content-Type": content_type,
+        "Content-Disposition": f"attachment; filename={filename}",
+    })
+    await resp.prepare(request)
+    try:
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            await resp.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        await resp.write_eof()
+    finally:
+        try:
+            chunks.close()
+        except ValueError:
+            # генератор ещё читается в потоке (клиент оборвал загрузку) — закроется сборщиком
+            pass
+    return resp
+
+def export_rows(request: web.Request):
+    """Заявки под фильтры таблицы (без пагинации) — потоком из базы."""
+    params = list_params(request)
+    return store.iter_query(
+        status=params["status"] or None, date_from=params["date_from"] or None,
+        date_to=params["date_to"] or None, sort=params["sort"], order=params["order"],
+    )
+
+@routes.get("/export.csv", name="export_csv")
+async def export_csv(request: web.Request):
+    return await stream_export(request, csv_chunks(export_rows(request), FIELDNAMES), "text/csv", "csv")
+
+@routes.get("/export.xlsx", name="export_xlsx")
+async def export_xlsx(request: web.Request):
+    return await stream_export(
+        request, xlsx_chunks(export_rows(request), FIELDNAMES),
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx",
+    )
 
-    # Очистка CSV
-    write_csv([])
+@routes.get("/history/{chat_id}", name="history")
+async def history(request: web.Request):
+    return web.json_response(await store.aio.history(chat_id_of(request)))
 
-    return redirect(url_for('index'))
+@routes.get("/stats/proxies", name="proxy_stats")
+async def proxy_stats(request: web.Request):
+    return web.json_response(proxy_manager.stats())
+
+@routes.get("/stats/sessions", name="session_stats")
+async def session_stats(request: web.Request):
+    return web.json_response(session_store.stats())
+
+@routes.get("/stats/outbox", name="outbox_stats")
+async def outbox_stats(request: web.Request):
+    return web.json_response(outbound_limiter.stats())
+
+@routes.get("/stats/loop", name="loop_stats")
+async def loop_stats(request: web.Request):
+    return web.json_response(loop_monitor.stats())
+
+@routes.get("/stats/webhook", name="webhook_stats")
+async def webhook_stats(request: web.Request):
+    return web.json_response(webhook_server.stats())
 
 # ---------------- ЗАПУСК ----------------
-def run_flask():
-    logger.info("🚀 Запуск Flask сервера...")
-    app.run(host="0.0.0.0", port=5002, debug=False, use_reloader=False)
+async def on_startup(app: web.Application):
+    loop = asyncio.get_running_loop()
+    # коммиты идут в потоке писателя — будим SSE-потоки через loop
+    store.add_listener(lambda: loop.call_soon_threadsafe(_wake_change_waiters))
+
+async def on_shutdown(app: web.Application):
+    # отпускаем SSE-потоки, иначе остановка ждёт их до таймаута
+    global _closing
+    _closing = True
+    _wake_change_waiters()
+    # рассылки массовых решений уже обещаны модератору — дожидаемся их
+    if _notify_tasks:
+        await asyncio.gather(*_notify_tasks, return_exceptions=True)
+
+app = web.Application(middlewares=[basic_auth])
+app.add_routes(routes)
+app.on_startup.append(on_startup)
+app.on_shutdown.append(on_shutdown)
+
+async def start_admin(host: str = ADMIN_HOST, port: int = ADMIN_PORT) -> web.AppRunner:
+    """Запустить админку на текущем loop (том же, что у бота); вернуть runner для остановки."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"🚀 Адмін-панель запущена на {host}:{port}")
+    return runner
@@ -0,0 +1,182 @@
+import asyncio
+import html
+import itertools
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Set, Tuple
+
+from aiogram.enums import ParseMode
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+import config
+from kbds.inline import admin_choices_kbd, DigestOpen, DigestPage
+from outbox import Lane, use_lane
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("admin_notify")
+
+# Режим уведомлений админов о новых заявках (можно переопределить в config.py):
+#   "single" — сообщение с кнопками на каждую заявку;
+#   "digest" — сводка раз в DIGEST_WINDOW сек или при DIGEST_MAX заявках;
+#   "auto"   — single, пока за окно пришло меньше DIGEST_AUTO_THRESHOLD заявок, иначе digest.
+NOTIFY_MODE = getattr(config, "ADMIN_NOTIFY_MODE", "single")
+DIGEST_WINDOW = getattr(config, "DIGEST_WINDOW", 60)
+DIGEST_MAX = getattr(config, "DIGEST_MAX", 20)
+DIGEST_AUTO_THRESHOLD = getattr(config, "DIGEST_AUTO_THRESHOLD", 3)
+DIGEST_PAGE_SIZE = getattr(config, "DIGEST_PAGE_SIZE", 5)
+DIGEST_KEEP = 100  # сколько последних сводок помнить для листания
+
+
+def application_card(row: dict) -> str:
+    """Полная карточка заявки для админа (HTML)."""
+    def v(key):
+        return html.escape(str(row.get(key, "")))
+
+    return (
+        f"📥 Нова заявка:\n\n"
+        f"👤 ПІБ: {v('ПІБ')}\n"
+        f"📱 Телефон: {v('Телефон')}\n"
+        f"📷 Instagram: {v('Instagram')}\n"
+        f"🎵 TikTok: {v('TikTok')}\n"
+        f"▶️ YouTube Shorts: {v('YouTube Shorts')}\n"
+        f"👥 Підписники / Перегляди: {v('Підписники / Перегляди')}\n"
+        f"💡 Ідея: {v('Ідея')}\n"
+        f"📅 Дата: {v('Дата')}\n"
+        f"👤 Telegram: @{v('Telegram username')}\n"
+        f"🧾 Статус: {v('Статус')}"
+    )
+
+
+class AdminNotifier:
+    """
+    Уведомления админов о новых заявках: по одной (single) или сводкой (digest).
+    Сводка — одно сообщение на админа со списком заявок и листаемой клавиатурой;
+    кнопка заявки открывает её полную карточку с кнопками модерации.
+    """
+
+    def __init__(self, bot, admins: List[int], mode: str = NOTIFY_MODE, window: float = DIGEST_WINDOW,
+                 max_items: int = DIGEST_MAX, auto_threshold: int = DIGEST_AUTO_THRESHOLD,
+                 page_size: int = DIGEST_PAGE_SIZE):
+        self.bot = bot
+        self.admins = admins
+        self.mode = mode
+        self.window = window
+        self.max_items = max_items
+        self.auto_threshold = auto_threshold
+        self.page_size = page_size
+        self._pending: List[dict] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # фоновые рассылки (submit): держим ссылки, иначе задачу может собрать GC
+        self._tasks: Set[asyncio.Task] = set()
+        self._recent: Deque[float] = deque()
+        self._ids = itertools.count(1)
+        # id сводки -> заявки (строки), чтобы листать страницы
+        self._digests: "OrderedDict[int, List[dict]]" = OrderedDict()
+
+    # ---------------- приём заявок ----------------
+    def submit(self, row: dict):
+        """new_application в фоне: хэндлер не ждёт рассылку, stop() её дождётся."""
+        task = asyncio.create_task(self.new_application(row))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def stop(self):
+        """Дождаться фоновых рассылок и отправить недособранную сводку."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+    async def new_application(self, row: dict):
+        now = time.monotonic()
+        self._recent.append(now)
+        while self._recent and self._recent[0] < now - self.window:
+            self._recent.popleft()
+
+        if self._use_digest():
+            self._pending.append(row)
+            if len(self._pending) >= self.max_items:
+                await self.flush()
+            elif self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_later())
+        else:
+            await self._send_single(row)
+
+    def _use_digest(self) -> bool:
+        if self.mode == "digest":
+            return True
+        if self.mode == "auto":
+            # сводка уже копится — продолжаем её, пока не отправим
+            return bool(self._pending) or len(self._recent) >= self.auto_threshold
+        return False
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Отправить накопленную сводку (вызывается по окну, по порогу и при остановке)."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        digest_id = next(self._ids)
+        self._digests[digest_id] = rows
+        while len(self._digests) > DIGEST_KEEP:
+            self._digests.popitem(last=False)
+
+        text, markup = self.render(digest_id, 0)
+        with use_lane(Lane.ADMIN):
+            for admin_id in self.admins:
+                try:
+                    await self.bot.send_message(admin_id, text, parse_mode=ParseMode.HTML, reply_markup=markup)
+                except Exception as e:
+                    log.error(f"Не вдалося надіслати зведення адміну {admin_id}: {e}")
+        log.info(f"Зведення #{digest_id}: {len(rows)} заявок")
+
+    async def _send_single(self, row: dict):
+        with use_lane(Lane.ADMIN):
+            for admin_id in self.admins:
+                try:
+                    await self.bot.send_message(
+                        admin_id, application_card(row), parse_mode=ParseMode.HTML,
+                        reply_markup=admin_choices_kbd(row["chat_id"]),
+                    )
+                except Exception as e:
+                    log.error(f"Не вдалося надіслати повідомлення адміну {admin_id}: {e}")
+
+    # ---------------- сводка ----------------
+    def render(self, digest_id: int, page: int) -> Optional[Tuple[str, InlineKeyboardMarkup]]:
+        """Текст и клавиатура страницы сводки; None — сводка устарела (забыта или бот перезапущен)."""
+        rows = self._digests.get(digest_id)
+        if rows is None:
+            return None
+        pages = max(1, -(-len(rows) // self.page_size))
+        page = min(max(page, 0), pages - 1)
+        start = page * self.page_size
+        chunk = rows[start:start + self.page_size]
+
+        lines = [f"📥 Нових заявок: {len(rows)} (сторінка {page + 1}/{pages})\n"]
+        buttons = []
+        for n, row in enumerate(chunk, start + 1):
+            pib = html.escape(str(row.get("ПІБ", "")))
+            username = html.escape(str(row.get("Telegram username", "")))
+            followers = html.escape(str(row.get("Підписники / Перегляди", "")))
+            lines.append(f"{n}. 👤 {pib} | @{username} | 👥 {followers}")
+            buttons.append([InlineKeyboardButton(
+                text=f"🔎 {n}. {row.get('ПІБ', '')}"[:60],
+                callback_data=DigestOpen(chat_id=row["chat_id"]).pack(),
+            )])
+
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton(text="◀️", callback_data=DigestPage(digest_id=digest_id, page=page - 1).pack()))
+        if page < pages - 1:
+            nav.append(InlineKeyboardButton(text="▶️", callback_data=DigestPage(digest_id=digest_id, page=page + 1).pack()))
+        if nav:
+            buttons.append(nav)
+        return "\n".join(lines), InlineKeyboardMarkup(inline_keyboard=buttons)
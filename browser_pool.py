@@ -0,0 +1,225 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import config
+from playwright.async_api import async_playwright, Browser, BrowserContext
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("browser_pool")
+
+# Настройки пула (можно переопределить в config.py)
+POOL_SIZE = getattr(config, "BROWSER_POOL_SIZE", 2)
+# отдельный бюджет браузеров для обхода списков подписчиков, чтобы он не занимал слоты проверок
+CRAWLER_POOL_SIZE = getattr(config, "BROWSER_CRAWLER_POOL_SIZE", 1)
+CONTEXT_MAX_USES = getattr(config, "BROWSER_CONTEXT_MAX_USES", 20)
+SHUTDOWN_TIMEOUT = getattr(config, "BROWSER_POOL_SHUTDOWN_TIMEOUT", 15)
+
+# Аргументы запуска Chromium, общие для Instagram и TikTok
+LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--disable-infobars",
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--window-size=1920,1080",
+]
+
+# factory(browser, info) -> новый контекст; в info можно сохранить proxy/UA и т.п.
+ContextFactory = Callable[[Browser, dict], Awaitable[BrowserContext]]
+
+
+@dataclass
+class PooledContext:
+    context: BrowserContext
+    info: dict = field(default_factory=dict)
+    uses: int = 0
+    broken: bool = False
+
+    def discard(self):
+        """Пометить контекст как испорченный — пул пересоздаст его при возврате."""
+        self.broken = True
+
+
+class _Slot:
+    def __init__(self, index: int):
+        self.index = index
+        self.browser: Optional[Browser] = None
+        self.contexts: Dict[str, PooledContext] = {}
+
+
+async def _safe_close(obj):
+    try:
+        await obj.close()
+    except Exception:
+        pass
+
+
+class BrowserPool:
+    """
+    Пул "тёплых" браузеров Chromium.
+    Каждый слот — один браузер и по одному контексту на ключ (платформу).
+    Контекст пересоздаётся после max_context_uses проверок, упавший браузер перезапускается.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, max_context_uses: int = CONTEXT_MAX_USES,
+                 headless: Optional[bool] = None, launch_args: Optional[List[str]] = None):
+        self.size = max(1, int(size))
+        self.max_context_uses = max(1, int(max_context_uses))
+        self.headless = config.PLAYWRIGHT_HEADLESS if headless is None else headless
+        self.launch_args = list(LAUNCH_ARGS if launch_args is None else launch_args)
+
+        self._playwright = None
+        self._slots: List[_Slot] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock = asyncio.Lock()
+        self._warmup: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def warm_up(self):
+        """Запустить браузеры в фоне, не дожидаясь; задачу держит пул, close() её отменит."""
+        if self._warmup is None:
+            self._warmup = asyncio.create_task(self.start())
+            self._warmup.add_done_callback(self._warmed_up)
+
+    @staticmethod
+    def _warmed_up(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            # браузеры поднимутся при первой выдаче слота
+            log.error(f"Прогрев browser pool не удался: {task.exception()}")
+
+    async def start(self):
+        async with self._start_lock:
+            if self._playwright is not None:
+                return
+            if self._closed:
+                raise RuntimeError("Browser pool is closed")
+            self._playwright = await async_playwright().start()
+            self._idle = asyncio.Queue()
+            for i in range(self.size):
+                slot = _Slot(i)
+                try:
+                    await self._ensure_browser(slot)
+                except Exception as e:
+                    # браузер поднимем при первой выдаче слота
+                    log.error(f"Не удалось запустить браузер #{i}: {e}")
+                self._slots.append(slot)
+                self._idle.put_nowait(slot)
+            log.info(f"Browser pool запущен: {self.size} браузер(ов), контекст живёт {self.max_context_uses} проверок")
+
+    async def _ensure_browser(self, slot: _Slot) -> Browser:
+        if slot.browser is not None and slot.browser.is_connected():
+            return slot.browser
+        if slot.browser is not None:
+            log.warning(f"Браузер #{slot.index} отключился, перезапускаем")
+            slot.contexts.clear()
+            await _safe_close(slot.browser)
+        slot.browser = await self._playwright.chromium.launch(headless=self.headless, args=self.launch_args)
+        index = slot.index
+        slot.browser.on("disconnected", lambda _b: log.warning(f"Браузер #{index} упал (disconnected)"))
+        return slot.browser
+
+    @asynccontextmanager
+    async def context(self, key: str, factory: ContextFactory):
+        """Взять из пула контекст для ключа key; при отсутствии он создаётся через factory."""
+        if self._playwright is None:
+            await self.start()
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+
+        slot = await self._idle.get()
+        try:
+            pooled = await self._checkout(slot, key, factory)
+            try:
+                yield pooled
+            finally:
+                pooled.uses += 1
+                await self._checkin(slot, key, pooled)
+        finally:
+            self._idle.put_nowait(slot)
+
+    async def _checkout(self, slot: _Slot, key: str, factory: ContextFactory) -> PooledContext:
+        browser = await self._ensure_browser(slot)
+        pooled = slot.contexts.get(key)
+        if pooled is None:
+            info = {}
+            context = await factory(browser, info)
+            pooled = PooledContext(context=context, info=info)
+            # если контекст закроется сам (краш вкладки/браузера) — не отдаём его повторно
+            context.on("close", lambda _c: pooled.discard())
+            slot.contexts[key] = pooled
+        return pooled
+
+    async def _checkin(self, slot: _Slot, key: str, pooled: PooledContext):
+        crashed = slot.browser is None or not slot.browser.is_connected()
+        if crashed or pooled.broken or pooled.uses >= self.max_context_uses:
+            if slot.contexts.get(key) is pooled:
+                del slot.contexts[key]
+            if not crashed:
+                await _safe_close(pooled.context)
+            return
+        # следующий заёмщик получает контекст без открытых вкладок
+        for page in list(pooled.context.pages):
+            await _safe_close(page)
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._warmup is not None and not self._warmup.done():
+            self._warmup.cancel()
+            await asyncio.gather(self._warmup, return_exceptions=True)
+        if self._playwright is None:
+            return
+
+        # ждём, пока текущие проверки вернут слоты
+        idle = 0
+        try:
+            while idle < len(self._slots):
+                await asyncio.wait_for(self._idle.get(), timeout=SHUTDOWN_TIMEOUT)
+                idle += 1
+        except asyncio.TimeoutError:
+            log.warning(f"Browser pool: {len(self._slots) - idle} проверок не завершились, закрываем принудительно")
+
+        for slot in self._slots:
+            for pooled in slot.contexts.values():
+                await _safe_close(pooled.context)
+            slot.contexts.clear()
+            if slot.browser is not None:
+                await _safe_close(slot.browser)
+                slot.browser = None
+
+        try:
+            await self._playwright.stop()
+        except Exception as e:
+            log.error(f"Ошибка остановки Playwright: {e}")
+        self._playwright = None
+        log.info("Browser pool остановлен")
+
+
+CHECKS = "checks"
+CRAWLER = "crawler"
+
+POOL_SIZES = {CHECKS: POOL_SIZE, CRAWLER: CRAWLER_POOL_SIZE}
+
+_pools: Dict[str, BrowserPool] = {}
+
+
+def get_pool(name: str = CHECKS) -> BrowserPool:
+    """Пул по имени: CHECKS — проверки подписок, CRAWLER — фоновый обход подписчиков."""
+    pool = _pools.get(name)
+    if pool is None:
+        pool = _pools[name] = BrowserPool(size=POOL_SIZES[name])
+    return pool
+
+
+async def shutdown_pool(name: Optional[str] = None):
+    """Закрыть пул name (по умолчанию — все)."""
+    for key in [name] if name else list(_pools):
+        pool = _pools.pop(key, None)
+        if pool is not None:
+            await pool.close()
@@ -1,30 +1,39 @@
-import asyncio
-import json
+import contextvars
 import random
 import time
 import logging
-from typing import Optional
+from typing import Optional, Set, Tuple
 from urllib.parse import urlparse
 
 import config
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from browser_pool import get_pool, CRAWLER
+from proxy_manager import proxy_manager
+from session_store import session_store
+from follow_cache import follow_cache
+from follower_index import follower_index
+from follower_sniffer import FollowerSniffer
+from dom_extract import instagram_extractor, tiktok_extractor
+from resource_policy import apply_resource_policy
+from page_waits import Jitter, ListEndDetector, ScrollResult, scroll_and_wait
 
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("check_subscriptions")
 
-def _pick_proxy() -> Optional[dict]:
-    if not config.PROXIES:
-        return None
-    p = random.choice(config.PROXIES)
-    proxy = {
-        "server": f"http://{p['host']}:{p['port']}",
-    }
-    if p.get("username") and p.get("password"):
-        proxy["username"] = p["username"]
-        proxy["password"] = p["password"]
-    return proxy
+# Ограничения фонового обхода подписчиков (см. follower_index.run_crawler)
+CRAWL_MAX_DURATION = getattr(config, "FOLLOWER_CRAWL_MAX_DURATION", 10 * 60)
+CRAWL_STALE_SCROLLS = getattr(config, "FOLLOWER_CRAWL_STALE_SCROLLS", 5)
 
+# proxy/session текущей проверки — чтобы засчитать им капчу из вспомогательных функций
+_current_check: contextvars.ContextVar[dict] = contextvars.ContextVar("current_check", default={})
+
+def _mark_logged_in():
+    """Скан увидел список подписчиков — значит, сессия залогинена и её state можно сохранить."""
+    check = _current_check.get()
+    if check:
+        check["logged_in"] = True
 
 def _pick_user_agent() -> str:
     return random.choice(config.USER_AGENTS) if config.USER_AGENTS else None
@@ -38,424 +47,615 @@ def clean_target_account(raw: str) -> str:
         return username
     return raw.lstrip("@")
 
-async def _load_cookies(path: str):
+async def _new_instagram_context(browser, info: dict):
+    session = session_store.acquire("instagram")
+    proxy = proxy_manager.pick(identity=session.name)
+    ua = _pick_user_agent()
+
+    context_args = session_store.context_options(session)
+    if ua:
+        context_args["user_agent"] = ua
+    if proxy:
+        context_args["proxy"] = proxy
+
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            cookies = json.load(f)
-        if not isinstance(cookies, list):
-            raise ValueError("Cookies file must contain a JSON list")
-
-        # Нормализация поля sameSite
-        for cookie in cookies:
-            s = cookie.get("sameSite", "").lower()
-            if s == "no_restriction":
-                cookie["sameSite"] = "None"
-            elif s == "unspecified":
-                cookie["sameSite"] = "Lax"
-            elif s == "lax":
-                cookie["sameSite"] = "Lax"
-            elif s == "strict":
-                cookie["sameSite"] = "Strict"
-            else:
-                cookie["sameSite"] = "Lax"
-
-        return cookies
-    except FileNotFoundError:
-        raise FileNotFoundError(f"Cookies file not found: {path}")
+        context = await browser.new_context(**context_args)
+        await apply_resource_policy(context, "instagram")
     except Exception:
+        proxy_manager.record(proxy, ok=False)
         raise
+    if "storage_state" not in context_args:
+        try:
+            await context.add_cookies(session_store.cookies(session))
+        except Exception as e:
+            await context.close()
+            raise RuntimeError(f"Failed to add cookies: {e}")
+
+    info["session"] = session
+    info["proxy"] = proxy
+    info["user_agent"] = ua
+    return context
 
-async def check_instagram_follow(target_account: str, user_username: str, max_duration_sec: int = 30) -> bool:
+
+async def check_instagram_follow(target_account: str, user_username: str, max_duration_sec: int = 30,
+                                 recheck: bool = False) -> bool:
     target_account = target_account.strip().lstrip("@")
     user_username = user_username.strip().lstrip("@")
 
-    proxy = _pick_proxy()
-    ua = _pick_user_agent()
+    cached = follow_cache.get("instagram", target_account, user_username)
+    if cached is False and recheck:
+        # пользователь только что подписался и нажал «Я підписався» — старый отказ не в счёт
+        follow_cache.invalidate("instagram", target_account, user_username)
+    elif cached is not None:
+        return cached
+
+    # подписчики из последнего обхода; живая проверка — только для новых
+    if follower_index.contains("instagram", target_account, user_username):
+        follow_cache.put("instagram", target_account, user_username, True)
+        return True
 
+    result = await _check_instagram_live(target_account, user_username, max_duration_sec)
+    if result is not None:
+        follow_cache.put("instagram", target_account, user_username, result)
+    if result:
+        follower_index.add("instagram", target_account, user_username)
+    return bool(result)
+
+
+async def _check_instagram_live(target_account: str, user_username: str, max_duration_sec: int) -> Optional[bool]:
+    """True/False — ответ проверки, None — проверку выполнить не удалось (в кеш не попадает)."""
     try:
-        cookies = await _load_cookies(config.INSTAGRAM_COOKIES)
+        async with get_pool().context("instagram", _new_instagram_context) as pooled:
+            return await _run_scan(pooled, _scan_instagram_followers, target_account, user_username, max_duration_sec)
     except Exception as e:
-        log.error(f"Failed to load Instagram cookies: {e}")
-        return False
+        log.error(f"Failed to prepare Instagram context: {e}")
+        return None
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context_args = {}
-        if ua:
-            context_args["user_agent"] = ua
-        if proxy:
-            context_args["proxy"] = proxy
 
-        context = await browser.new_context(**context_args)
-        try:
-            await context.add_cookies(cookies)
-        except Exception as e:
-            log.error(f"Failed to add cookies: {e}")
-            await context.close()
-            await browser.close()
+async def _open_instagram_followers(page, target_account: str, jitter: Jitter) -> bool:
+    """Открыть профиль и диалог подписчиков. False — ссылка на подписчиков не найдена."""
+    await page.goto(f"https://www.instagram.com/{target_account}/", timeout=60000, wait_until="domcontentloaded")
+    await jitter.pause(0.5, 1.5)
+
+    try:
+        # click сам дожидается появления ссылки
+        await page.click("a[href$='/followers/']", timeout=8000)
+    except PlaywrightTimeoutError:
+        anchors = await page.query_selector_all("header a")
+        if anchors and len(anchors) >= 2:
+            await anchors[1].click()
+        else:
+            log.warning("Не удалось найти ссылку на подписчиков")
             return False
 
-        page = await context.new_page()
-        try:
-            await page.goto(f"https://www.instagram.com/{target_account}/", timeout=60000)
-            await asyncio.sleep(3)
+    await page.wait_for_selector("div[role='dialog']", timeout=10000)
+    return True
+
 
+async def _scan_instagram_followers(page, target_account: str, user_username: str, max_duration_sec: int) -> Optional[bool]:
+    sniffer = FollowerSniffer("instagram", user_username)
+    sniffer.attach(page)
+    extractor = instagram_extractor()
+    jitter = Jitter()
+    try:
+        if not await _open_instagram_followers(page, target_account, jitter):
+            return None
+
+        search_selectors = [
+            "input[placeholder='Search']",
+            "input[placeholder='Search users']",
+            "input[placeholder='Search…']",
+            "input[placeholder*='Search']",
+            "input[type='text']"
+        ]
+        search_input = None
+        for sel in search_selectors:
             try:
-                await page.click("a[href$='/followers/']", timeout=8000)
+                search_input = await page.wait_for_selector(sel, timeout=5000)
+                if search_input:
+                    await search_input.fill(user_username)
+                    break
             except PlaywrightTimeoutError:
-                anchors = await page.query_selector_all("header a")
-                if anchors and len(anchors) >= 2:
-                    await anchors[1].click()
-                    await asyncio.sleep(2)
-                else:
-                    log.warning("Не удалось найти ссылку на подписчиков")
-                    await context.close()
-                    await browser.close()
-                    return False
-
-            await page.wait_for_selector("div[role='dialog']", timeout=10000)
-            await asyncio.sleep(3)
-
-            search_selectors = [
-                "input[placeholder='Search']",
-                "input[placeholder='Search users']",
-                "input[placeholder='Search…']",
-                "input[placeholder*='Search']",
-                "input[type='text']"
-            ]
-            search_input = None
-            for sel in search_selectors:
-                try:
-                    search_input = await page.wait_for_selector(sel, timeout=5000)
-                    if search_input:
-                        await search_input.fill(user_username)
-                        break
-                except PlaywrightTimeoutError:
-                    continue
+                continue
+
+        if not search_input:
+            log.warning("Поле поиска подписчиков не найдено")
+            return None
+
+        await sniffer.wait(3)  # Ждем подгрузки результатов поиска
+
+        dialog = await page.query_selector("div[role='dialog']")
+        if not dialog:
+            log.warning("Диалог подписчиков не найден")
+            return None
+        _mark_logged_in()
+
+        found = False
+        list_end = False
+        end_detector = ListEndDetector()
+        start_time = time.time()
+        while time.time() - start_time < max_duration_sec:
+            if sniffer.found:
+                found = True
+                break
+            if sniffer.exhausted and not sniffer.use_dom():
+                break
+
+            if sniffer.use_dom() and (await extractor.poll(page, user_username)).found:
+                found = True
+                break
+            if list_end:
+                # список дочитан до конца — отрицательный ответ без ожидания таймаута
+                break
+
+            scroll = await scroll_and_wait(page, "div[role='dialog']", step=400, timeout=2.0,
+                                           row_selector=extractor.item_selector)
+            list_end = end_detector.update(scroll)
+
+        if found:
+            return True
+        else:
+            log.info(f"Пользователь @{user_username} не найден в подписчиках {target_account}")
+            return False
 
-            if not search_input:
-                log.warning("Поле поиска подписчиков не найдено")
-                await context.close()
-                await browser.close()
-                return False
+    except PlaywrightTimeoutError as e:
+        log.error(f"Timeout при проверке Instagram: {e}")
+        return None
+    except Exception as e:
+        log.error(f"Ошибка в check_instagram_follow: {e}")
+        return None
+    finally:
+        sniffer.detach(page)
 
-            await asyncio.sleep(3)  # Ждем подгрузки результатов поиска
 
-            dialog = await page.query_selector("div[role='dialog']")
-            if not dialog:
-                log.warning("Диалог подписчиков не найден")
-                await context.close()
-                await browser.close()
-                return False
+# stealth JS injected into every page/context
+_TIKTOK_STEALTH_JS = r"""
+(() => {
+  try {
+    // navigator.webdriver -> undefined
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
 
-            found = False
-            start_time = time.time()
-            while time.time() - start_time < max_duration_sec:
-                user_divs = await dialog.query_selector_all("div > div > div > div")
-                for div in user_divs:
-                    try:
-                        span = await div.query_selector("span")
-                        if span:
-                            span_text = (await span.inner_text()).strip().lower()
-                            if user_username.lower() == span_text or user_username.lower() in span_text:
-                                found = True
-                                break
-                    except Exception:
-                        continue
-                if found:
-                    break
+    // languages
+    Object.defineProperty(navigator, 'languages', { get: () => ['ru-RU', 'ru', 'en-US'] });
 
-                await dialog.evaluate("(el) => { el.scrollBy(0, 400); }")
-                await asyncio.sleep(2)
+    // plugins (fake)
+    Object.defineProperty(navigator, 'plugins', { get: () => [1,2,3,4,5] });
 
-            await context.close()
-            await browser.close()
+    // chrome object
+    if (!window.chrome) {
+      window.chrome = { runtime: {} };
+    }
 
-            if found:
-                return True
-            else:
-                log.info(f"Пользователь @{user_username} не найден в подписчиках {target_account}")
-                return False
+    // permissions query patch (so permissions.query won't reveal headless)
+    try {
+      const originalQuery = navigator.permissions.query;
+      navigator.permissions.__query = originalQuery;
+      navigator.permissions.query = (params) => {
+        if (params && params.name === 'notifications') {
+          return Promise.resolve({ state: Notification.permission });
+        }
+        return originalQuery(params);
+      };
+    } catch (e) {}
+
+    // make webdriver configurable not present
+    try {
+      if (navigator.__proto__ && navigator.__proto__.hasOwnProperty('webdriver')) {
+        delete navigator.__proto__.webdriver;
+      }
+    } catch (e) {}
 
-        except PlaywrightTimeoutError as e:
-            log.error(f"Timeout при проверке Instagram: {e}")
-            await context.close()
-            await browser.close()
-            return False
+    // hardwareConcurrency (best-effort, may be ignored)
+    try {
+      Object.defineProperty(navigator, 'hardwareConcurrency', { get: () => 4 });
+    } catch (e) {}
+
+  } catch (err) {
+    // ignore
+  }
+})();
+"""
+
+
+async def _new_tiktok_context(browser, info: dict):
+    session = session_store.acquire("tiktok")
+    proxy = proxy_manager.pick(identity=session.name)
+    ua = _pick_user_agent()
+
+    context_args = session_store.context_options(session)
+    # set viewport and UA for more realistic fingerprint
+    context_args["viewport"] = {"width": 1920, "height": 1080}
+    if ua:
+        context_args["user_agent"] = ua
+    else:
+        # a reasonable default UA
+        context_args["user_agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
+
+    # Add proxy to context if provided (optional)
+    if proxy:
+        context_args["proxy"] = proxy
+
+    try:
+        context = await browser.new_context(**context_args)
+        await apply_resource_policy(context, "tiktok")
+    except Exception:
+        proxy_manager.record(proxy, ok=False)
+        raise
+
+    # inject stealth script into every page
+    try:
+        await context.add_init_script(_TIKTOK_STEALTH_JS)
+    except Exception:
+        # if add_init_script fails for any reason, continue — stealth still helps via UA/args
+        log.warning("Не удалось добавить init script для stealth (игнорируем)")
+
+    if "storage_state" not in context_args:
+        try:
+            # add cookies (if provided)
+            await context.add_cookies(session_store.cookies(session))
         except Exception as e:
-            log.error(f"Ошибка в check_instagram_follow: {e}")
             await context.close()
-            await browser.close()
-            return False
-        
+            raise RuntimeError(f"Failed to add TT cookies: {e}")
 
-async def check_tiktok_follow(target_account: str, user_username: str) -> bool:
+    info["session"] = session
+    info["proxy"] = proxy
+    info["user_agent"] = context_args["user_agent"]
+    return context
+
+
+async def check_tiktok_follow(target_account: str, user_username: str, recheck: bool = False) -> bool:
     target_account = clean_target_account(target_account)
     user_username = user_username.strip().lstrip("@")
 
-    proxy = _pick_proxy()
-    ua = _pick_user_agent()
-    cookies = await _load_cookies(config.TIKTOK_COOKIES)
+    cached = follow_cache.get("tiktok", target_account, user_username)
+    if cached is False and recheck:
+        # пользователь только что подписался и нажал «Я підписався» — старый отказ не в счёт
+        follow_cache.invalidate("tiktok", target_account, user_username)
+    elif cached is not None:
+        return cached
 
-    log.info(f"TT check: target={target_account} user={user_username} proxy={proxy}")
+    if follower_index.contains("tiktok", target_account, user_username):
+        follow_cache.put("tiktok", target_account, user_username, True)
+        return True
 
-    # stealth JS injected into every page/context
-    stealth_js = r"""
-    (() => {
-      try {
-        // navigator.webdriver -> undefined
-        Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    result = await _check_tiktok_live(target_account, user_username)
+    if result is not None:
+        follow_cache.put("tiktok", target_account, user_username, result)
+    if result:
+        follower_index.add("tiktok", target_account, user_username)
+    return bool(result)
 
-        // languages
-        Object.defineProperty(navigator, 'languages', { get: () => ['ru-RU', 'ru', 'en-US'] });
 
-        // plugins (fake)
-        Object.defineProperty(navigator, 'plugins', { get: () => [1,2,3,4,5] });
+async def _check_tiktok_live(target_account: str, user_username: str) -> Optional[bool]:
+    """True/False — ответ проверки, None — проверку выполнить не удалось (в кеш не попадает)."""
+    try:
+        async with get_pool().context("tiktok", _new_tiktok_context) as pooled:
+            log.info(f"TT check: target={target_account} user={user_username} proxy={pooled.info.get('proxy')}")
+            return await _run_scan(pooled, _scan_tiktok_followers, target_account, user_username)
+    except Exception as e:
+        log.error(f"Failed to prepare TikTok context: {e}")
+        return None
 
-        // chrome object
-        if (!window.chrome) {
-          window.chrome = { runtime: {} };
-        }
 
-        // permissions query patch (so permissions.query won't reveal headless)
-        try {
-          const originalQuery = navigator.permissions.query;
-          navigator.permissions.__query = originalQuery;
-          navigator.permissions.query = (params) => {
-            if (params && params.name === 'notifications') {
-              return Promise.resolve({ state: Notification.permission });
-            }
-            return originalQuery(params);
-          };
-        } catch (e) {}
-
-        // make webdriver configurable not present
-        try {
-          if (navigator.__proto__ && navigator.__proto__.hasOwnProperty('webdriver')) {
-            delete navigator.__proto__.webdriver;
-          }
-        } catch (e) {}
-
-        // hardwareConcurrency (best-effort, may be ignored)
-        try {
-          Object.defineProperty(navigator, 'hardwareConcurrency', { get: () => 4 });
-        } catch (e) {}
-
-      } catch (err) {
-        // ignore
-      }
-    })();
-    """
+async def _run_scan(pooled, scan, *args) -> Optional[bool]:
+    """Выполнить scan(page, *args) на новой вкладке и записать результат в статистику прокси и сессии."""
+    proxy = pooled.info.get("proxy")
+    session = pooled.info.get("session")
+    pooled.info["logged_in"] = False
+    token = _current_check.set(pooled.info)
+    started = time.time()
+    result = None
+    try:
+        page = await pooled.context.new_page()
+        try:
+            result = await scan(page, *args)
+        finally:
+            await page.close()
+    finally:
+        _current_check.reset(token)
+        # и при отмене (таймаут очереди проверок) и ошибках: прокси, съевший таймаут, — провал
+        proxy_manager.record(proxy, ok=result is not None, latency=time.time() - started)
+        session_store.record_use(session)
+
+    if result is not None and pooled.info["logged_in"]:
+        # обновлённые cookies/localStorage — следующему контексту этой сессии; страница
+        # разлогина или капчи тоже даёт ответ, но её state затёр бы рабочие cookies
+        await session_store.save_state(session, pooled.context)
+    if not proxy_manager.is_healthy(proxy) or not session_store.is_ready(session):
+        # прокси или сессия выведены из ротации — контекст с ними больше не выдаём
+        pooled.discard()
+    return result
+
+
+_TIKTOK_CAPTCHA_BUTTON = "button.TUXButton.TUXButton--borderless.TUXButton--xsmall.TUXButton--secondary"
+
+
+# helper: try to detect & click captcha-close button (no exceptions thrown if absent)
+async def _try_close_captcha(page, jitter: Jitter) -> bool:
+    try:
+        btn = await page.query_selector(_TIKTOK_CAPTCHA_BUTTON)
+        if btn:
+            try:
+                await btn.click()
+                log.info("Закрыли капчу (нажали на кнопку).")
+                check = _current_check.get()
+                proxy_manager.record_captcha(check.get("proxy"))
+                session_store.cool_down(check.get("session"))
+                # ждём, пока капча действительно исчезнет
+                try:
+                    await page.wait_for_selector(_TIKTOK_CAPTCHA_BUTTON, state="detached", timeout=5000)
+                except Exception:
+                    pass
+                await jitter.pause(0.5, 1.5)
+                return True
+            except Exception:
+                return False
+    except Exception:
+        return False
+    return False
 
-    async with async_playwright() as p:
-        # launch with some anti-detection args (keeps headless setting from config)
-        launch_args = [
-            "--disable-blink-features=AutomationControlled",
-            "--disable-infobars",
-            "--no-sandbox",
-            "--disable-setuid-sandbox",
-            "--disable-dev-shm-usage",
-            "--disable-extensions",
-            "--window-size=1920,1080",
-        ]
-        # keep user's HEADLESS flag, but if it's True we still pass it as is
-        browser = await p.chromium.launch(headless=config.PLAYWRIGHT_HEADLESS, args=launch_args)
-
-        context_args = {}
-        # set viewport and UA for more realistic fingerprint
-        context_args["viewport"] = {"width": 1920, "height": 1080}
-        if ua:
-            context_args["user_agent"] = ua
-        else:
-            # a reasonable default UA
-            context_args["user_agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
 
-        # Add proxy to context if provided (optional)
-        if proxy:
-            context_args["proxy"] = proxy
+# helper: small human-like movement
+async def _humanize(page, jitter: Jitter):
+    try:
+        await page.mouse.move(random.randint(100, 800), random.randint(100, 600))
+        await jitter.pause(0.5, 1.2)
+    except Exception:
+        pass
+
 
-        context = await browser.new_context(**context_args)
+_TIKTOK_FOLLOWERS_SELECTORS = ("span:has-text('Подписчики')", "span:has-text('Followers')", "a[href$='/following/']")
 
-        # inject stealth script into every page
+
+async def _open_tiktok_followers(page, profile_url: str, jitter: Jitter, attempt: int = 1) -> bool:
+    """Открыть профиль и модалку подписчиков (закрывая капчу по пути). False — профиль не загрузился."""
+    try:
+        await page.goto(profile_url, timeout=config.PLAYWRIGHT_TIMEOUT, wait_until="domcontentloaded")
+    except Exception as e:
+        log.warning(f"goto failed (attempt {attempt}): {e}")
+        return False
+    # ждём появления ссылки на подписчиков вместо фиксированной паузы
+    try:
+        await page.wait_for_selector(", ".join(_TIKTOK_FOLLOWERS_SELECTORS), timeout=15000)
+    except Exception:
+        log.debug("Ссылка на подписчиков не появилась вовремя.")
+    await jitter.pause(1.0, 2.5)
+
+    # human moves
+    await _humanize(page, jitter)
+
+    # try closing captcha if it appeared on profile
+    await _try_close_captcha(page, jitter)
+
+    # click followers (Подписчики). Try both localized text variants
+    clicked = False
+    for sel in _TIKTOK_FOLLOWERS_SELECTORS:
         try:
-            await context.add_init_script(stealth_js)
+            el = await page.query_selector(sel)
+            if el:
+                await el.click()
+                clicked = True
+                break
         except Exception:
-            # if add_init_script fails for any reason, continue — stealth still helps via UA/args
-            log.warning("Не удалось добавить init script для stealth (игнорируем)")
+            continue
+    if not clicked:
+        # fallback: try get_by_text (handles different node types)
+        try:
+            btn = page.get_by_text("Подписчики")
+            if await btn.count() > 0:
+                await btn.first.click()
+                clicked = True
+        except Exception:
+            pass
+
+    if not clicked:
+        log.warning("Не удалось нажать на 'Подписчики' (продолжим попытку).")
+    else:
+        log.info("Кликнули на 'Подписчики'")
 
+    # if captcha appeared after click, try to close and re-open followers once
+    if await _try_close_captcha(page, jitter):
+        # re-open followers to ensure modal is visible
         try:
-            # add cookies (if provided)
-            await context.add_cookies(cookies)
-        except Exception as e:
-            await browser.close()
-            raise RuntimeError(f"Failed to add TT cookies: {e}")
+            reopen = await page.query_selector("span:has-text('Подписчики')")
+            if reopen:
+                await reopen.click()
+        except Exception:
+            pass
 
-        page = await context.new_page()
+    # wait for at least some list item to appear (li or p)
+    try:
+        await page.wait_for_selector("li", timeout=15000)
+    except Exception:
+        log.debug("li не появился вовремя, попробуем всё-таки искать по p внутри страницы.")
+    return True
 
-        profile_url = f"https://www.tiktok.com/@{target_account}"
-        captcha_button_selector = "button.TUXButton.TUXButton--borderless.TUXButton--xsmall.TUXButton--secondary"
 
-        # helper: try to detect & click captcha-close button (no exceptions thrown if absent)
-        async def try_close_captcha():
-            try:
-                btn = await page.query_selector(captcha_button_selector)
-                if btn:
-                    try:
-                        await btn.click()
-                        log.info("Закрыли капчу (нажали на кнопку).")
-                        # небольшая пауза после закрытия
-                        await asyncio.sleep(random.uniform(2.0, 3.5))
-                        return True
-                    except Exception:
-                        return False
-            except Exception:
+async def _scroll_tiktok_followers(page) -> ScrollResult:
+    # human-like scroll inside the modal (или страницы, если модалки нет — тогда конец списка не засчитывается)
+    try:
+        return await scroll_and_wait(page, "div[role='dialog']", step=600, timeout=3.0,
+                                     row_selector=tiktok_extractor().item_selector)
+    except Exception:
+        try:
+            await page.mouse.wheel(0, 800)
+        except Exception:
+            pass
+        return ScrollResult(grew=False, at_end=False)
+
+
+async def _scan_tiktok_followers(page, target_account: str, user_username: str) -> Optional[bool]:
+    profile_url = f"https://www.tiktok.com/@{target_account}"
+    sniffer = FollowerSniffer("tiktok", user_username)
+    sniffer.attach(page)
+    extractor = tiktok_extractor()
+    jitter = Jitter()
+
+    max_attempts = 3
+    loaded = False
+    try:
+        for attempt in range(1, max_attempts + 1):
+            log.info(f"Attempt {attempt}: заходим на профиль {profile_url}")
+            if not await _open_tiktok_followers(page, profile_url, jitter, attempt):
+                # профиль не открылся (мёртвый прокси, сеть) — это не отрицательный ответ
+                await jitter.pause(2.5, 4.0)
+                continue
+            loaded = True
+
+            # Now search through list items; do multiple smooth scrolls
+            found = False
+            list_end = False
+            end_detector = ListEndDetector()
+            scrolls = 25  # увеличено число скроллов для глубокого поиска
+            for i in range(scrolls):
+                if sniffer.found:
+                    log.info(f"Найден подписчик {user_username}")
+                    found = True
+                    break
+                if sniffer.exhausted and not sniffer.use_dom():
+                    break
+
+                if sniffer.use_dom() and (await extractor.poll(page, user_username)).found:
+                    log.info(f"Найден подписчик {user_username}")
+                    found = True
+                    break
+                if list_end:
+                    break
+
+                # scroll returns as soon as new rows are rendered
+                list_end = end_detector.update(await _scroll_tiktok_followers(page))
+
+                # short random pause between scrolls (из общего бюджета jitter)
+                await jitter.pause(0.3, 1.0)
+
+                # occasionally perform small mouse move to look more human
+                if i % 4 == 0:
+                    await _humanize(page, jitter)
+
+                # also try to close captcha mid-scroll if it appears
+                await _try_close_captcha(page, jitter)
+
+            if found or list_end or (sniffer.exhausted and not sniffer.use_dom()):
+                _mark_logged_in()
+            if found:
+                return True
+            if list_end or (sniffer.exhausted and not sniffer.use_dom()):
+                # сайт отдал список целиком — повторять попытку бессмысленно
+                log.info(f"Подписчик {user_username} не найден: список подписчиков закончился.")
                 return False
-            return False
 
-        # helper: small human-like movement
-        async def humanize():
-            try:
-                await page.mouse.move(random.randint(100, 800), random.randint(100, 600))
-                await asyncio.sleep(random.uniform(0.5, 1.2))
-            except Exception:
-                pass
+            log.info(f"Подписчик {user_username} не найден в этой попытке (attempt {attempt}).")
+            # if not found, retry full flow (maybe proxy/session/timeout issue)
+            await jitter.pause(2.5, 4.0)
+
+        # after attempts; ни разу не загрузив профиль, ответа у нас нет
+        return False if loaded else None
+
+    except Exception as e:
+        log.exception(f"Error in check_tiktok_follow: {e}")
+        return None
+    finally:
+        sniffer.detach(page)
+
 
-        max_attempts = 3
+def _usernames_from_hrefs(hrefs, prefix: str = "") -> Set[str]:
+    """'/@name' (ссылки строк списка TikTok) -> {'name'}; прочие ссылки пропускаются."""
+    usernames = set()
+    for href in hrefs:
+        parts = urlparse(href or "").path.strip("/").split("/")
+        if len(parts) == 1 and parts[0].startswith(prefix) and len(parts[0]) > len(prefix):
+            usernames.add(parts[0][len(prefix):].lower())
+    return usernames
+
+
+async def crawl_instagram_followers(target_account: str, max_duration_sec: int = CRAWL_MAX_DURATION) -> Tuple[Set[str], bool]:
+    """
+    Пройти список подписчиков целиком (для follower_index).
+    Возвращает (usernames, complete); complete=True, только если сайт сообщил, что список закончился.
+    Остановка по застою или концу прокрутки (лимит, медленный прокси) — неполный обход.
+    """
+    target_account = target_account.strip().lstrip("@")
+    usernames: Set[str] = set()
+    complete = False
+
+    async with get_pool(CRAWLER).context("instagram", _new_instagram_context) as pooled:
+        page = await pooled.context.new_page()
+        sniffer = FollowerSniffer("instagram", "")
+        sniffer.attach(page)
+        extractor = instagram_extractor()
         try:
-            for attempt in range(1, max_attempts + 1):
-                log.info(f"Attempt {attempt}: заходим на профиль {profile_url}")
-                try:
-                    await page.goto(profile_url, timeout=config.PLAYWRIGHT_TIMEOUT)
-                except Exception as e:
-                    log.warning(f"goto failed (attempt {attempt}): {e}")
-                # подождать чуть дольше — чтобы страница прогрузилась и снизить риск капчи
-                await asyncio.sleep(random.uniform(4.0, 6.5))
-
-                # human moves
-                await humanize()
-
-                # try closing captcha if it appeared on profile
-                await try_close_captcha()
-
-                # click followers (Подписчики). Try both localized text variants
-                clicked = False
-                for sel in ("span:has-text('Подписчики')", "span:has-text('Followers')", "a[href$='/following/']"):
-                    try:
-                        el = await page.query_selector(sel)
-                        if el:
-                            await el.click()
-                            clicked = True
-                            break
-                    except Exception:
-                        continue
-                if not clicked:
-                    # fallback: try get_by_text (handles different node types)
-                    try:
-                        btn = page.get_by_text("Подписчики")
-                        if await btn.count() > 0:
-                            await btn.first.click()
-                            clicked = True
-                    except Exception:
-                        pass
-
-                if not clicked:
-                    log.warning("Не удалось нажать на 'Подписчики' (продолжим попытку).")
-                else:
-                    log.info("Кликнули на 'Подписчики'")
-                # дождёмся небольшой загрузки окна
-                await asyncio.sleep(random.uniform(3.0, 5.0))
-
-                # if captcha appeared after click, try to close and re-open followers once
-                if await try_close_captcha():
-                    # re-open followers to ensure modal is visible
-                    try:
-                        await asyncio.sleep(random.uniform(1.0, 2.0))
-                        reopen = await page.query_selector("span:has-text('Подписчики')")
-                        if reopen:
-                            await reopen.click()
-                            await asyncio.sleep(random.uniform(2.0, 3.0))
-                    except Exception:
-                        pass
-
-                # wait for at least some list item to appear (li or p)
-                try:
-                    await page.wait_for_selector("li", timeout=15000)
-                except Exception:
-                    log.debug("li не появился вовремя, попробуем всё-таки искать по p внутри страницы.")
-
-                # Now search through list items; do multiple smooth scrolls
-                found = False
-                scrolls = 25  # увеличено число скроллов для глубокого поиска
-                for i in range(scrolls):
-                    # get all <li> currently in DOM
-                    try:
-                        lis = await page.query_selector_all("li")
-                    except Exception:
-                        lis = []
-
-                    # iterate and try to find <p> inside each li
-                    for li in lis:
-                        try:
-                            p_el = await li.query_selector("p")
-                            if not p_el:
-                                continue
-                            username_text = (await p_el.inner_text() or "").strip()
-                            # normalize and compare
-                            clean = username_text.lstrip("@").split()[0]  # take first token to be safe
-                            if user_username.lower() == clean.lower() or user_username.lower() in username_text.lower():
-                                log.info(f"Найден подписчик {user_username}")
-                                found = True
-                                break
-                        except Exception:
-                            continue
-                    if found:
+            if not await _open_instagram_followers(page, target_account, Jitter(0)):
+                return usernames, False
+            dialog = await page.query_selector("div[role='dialog']")
+            if not dialog:
+                return usernames, False
+
+            stale = 0
+            end_detector = ListEndDetector()
+            start_time = time.time()
+            while time.time() - start_time < max_duration_sec:
+                # только строки списка (как в проверке): ссылки диалога вроде /explore/ — не подписчики
+                before = len(usernames)
+                usernames |= set((await extractor.poll(page)).added) | sniffer.usernames
+                if sniffer.exhausted:
+                    complete = True
+                    break
+                if len(usernames) == before:
+                    stale += 1
+                    if stale >= CRAWL_STALE_SCROLLS:
                         break
+                else:
+                    stale = 0
+                scroll = await scroll_and_wait(page, "div[role='dialog']", step=2000, timeout=3.0,
+                                               row_selector=extractor.item_selector)
+                if end_detector.update(scroll):
+                    break
+        finally:
+            sniffer.detach(page)
+            await page.close()
 
-                    # human-like scroll inside the modal / page
-                    # prefer scrolling modal if present
-                    try:
-                        # try to find scrollable container (modal or main feed)
-                        modal = await page.query_selector("div[role='dialog']")
-                        if modal:
-                            # small scroll inside modal
-                            await modal.evaluate("(el) => { el.scrollBy(0, 400); }")
-                        else:
-                            await page.mouse.wheel(0, 800)
-                    except Exception:
-                        try:
-                            await page.mouse.wheel(0, 800)
-                        except Exception:
-                            pass
-
-                    # random pause between scrolls
-                    await asyncio.sleep(random.uniform(1.8, 3.2))
-
-                    # occasionally perform small mouse move to look more human
-                    if i % 4 == 0:
-                        await humanize()
-
-                    # also try to close captcha mid-scroll if it appears
-                    await try_close_captcha()
-
-                if found:
-                    await context.close()
-                    await browser.close()
-                    return True
-
-                log.info(f"Подписчик {user_username} не найден в этой попытке (attempt {attempt}).")
-                # if not found, retry full flow (maybe proxy/session/timeout issue)
-                await asyncio.sleep(random.uniform(2.5, 4.0))
-
-            # after attempts
-            await context.close()
-            await browser.close()
-            return False
+    usernames |= sniffer.usernames
+    usernames.discard(target_account.lower())
+    return usernames, complete or sniffer.exhausted
 
-        except Exception as e:
-            log.exception(f"Error in check_tiktok_follow: {e}")
-            try:
-                await context.close()
-                await browser.close()
-            except Exception:
-                pass
-            return False
+
+async def crawl_tiktok_followers(target_account: str, max_duration_sec: int = CRAWL_MAX_DURATION) -> Tuple[Set[str], bool]:
+    target_account = clean_target_account(target_account)
+    usernames: Set[str] = set()
+    complete = False
+
+    async with get_pool(CRAWLER).context("tiktok", _new_tiktok_context) as pooled:
+        page = await pooled.context.new_page()
+        sniffer = FollowerSniffer("tiktok", "")
+        sniffer.attach(page)
+        try:
+            jitter = Jitter()
+            if not await _open_tiktok_followers(page, f"https://www.tiktok.com/@{target_account}", jitter):
+                return usernames, False
+
+            stale = 0
+            end_detector = ListEndDetector()
+            start_time = time.time()
+            while time.time() - start_time < max_duration_sec:
+                hrefs = await page.eval_on_selector_all("li a[href*='/@']", "(els) => els.map((a) => a.getAttribute('href'))")
+                before = len(usernames)
+                usernames |= _usernames_from_hrefs(hrefs, prefix="@") | sniffer.usernames
+                if sniffer.exhausted:
+                    complete = True
+                    break
+                if len(usernames) == before:
+                    stale += 1
+                    if stale >= CRAWL_STALE_SCROLLS:
+                        break
+                else:
+                    stale = 0
+                if end_detector.update(await _scroll_tiktok_followers(page)):
+                    break
+                await _try_close_captcha(page, jitter)
+        finally:
+            sniffer.detach(page)
+            await page.close()
+
+    usernames |= sniffer.usernames
+    usernames.discard(target_account.lower())
+    return usernames, complete or sniffer.exhausted
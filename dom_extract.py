@@ -0,0 +1,75 @@
+import itertools
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from follow_cache import normalize_username
+
+
+# Выполняется в странице одним page.evaluate: собирает username из строк списка,
+# помнит уже виденные (window[stateKey]) и возвращает только новые.
+_EXTRACT_JS = r"""
+({stateKey, rootSelector, rowSelector, textSelector, target}) => {
+  const seen = window[stateKey] || (window[stateKey] = new Set());
+  const scope = rootSelector ? document.querySelector(rootSelector) : document;
+  if (!scope) return {added: [], found: false, total: seen.size};
+
+  const normalize = (text) => (text || '').trim().replace(/^@/, '').split(/\s+/)[0].toLowerCase();
+  const added = [];
+  let found = false;
+  for (const row of scope.querySelectorAll(rowSelector)) {
+    const el = textSelector ? row.querySelector(textSelector) : row;
+    if (!el) continue;
+    const name = normalize(el.textContent);
+    if (!name || seen.has(name)) continue;
+    seen.add(name);
+    added.push(name);
+    if (name === target) found = true;
+  }
+  return {added, found, total: seen.size};
+}
+"""
+
+_state_ids = itertools.count(1)
+
+
+@dataclass
+class ExtractResult:
+    added: List[str] = field(default_factory=list)
+    found: bool = False
+    total: int = 0
+
+
+class UsernameExtractor:
+    """
+    Инкрементальное чтение username из DOM за один round trip на скролл.
+    Используется и для Instagram, и для TikTok — отличаются только селекторы.
+    """
+
+    def __init__(self, row_selector: str, text_selector: Optional[str] = None, root_selector: Optional[str] = None):
+        self.row_selector = row_selector
+        self.text_selector = text_selector
+        self.root_selector = root_selector
+        self.state_key = f"__pgSeenUsernames{next(_state_ids)}"
+
+    @property
+    def item_selector(self) -> str:
+        """CSS-селектор элемента с username в строке (для подсчёта строк списка)."""
+        return f"{self.row_selector} {self.text_selector}" if self.text_selector else self.row_selector
+
+    async def poll(self, page, target: str = "") -> ExtractResult:
+        result = await page.evaluate(_EXTRACT_JS, {
+            "stateKey": self.state_key,
+            "rootSelector": self.root_selector,
+            "rowSelector": self.row_selector,
+            "textSelector": self.text_selector,
+            "target": normalize_username(target),
+        })
+        return ExtractResult(added=result["added"], found=result["found"], total=result["total"])
+
+
+def instagram_extractor() -> UsernameExtractor:
+    return UsernameExtractor("div > div > div > div", "span", root_selector="div[role='dialog']")
+
+
+def tiktok_extractor() -> UsernameExtractor:
+    return UsernameExtractor("li", "p")
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import config
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("follow_cache")
+
+# Настройки кеша (можно переопределить в config.py)
+POSITIVE_TTL = getattr(config, "FOLLOW_CACHE_POSITIVE_TTL", 6 * 60 * 60)
+NEGATIVE_TTL = getattr(config, "FOLLOW_CACHE_NEGATIVE_TTL", 60)
+MAX_SIZE = getattr(config, "FOLLOW_CACHE_MAX_SIZE", 10000)
+CACHE_FILE = getattr(config, "FOLLOW_CACHE_FILE", None)  # None — только в памяти
+FLUSH_INTERVAL = getattr(config, "FOLLOW_CACHE_FLUSH_INTERVAL", 30)
+
+
+def normalize_username(username: str) -> str:
+    return (username or "").strip().lstrip("@").lower()
+
+
+class FollowCache:
+    """
+    LRU-кеш результатов проверки подписки.
+    Ключ — (платформа, целевой аккаунт, username); у положительных и отрицательных
+    ответов разный TTL. При заданном path записи переживают перезапуск.
+    """
+
+    def __init__(self, positive_ttl: float = POSITIVE_TTL, negative_ttl: float = NEGATIVE_TTL,
+                 max_size: int = MAX_SIZE, path: Optional[str] = CACHE_FILE,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max(1, int(max_size))
+        self.path = path
+        self.flush_interval = flush_interval
+        # key -> (value, expires_at); время wall-clock, чтобы пережить перезапуск
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[bool, float]]" = OrderedDict()
+        self._dirty = False
+        self._last_flush = time.time()
+        self._saving: Optional[asyncio.Future] = None
+        if self.path:
+            self.load()
+
+    @staticmethod
+    def _key(platform: str, target: str, username: str) -> Tuple[str, str, str]:
+        return platform, normalize_username(target), normalize_username(username)
+
+    def get(self, platform: str, target: str, username: str) -> Optional[bool]:
+        key = self._key(platform, target, username)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self._dirty = True
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, platform: str, target: str, username: str, value: bool):
+        ttl = self.positive_ttl if value else self.negative_ttl
+        if ttl <= 0:
+            return
+        key = self._key(platform, target, username)
+        self._entries[key] = (bool(value), time.time() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        self._dirty = True
+        if self.path and time.time() - self._last_flush >= self.flush_interval:
+            self._save_in_background()
+
+    def invalidate(self, platform: str, target: str, username: str):
+        if self._entries.pop(self._key(platform, target, username), None) is not None:
+            self._dirty = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            log.error(f"Не удалось прочитать кеш подписок {self.path}: {e}")
+            return
+
+        now = time.time()
+        for platform, target, username, value, expires_at in items:
+            if expires_at > now:
+                self._entries[(platform, target, username)] = (bool(value), expires_at)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        log.info(f"Кеш подписок: загружено {len(self._entries)} записей из {self.path}")
+
+    def save(self):
+        """Синхронное сохранение (при остановке); из loop кеш сохраняется в фоне, см. put()."""
+        self._last_flush = time.time()
+        if not self.path or not self._dirty:
+            return
+        self._dirty = False
+        self._write(self._snapshot())
+
+    def _save_in_background(self):
+        # снимок берём в loop, а JSON и диск — в потоке, чтобы не блокировать бота
+        if self._saving is not None and not self._saving.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        self._last_flush = time.time()
+        self._dirty = False
+        self._saving = loop.run_in_executor(None, self._write, self._snapshot())
+
+    def _snapshot(self) -> List[list]:
+        now = time.time()
+        return [
+            [platform, target, username, value, expires_at]
+            for (platform, target, username), (value, expires_at) in self._entries.items()
+            if expires_at > now
+        ]
+
+    def _write(self, items: List[list]):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(items, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self._dirty = True
+            log.error(f"Не удалось сохранить кеш подписок {self.path}: {e}")
+
+
+follow_cache = FollowCache()
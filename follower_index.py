@@ -0,0 +1,198 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sortedcontainers import SortedSet
+
+import config
+from follow_cache import normalize_username
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("follower_index")
+
+# Настройки индекса (можно переопределить в config.py)
+INDEX_DIR = getattr(config, "FOLLOWER_INDEX_DIR", "follower_index")
+CRAWL_ENABLED = getattr(config, "FOLLOWER_CRAWL_ENABLED", True)
+CRAWL_INTERVAL = getattr(config, "FOLLOWER_CRAWL_INTERVAL", 30 * 60)
+# первый обход — не сразу после старта, пока прогреваются браузеры и идут первые проверки
+CRAWL_START_DELAY = getattr(config, "FOLLOWER_CRAWL_START_DELAY", 5 * 60)
+CRAWL_TARGETS = getattr(config, "FOLLOWER_CRAWL_TARGETS", {
+    "instagram": ["proove_gaming_ua"],
+    "tiktok": ["proove_gaming_ua"],
+})
+
+
+class _TargetIndex:
+    def __init__(self):
+        self.usernames = SortedSet()
+        self.last_crawl_at: Optional[float] = None
+        self.complete = False
+        self.dirty = False
+
+
+class FollowerIndex:
+    """
+    Индекс подписчиков целевых аккаунтов: отсортированное множество username на диске.
+    Полный обход заменяет множество целиком, неполный — дополняет его.
+    """
+
+    def __init__(self, directory: str = INDEX_DIR):
+        self.directory = directory
+        self._targets: Dict[Tuple[str, str], _TargetIndex] = {}
+
+    def _paths(self, platform: str, target: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, f"{platform}_{normalize_username(target)}")
+        return f"{base}.txt", f"{base}.meta.json"
+
+    def _get(self, platform: str, target: str) -> _TargetIndex:
+        key = (platform, normalize_username(target))
+        index = self._targets.get(key)
+        if index is None:
+            index = self._load(platform, target)
+            self._targets[key] = index
+        return index
+
+    def _load(self, platform: str, target: str) -> _TargetIndex:
+        index = _TargetIndex()
+        data_path, meta_path = self._paths(platform, target)
+        try:
+            with open(data_path, "r", encoding="utf-8") as f:
+                index.usernames.update(line.strip() for line in f if line.strip())
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            index.last_crawl_at = meta.get("last_crawl_at")
+            index.complete = bool(meta.get("complete"))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.error(f"Не удалось прочитать индекс подписчиков {data_path}: {e}")
+        return index
+
+    def contains(self, platform: str, target: str, username: str) -> bool:
+        return normalize_username(username) in self._get(platform, target).usernames
+
+    def last_crawl_at(self, platform: str, target: str) -> Optional[float]:
+        return self._get(platform, target).last_crawl_at
+
+    def add(self, platform: str, target: str, username: str):
+        """Добавить подписчика, подтверждённого живой проверкой."""
+        index = self._get(platform, target)
+        username = normalize_username(username)
+        if username and username not in index.usernames:
+            index.usernames.add(username)
+            index.dirty = True
+
+    def merge_crawl(self, platform: str, target: str, usernames: Iterable[str], complete: bool):
+        index = self._get(platform, target)
+        crawled = {normalize_username(u) for u in usernames if u}
+        before = len(index.usernames)
+        if complete:
+            # список дошёл до конца — отписавшиеся удаляются
+            index.usernames = SortedSet(crawled)
+        else:
+            index.usernames.update(crawled)
+        index.last_crawl_at = time.time()
+        index.complete = complete
+        index.dirty = True
+        log.info(f"Индекс {platform}/{target}: {before} -> {len(index.usernames)} подписчиков "
+                 f"(обход {'полный' if complete else 'частичный'}, найдено {len(crawled)})")
+
+    def save(self, platform: str, target: str):
+        """Синхронное сохранение (при остановке); из loop — save_async."""
+        snapshot = self._snapshot(platform, target)
+        if snapshot is not None:
+            self._write(*snapshot)
+
+    async def save_async(self, platform: str, target: str):
+        # снимок — в loop, запись файла — в потоке
+        snapshot = self._snapshot(platform, target)
+        if snapshot is not None:
+            await asyncio.to_thread(self._write, *snapshot)
+
+    def save_all(self):
+        for platform, target in list(self._targets):
+            self.save(platform, target)
+
+    async def save_all_async(self):
+        for platform, target in list(self._targets):
+            await self.save_async(platform, target)
+
+    def _snapshot(self, platform: str, target: str) -> Optional[Tuple[_TargetIndex, str, str, List[str], dict]]:
+        index = self._get(platform, target)
+        if not index.dirty:
+            return None
+        index.dirty = False
+        data_path, meta_path = self._paths(platform, target)
+        meta = {"last_crawl_at": index.last_crawl_at, "complete": index.complete}
+        return index, data_path, meta_path, list(index.usernames), meta
+
+    def _write(self, index: _TargetIndex, data_path: str, meta_path: str, usernames: List[str], meta: dict):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f"{data_path}.tmp", "w", encoding="utf-8") as f:
+                f.writelines(f"{u}\n" for u in usernames)
+            os.replace(f"{data_path}.tmp", data_path)
+            with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(f"{meta_path}.tmp", meta_path)
+        except Exception as e:
+            index.dirty = True
+            log.error(f"Не удалось сохранить индекс подписчиков {data_path}: {e}")
+
+
+follower_index = FollowerIndex()
+_crawler_task: Optional[asyncio.Task] = None
+
+
+async def run_crawler(interval: float = CRAWL_INTERVAL, start_delay: float = CRAWL_START_DELAY):
+    """
+    Фоновый обход списков подписчиков CRAWL_TARGETS раз в interval секунд.
+    Обход идёт в своём пуле браузеров, который закрывается между обходами.
+    """
+    from browser_pool import shutdown_pool, CRAWLER
+    from check_subscriptions import crawl_instagram_followers, crawl_tiktok_followers
+    crawlers = {"instagram": crawl_instagram_followers, "tiktok": crawl_tiktok_followers}
+
+    await asyncio.sleep(start_delay)
+    while True:
+        for platform, targets in CRAWL_TARGETS.items():
+            crawl = crawlers.get(platform)
+            if crawl is None:
+                continue
+            for target in targets:
+                try:
+                    usernames, complete = await crawl(target)
+                except Exception as e:
+                    log.error(f"Обход подписчиков {platform}/{target} не удался: {e}")
+                    continue
+                if usernames:
+                    follower_index.merge_crawl(platform, target, usernames, complete)
+                    await follower_index.save_async(platform, target)
+        await shutdown_pool(CRAWLER)
+        await follower_index.save_all_async()
+        await asyncio.sleep(interval)
+
+
+def start_crawler():
+    global _crawler_task
+    if _crawler_task is None or _crawler_task.done():
+        _crawler_task = asyncio.create_task(run_crawler())
+
+
+async def stop_crawler():
+    """Прервать обход: иначе он держит слот пула CRAWLER, и shutdown_pool ждёт его до таймаута."""
+    global _crawler_task
+    if _crawler_task is None:
+        return
+    _crawler_task.cancel()
+    try:
+        await _crawler_task
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        log.error(f"Обход подписчиков завершился ошибкой: {e}")
+    _crawler_task = None
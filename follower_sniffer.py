@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import config
+from follow_cache import normalize_username
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("follower_sniffer")
+
+# Режим чтения списка подписчиков (можно переопределить в config.py):
+#   "network" — только JSON-ответы сайта, "dom" — только DOM,
+#   "auto" — JSON, а если ни одного ответа со списком не пришло — DOM
+EXTRACTION_MODE = getattr(config, "FOLLOWER_EXTRACTION", "auto")
+
+# URL запросов, которыми сайты подгружают список подписчиков.
+# Переопределяются в config.py, например чтобы указать на локальный стенд с записанными ответами.
+API_PATTERNS = getattr(config, "FOLLOWER_API_PATTERNS", {
+    "instagram": r"/api/v1/friendships/\d+/followers/",
+    "tiktok": r"/api/user/list/",
+})
+
+
+def parse_instagram_followers(payload: dict) -> Tuple[List[str], bool]:
+    """Ответ /friendships/<id>/followers/ -> (usernames, есть_ещё)."""
+    users = payload.get("users") or []
+    usernames = [u.get("username", "") for u in users if isinstance(u, dict)]
+    has_more = bool(payload.get("next_max_id")) or bool(payload.get("big_list") and payload.get("has_more"))
+    return usernames, has_more
+
+
+def parse_tiktok_followers(payload: dict) -> Tuple[List[str], bool]:
+    """Ответ /api/user/list/ -> (usernames, есть_ещё)."""
+    usernames = []
+    for item in payload.get("userList") or []:
+        user = item.get("user") if isinstance(item, dict) else None
+        if user and user.get("uniqueId"):
+            usernames.append(user["uniqueId"])
+    return usernames, bool(payload.get("hasMore"))
+
+
+PARSERS: Dict[str, Callable[[dict], Tuple[List[str], bool]]] = {
+    "instagram": parse_instagram_followers,
+    "tiktok": parse_tiktok_followers,
+}
+
+
+class FollowerSniffer:
+    """
+    Слушает page.on("response") и разбирает JSON со списком подписчиков.
+    found — искомый username пришёл в ответе, exhausted — сайт сообщил, что список закончился.
+    """
+
+    def __init__(self, platform: str, username: str, pattern: Optional[str] = None):
+        self.platform = platform
+        self.username = normalize_username(username)
+        self.pattern = re.compile(pattern or API_PATTERNS[platform])
+        self.parser = PARSERS[platform]
+        self.usernames = set()
+        self.responses = 0
+        self.found = False
+        self.exhausted = False
+        self._changed = asyncio.Event()
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+
+    def detach(self, page):
+        try:
+            page.remove_listener("response", self._on_response)
+        except Exception:
+            pass
+
+    async def _on_response(self, response):
+        if not self.pattern.search(response.url) or not response.ok:
+            return
+        try:
+            payload = await response.json()
+            usernames, has_more = self.parser(payload)
+        except Exception as e:
+            log.debug(f"Не удалось разобрать ответ {response.url}: {e}")
+            return
+
+        self.responses += 1
+        batch = {normalize_username(u) for u in usernames if u}
+        self.usernames |= batch
+        if self.username in batch:
+            self.found = True
+        if not has_more:
+            self.exhausted = True
+        self._changed.set()
+
+    @property
+    def done(self) -> bool:
+        return self.found or self.exhausted
+
+    async def wait(self, timeout: float) -> bool:
+        """Подождать до timeout секунд нового ответа со списком; True — ответ пришёл."""
+        if not self._changed.is_set():
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return False
+        self._changed.clear()
+        return True
+
+    def use_dom(self) -> bool:
+        """Нужно ли читать DOM в текущем режиме."""
+        if EXTRACTION_MODE == "dom":
+            return True
+        if EXTRACTION_MODE == "network":
+            return False
+        return self.responses == 0
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+import config
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("fsm_storage")
+
+# Настройки (можно переопределить в config.py)
+FSM_DB_FILE = getattr(config, "FSM_DB_FILE", "fsm.db")
+FSM_CACHE_SIZE = getattr(config, "FSM_CACHE_SIZE", 1000)
+FSM_FLUSH_INTERVAL = getattr(config, "FSM_FLUSH_INTERVAL", 1.0)
+# Анкета, которую не трогали дольше этого, считается брошенной и удаляется
+FSM_STATE_TTL = getattr(config, "FSM_STATE_TTL", 24 * 60 * 60)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fsm_updated_at ON fsm(updated_at);
+"""
+
+
+@dataclass
+class _Record:
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    updated_at: float = 0.0
+
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+def _key(key: StorageKey) -> str:
+    return ":".join(str(part) if part is not None else "" for part in (
+        key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny))
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM-хранилище aiogram в SQLite: анкета переживает перезапуск бота.
+    Горячие ключи держатся в LRU в памяти; изменения копятся и пишутся в базу
+    пачкой раз в flush_interval (write-behind). Брошенные анкеты удаляются по TTL.
+    """
+
+    def __init__(self, path: str = FSM_DB_FILE, cache_size: int = FSM_CACHE_SIZE,
+                 flush_interval: float = FSM_FLUSH_INTERVAL, ttl: float = FSM_STATE_TTL):
+        self.path = path
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        # ключ -> запись, ещё не сброшенная в базу (пустая запись = удалить строку)
+        self._dirty: Dict[str, _Record] = {}
+        # все обращения к базе идут из одного потока со своим соединением
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-storage")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._closed = False
+
+    # ---------------- BaseStorage ----------------
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._touch(_key(key), record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            )
+        record = await self._record(key)
+        record.data = data.copy()
+        self._touch(_key(key), record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._record(key)).data.copy()
+
+    async def close(self) -> None:
+        # aiogram закрывает хранилище сам после polling, main.py — при любом режиме
+        if self._closed:
+            return
+        self._closed = True
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+        await self._run(self._close)
+        self._executor.shutdown(wait=True)
+
+    # ---------------- кэш ----------------
+    async def _record(self, key: StorageKey) -> _Record:
+        k = _key(key)
+        record = self._cache.get(k)
+        if record is None:
+            record = self._dirty.get(k)
+        if record is None:
+            loaded = await self._run(self._load, k)
+            # пока читали базу, параллельный вызов мог уже завести запись и изменить её
+            record = self._cache.get(k) or self._dirty.get(k) or loaded or _Record()
+        if record.updated_at and record.updated_at < time.time() - self.ttl:
+            # анкета брошена: начинаем с чистого листа
+            record = _Record()
+            self._touch(k, record)
+        self._cache[k] = record
+        self._cache.move_to_end(k)
+        self._evict()
+        return record
+
+    def _touch(self, k: str, record: _Record):
+        record.updated_at = time.time()
+        self._dirty[k] = record
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    def _evict(self):
+        # несброшенные записи остаются в _dirty, так что из LRU их можно выкидывать
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # ---------------- write-behind ----------------
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error(f"Не удалось сбросить FSM в {self.path}: {e}")
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            batch, self._dirty = self._dirty, {}
+            rows = [(k, r.state, json.dumps(r.data, ensure_ascii=False), r.updated_at, r.empty)
+                    for k, r in batch.items()]
+            try:
+                await self._run(self._write, rows)
+            except Exception:
+                # вернём несохранённое, если за это время ключ не изменили снова
+                for k, record in batch.items():
+                    self._dirty.setdefault(k, record)
+                raise
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # ---------------- база (поток fsm-storage) ----------------
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _load(self, k: str) -> Optional[_Record]:
+        row = self._connect().execute("SELECT state, data, updated_at FROM fsm WHERE key = ?", (k,)).fetchone()
+        if row is None:
+            return None
+        return _Record(state=row[0], data=json.loads(row[1]), updated_at=row[2])
+
+    def _write(self, rows: List[Tuple[str, Optional[str], str, float, bool]]):
+        conn = self._connect()
+        with conn:
+            conn.executemany("DELETE FROM fsm WHERE key = ?", [(k,) for k, _, _, _, empty in rows if empty])
+            conn.executemany(
+                "INSERT INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data, "
+                "updated_at = excluded.updated_at",
+                [(k, state, data, updated_at) for k, state, data, updated_at, empty in rows if not empty],
+            )
+            expired = conn.execute("DELETE FROM fsm WHERE updated_at < ?", (time.time() - self.ttl,)).rowcount
+        if expired:
+            log.info(f"Удалено брошенных анкет: {expired}")
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -1,5 +1,23 @@
+from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+
+# Данные кнопок с параметрами: "<префикс>:<поле>:..." — префикс ищется в таблице обработчиков,
+# поля короткие, так что 64 байта callback_data хватает при любой длине username
+class AdminDecision(CallbackData, prefix="ad"):
+    chat_id: int
+    reason: str = ""  # пусто — принять, иначе номер причины отказа
+
+
+class DigestPage(CallbackData, prefix="dp"):
+    digest_id: int
+    page: int
+
+
+class DigestOpen(CallbackData, prefix="do"):
+    chat_id: int
+
+
 # Кнопка старта
 start_kbd = InlineKeyboardMarkup(inline_keyboard=[
     [InlineKeyboardButton(text='Так ✅', callback_data='start_yes')],
@@ -11,15 +29,14 @@ back_kbds = InlineKeyboardMarkup(inline_keyboard=[
     [InlineKeyboardButton(text='Повернутися', callback_data='previous_start_message')],
 ])
 
-# Кнопки администратора
-def admin_choices_kbd(chat_id: int, username: str) -> InlineKeyboardMarkup:
-    safe_username = username.replace('_', '__')
+# Кнопки администратора (username подтягивается из базы при нажатии)
+def admin_choices_kbd(chat_id: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="✅ Прийняти", callback_data=f"admin_accept_{chat_id}_{safe_username}")],
-        [InlineKeyboardButton(text="❌ Відхилити 'Сценарій'", callback_data=f"admin_reject_1_{chat_id}_{safe_username}")],
-        [InlineKeyboardButton(text="❌ Відхилити 'Не всі кроки'", callback_data=f"admin_reject_2_{chat_id}_{safe_username}")],
-        [InlineKeyboardButton(text="❌ Відхилити 'Підпіска на соц. мереж.'", callback_data=f"admin_reject_3_{chat_id}_{safe_username}")],
-        [InlineKeyboardButton(text="❌ Відхилити 'Макс. кількість'", callback_data=f"admin_reject_4_{chat_id}_{safe_username}")],
+        [InlineKeyboardButton(text="✅ Прийняти", callback_data=AdminDecision(chat_id=chat_id).pack())],
+        [InlineKeyboardButton(text="❌ Відхилити 'Сценарій'", callback_data=AdminDecision(chat_id=chat_id, reason="1").pack())],
+        [InlineKeyboardButton(text="❌ Відхилити 'Не всі кроки'", callback_data=AdminDecision(chat_id=chat_id, reason="2").pack())],
+        [InlineKeyboardButton(text="❌ Відхилити 'Підпіска на соц. мереж.'", callback_data=AdminDecision(chat_id=chat_id, reason="3").pack())],
+        [InlineKeyboardButton(text="❌ Відхилити 'Макс. кількість'", callback_data=AdminDecision(chat_id=chat_id, reason="4").pack())],
 
     ])
 
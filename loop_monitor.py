@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from aiogram import BaseMiddleware
+
+import config
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("loop_monitor")
+
+# Настройки (можно переопределить в config.py)
+HEARTBEAT_INTERVAL = getattr(config, "LOOP_HEARTBEAT_INTERVAL", 0.5)
+LAG_WARN = getattr(config, "LOOP_LAG_WARN", 0.1)
+SUMMARY_INTERVAL = getattr(config, "LOOP_SUMMARY_INTERVAL", 5 * 60)
+# Детектор блокирующих вызовов (поток-сторож со снятием стека) — включается явно
+SLOW_CALLBACK_DETECTOR = getattr(config, "SLOW_CALLBACK_DETECTOR", False)
+SLOW_CALLBACK_THRESHOLD = getattr(config, "SLOW_CALLBACK_THRESHOLD", 0.2)
+LAG_SAMPLES = 600
+SLOW_EVENTS = 50
+
+
+class LoopMonitor:
+    """
+    Замер задержки планирования event loop: heartbeat-задача спит interval и смотрит,
+    насколько позже её разбудили. Опциональный поток-сторож замечает, что heartbeat
+    просрочен больше threshold, и снимает стек потока loop и имя выполняющегося хэндлера.
+    """
+
+    def __init__(self, interval: float = HEARTBEAT_INTERVAL, warn: float = LAG_WARN,
+                 detector: bool = SLOW_CALLBACK_DETECTOR, threshold: float = SLOW_CALLBACK_THRESHOLD,
+                 summary_interval: float = SUMMARY_INTERVAL):
+        self.interval = interval
+        self.warn = warn
+        self.detector = detector
+        self.threshold = threshold
+        self.summary_interval = summary_interval
+        self._lags: Deque[float] = deque(maxlen=LAG_SAMPLES)
+        self._slow: Deque[dict] = deque(maxlen=SLOW_EVENTS)
+        self._slow_total = 0
+        self._max_lag = 0.0
+        # задача -> имя хэндлера aiogram, который она сейчас выполняет (заполняет middleware)
+        self.handlers: Dict[asyncio.Task, str] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._due = 0.0  # когда heartbeat должен проснуться (time.monotonic)
+        self._stall: Optional[dict] = None  # блокировка, замеченная сторожем, ждёт своей длительности
+        self._tasks = []
+        self._stop = threading.Event()
+        # админка читает статистику из loop, а сторож (поток loop-watchdog) её пишет
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._due = time.monotonic() + self.interval
+        self._tasks = [asyncio.create_task(self._heartbeat()), asyncio.create_task(self._summary())]
+        if self.detector:
+            threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+            log.info(f"Детектор блокирующих вызовов включён (порог {self.threshold} сек)")
+
+    def stop(self):
+        self._stop.set()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _heartbeat(self):
+        while True:
+            start = time.monotonic()
+            self._due = start + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - self._due)
+            with self._lock:
+                self._lags.append(lag)
+                self._max_lag = max(self._max_lag, lag)
+                stall, self._stall = self._stall, None
+                if stall:
+                    stall["duration"] = round(lag, 3)
+                    self._slow.append(stall)
+                    self._slow_total += 1
+            if stall:
+                log.warning(f"Event loop заблокирован на {lag:.3f} сек в {stall['handler']}:\n{stall['stack']}")
+            elif lag > self.warn:
+                log.warning(f"Задержка event loop {lag:.3f} сек")
+
+    def _watch(self):
+        reported_due = None
+        while not self._stop.wait(self.threshold / 4):
+            due = self._due
+            if due == reported_due or time.monotonic() - due < self.threshold:
+                continue
+            # loop не разбудил heartbeat вовремя — значит, сейчас кто-то держит поток loop
+            reported_due = due
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stall = {
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "handler": self._running_handler(),
+                "stack": "".join(traceback.format_stack(frame)) if frame else "",
+            }
+            with self._lock:
+                self._stall = stall
+
+    def _running_handler(self) -> str:
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        if task is None:
+            return "<callback вне задачи>"
+        name = self.handlers.get(task)
+        if name:
+            return name
+        coro = task.get_coro()
+        return getattr(coro, "__qualname__", task.get_name())
+
+    async def _summary(self):
+        while True:
+            await asyncio.sleep(self.summary_interval)
+            s = self.stats()
+            log.info(
+                f"Event loop: задержка p50={s['lag_p50']} p95={s['lag_p95']} max={s['lag_max']} сек, "
+                f"блокировок {s['slow_total']}"
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            lags = sorted(self._lags)
+            slow = list(self._slow)
+            slow_total = self._slow_total
+            max_lag = self._max_lag
+
+        def pct(p: float) -> Optional[float]:
+            if not lags:
+                return None
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))], 4)
+
+        return {
+            "samples": len(lags),
+            "lag_last": round(self._lags[-1], 4) if self._lags else None,
+            "lag_p50": pct(0.5),
+            "lag_p95": pct(0.95),
+            "lag_max": round(max_lag, 4),
+            "detector": self.detector,
+            "slow_total": slow_total,
+            "slow_recent": slow,
+        }
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """Запоминает, какой хэндлер выполняет текущая задача, — для отчёта о блокировке."""
+
+    def __init__(self, monitor: LoopMonitor):
+        self.monitor = monitor
+
+    async def __call__(self, handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
+                       event: Any, data: Dict[str, Any]) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        name = getattr(callback, "__name__", type(event).__name__)
+        task = asyncio.current_task()
+        self.monitor.handlers[task] = name
+        try:
+            return await handler(event, data)
+        finally:
+            self.monitor.handlers.pop(task, None)
+
+
+loop_monitor = LoopMonitor()
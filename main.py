@@ -1,26 +1,82 @@
 # main.py
 import asyncio
-from threading import Thread
 import logging
-from admin import run_flask
-from tg_bot import run_bot
+import signal
+from admin import start_admin
+from tg_bot import run_bot, dp, admin_notifier, webhook_server
+from browser_pool import shutdown_pool
+from verification_queue import stop_workers
+from follow_cache import follow_cache
+from follower_index import follower_index, stop_crawler
+from resource_policy import resource_stats
+from storage import writer
+from outbox import outbound_limiter
+from loop_monitor import loop_monitor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def start_flask_thread():
-    flask_thread = Thread(target=run_flask, daemon=True)
-    flask_thread.start()
-    logger.info("✅ Flask сервер запущен в отдельном потоке")
+async def main():
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    # сигналы ловим сами (polling запускается с handle_signals=False), чтобы дойти до shutdown()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
 
-if __name__ == "__main__":
+    admin_runner = None
+    bot_task = None
     try:
-        loop = asyncio.get_event_loop()  # глобальный loop
-        loop.create_task(run_bot())      # запускаем бота в этом loop
-        start_flask_thread()             # запускаем Flask в отдельном потоке
+        admin_runner = await start_admin()  # админка в том же loop
         logger.info("🚀 Запуск Telegram-бота...")
-        loop.run_forever()               # запускаем loop
-    except KeyboardInterrupt:
-        logger.info("🛑 Приложение остановлено пользователем")
-    except Exception as e:
-        logger.exception(f"❌ Ошибка запуска: {e}")
+        bot_task = asyncio.create_task(run_bot())
+        stop_task = asyncio.create_task(stop.wait())
+        # бот завершился сам (например, ошибка запуска) или пришёл сигнал
+        await asyncio.wait([bot_task, stop_task], return_when=asyncio.FIRST_COMPLETED)
+        stop_task.cancel()
+        if stop.is_set():
+            logger.info("🛑 Приложение остановлено пользователем")
+    finally:
+        await shutdown(admin_runner, bot_task)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+
+async def shutdown(admin_runner, bot_task):
+    # останавливаем приём апдейтов (polling / webhook)
+    if bot_task is not None:
+        if not bot_task.done():
+            try:
+                # polling останавливаем штатно: aiogram дождётся своих задач
+                await dp.stop_polling()
+            except RuntimeError:
+                # polling ещё не запущен или бот в режиме webhook
+                bot_task.cancel()
+        try:
+            await bot_task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.exception(f"❌ Ошибка запуска: {e}")
+    # закрываем админку: новые действия больше не принимаются
+    if admin_runner is not None:
+        await admin_runner.cleanup()
+    # дожидаемся апдейтов, уже принятых через webhook
+    await webhook_server.stop()
+    # дожидаемся рассылок админам и отправляем недособранную сводку
+    await admin_notifier.stop()
+    # останавливаем очередь проверок и обход подписчиков, затем закрываем браузеры пулов
+    await stop_workers()
+    await stop_crawler()
+    await shutdown_pool()
+    # больше никто не отправляет — останавливаем раздачу токенов outbox
+    await outbound_limiter.close()
+    # дописываем изменения из очереди писателя базы
+    await writer.stop()
+    # сбрасываем несохранённые состояния анкет
+    await dp.storage.close()
+    follow_cache.save()
+    follower_index.save_all()
+    loop_monitor.stop()
+    logger.info(f"📊 Трафик браузеров проверок: {resource_stats()}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,251 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple, Union
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramEntityTooLarge, TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.methods import TelegramMethod
+
+import config
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("outbox")
+
+# Лимиты Bot API (можно переопределить в config.py)
+GLOBAL_RATE = getattr(config, "TG_GLOBAL_RATE", 25)  # сообщений/сек на бота
+GLOBAL_BURST = getattr(config, "TG_GLOBAL_BURST", 25)
+CHAT_RATE = getattr(config, "TG_CHAT_RATE", 1.0)  # сообщений/сек в личный чат
+CHAT_BURST = getattr(config, "TG_CHAT_BURST", 3)
+GROUP_RATE = getattr(config, "TG_GROUP_RATE", 20 / 60)  # группы: 20 сообщений/мин
+MAX_RETRIES = getattr(config, "TG_MAX_RETRIES", 3)
+MAX_BACKOFF = 30
+# Как часто выбрасывать вёдра чатов, которые успели наполниться (сек)
+BUCKET_PRUNE_INTERVAL = getattr(config, "TG_BUCKET_PRUNE_INTERVAL", 60)
+
+
+class Lane(IntEnum):
+    """Полосы приоритета: меньше — раньше."""
+    REPLY = 0  # ответы пользователю в диалоге
+    NOTICE = 1  # решения модераторов пользователям
+    ADMIN = 2  # уведомления админам
+
+
+current_lane: ContextVar[Lane] = ContextVar("outbox_lane", default=Lane.REPLY)
+
+
+@contextmanager
+def use_lane(lane: Lane):
+    """Все отправки внутри блока (и в задачах, созданных в нём) идут в полосе lane."""
+    token = current_lane.set(lane)
+    try:
+        yield
+    finally:
+        current_lane.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+    def delay(self, now: float) -> float:
+        """Через сколько секунд будет доступен токен (0 — уже доступен)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def drain(self, now: float, seconds: float):
+        """Не выдавать токены seconds секунд (после retry_after)."""
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+ChatId = Union[int, str]
+
+
+class OutboundLimiter(BaseRequestMiddleware):
+    """
+    Middleware сессии бота: каждый исходящий запрос с chat_id (send_message, message.answer,
+    edit_text, ...) ждёт своей очереди. Глобальный token bucket на бота, отдельный на чат,
+    очередь ожидающих упорядочена по полосе (Lane), затем по времени поступления.
+    TelegramRetryAfter останавливает отправку в чат (и весь бот) на retry_after и повторяет запрос,
+    сетевые/серверные ошибки повторяются с экспоненциальной задержкой, не больше max_retries раз.
+    Запросы без chat_id (getUpdates, answerCallbackQuery, ...) проходят без ожидания.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, global_burst: float = GLOBAL_BURST,
+                 chat_rate: float = CHAT_RATE, chat_burst: float = CHAT_BURST,
+                 group_rate: float = GROUP_RATE, max_retries: int = MAX_RETRIES):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_burst)
+        self._chats: Dict[ChatId, TokenBucket] = {}
+        self._pruned_at = time.monotonic()
+        # (полоса, порядковый номер, chat_id, future)
+        self._waiters: List[Tuple[int, int, ChatId, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._grantor: Optional[asyncio.Task] = None
+        self.counters: Counter = Counter()
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot, method: TelegramMethod):
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        lane = current_lane.get()
+        attempt = 0
+        while True:
+            await self._acquire(chat_id, lane)
+            try:
+                response = await make_request(bot, method)
+                self.counters["sent"] += 1
+                return response
+            except TelegramRetryAfter as e:
+                attempt += 1
+                self.counters["retry_after"] += 1
+                self._penalize(chat_id, e.retry_after)
+                if attempt > self.max_retries:
+                    self.counters["dropped"] += 1
+                    raise
+                log.warning(f"{type(method).__name__} в чат {chat_id}: retry_after {e.retry_after} сек, "
+                            f"попытка {attempt}/{self.max_retries}")
+            except TelegramEntityTooLarge:
+                raise
+            except (TelegramNetworkError, TelegramServerError) as e:
+                attempt += 1
+                self.counters["errors"] += 1
+                if attempt > self.max_retries:
+                    self.counters["dropped"] += 1
+                    raise
+                backoff = min(MAX_BACKOFF, 2 ** attempt)
+                log.warning(f"{type(method).__name__} в чат {chat_id}: {e}, повтор через {backoff} сек")
+                await asyncio.sleep(backoff)
+
+    # ---------------- очередь ----------------
+    def _bucket(self, chat_id: ChatId) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            private = isinstance(chat_id, int) and chat_id > 0
+            bucket = TokenBucket(self.chat_rate if private else self.group_rate, self.chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _penalize(self, chat_id: ChatId, seconds: float):
+        now = time.monotonic()
+        self._bucket(chat_id).drain(now, seconds)
+        # 429 чаще всего означает общий лимит бота — притормаживаем всех
+        self._global.drain(now, seconds)
+
+    def _prune(self, now: float):
+        """Выбросить вёдра чатов, наполнившиеся до burst: новое ведро будет точно таким же."""
+        if now - self._pruned_at < BUCKET_PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        waiting = {w[2] for w in self._waiters}
+        idle = [chat_id for chat_id, bucket in self._chats.items()
+                if chat_id not in waiting and bucket.full(now)]
+        for chat_id in idle:
+            del self._chats[chat_id]
+
+    async def _acquire(self, chat_id: ChatId, lane: int):
+        self._prune(time.monotonic())
+        if self._grantor is None or self._grantor.done():
+            self._wakeup = asyncio.Event()
+            self._grantor = asyncio.create_task(self._grant_loop())
+            self._grantor.add_done_callback(self._grantor_done)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(lane), next(self._seq), chat_id, future))
+        self._wakeup.set()
+        await future
+
+    async def _grant_loop(self):
+        while True:
+            self._wakeup.clear()
+            if any(w[3].done() for w in self._waiters):
+                # отменённые ожидания (например, хэндлер прервали)
+                self._waiters = [w for w in self._waiters if not w[3].done()]
+                heapq.heapify(self._waiters)
+            if not self._waiters:
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            chosen, wait = None, float("inf")
+            for waiter in sorted(self._waiters):
+                delay = self._bucket(waiter[2]).delay(now)
+                if delay <= 0:
+                    chosen = waiter
+                    break
+                wait = min(wait, delay)
+            if chosen is not None:
+                wait = self._global.delay(now)
+            if chosen is None or wait > 0:
+                # ждём токен или нового (возможно, более приоритетного) ожидающего
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._global.take(now)
+            self._bucket(chosen[2]).take(now)
+            self._waiters.remove(chosen)
+            heapq.heapify(self._waiters)
+            chosen[3].set_result(None)
+
+    @staticmethod
+    def _grantor_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            # следующий _acquire запустит раздачу заново
+            log.error(f"Раздача токенов outbox упала: {task.exception()!r}")
+
+    async def close(self):
+        """Остановить раздачу токенов; ещё ждущие отправки отменяются."""
+        if self._grantor is not None:
+            self._grantor.cancel()
+            await asyncio.gather(self._grantor, return_exceptions=True)
+            self._grantor = None
+        for waiter in self._waiters:
+            waiter[3].cancel()
+        self._waiters = []
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "waiting": len(self._waiters),
+            "chats": len(self._chats),
+            "waiting_by_lane": dict(Counter(Lane(w[0]).name for w in self._waiters)),
+        }
+
+
+async def send_in_lane(bot, lane: Lane, chat_id: ChatId, text: str, **kwargs):
+    """bot.send_message в заданной полосе (для отправок вне хэндлеров, например из админки)."""
+    with use_lane(lane):
+        return await bot.send_message(chat_id, text, **kwargs)
+
+
+outbound_limiter = OutboundLimiter()
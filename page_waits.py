@@ -0,0 +1,107 @@
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+import config
+
+
+# Суммарный бюджет "человеческих" пауз на одну проверку, сек (0 — без пауз)
+JITTER_BUDGET = getattr(config, "HUMANIZE_JITTER_BUDGET", 8.0)
+# Сколько раз подряд список должен упереться в конец без новых строк, чтобы считать его исчерпанным
+LIST_END_CONFIRMATIONS = getattr(config, "LIST_END_CONFIRMATIONS", 2)
+
+
+class Jitter:
+    """Случайные паузы для имитации человека, ограниченные общим бюджетом на проверку."""
+
+    def __init__(self, budget: float = JITTER_BUDGET):
+        self.remaining = max(0.0, float(budget))
+
+    async def pause(self, low: float, high: float):
+        delay = min(random.uniform(low, high), self.remaining)
+        if delay <= 0:
+            return
+        self.remaining -= delay
+        await asyncio.sleep(delay)
+
+
+# Прокрутить контейнер списка и дождаться (MutationObserver) появления новых строк.
+# Возвращает {grew, atEnd, rootFound, rows}: grew — появились новые элементы, atEnd — контейнер
+# прокручен до конца, rootFound — контейнер списка есть на странице, rows — непустых строк в нём.
+_SCROLL_AND_WAIT_JS = r"""
+async ({rootSelector, rowSelector, step, timeout}) => {
+  const root = rootSelector ? document.querySelector(rootSelector) : null;
+  const isScrollable = (el) => el && el.scrollHeight > el.clientHeight + 1
+    && /(auto|scroll)/.test(getComputedStyle(el).overflowY);
+  let box = document.scrollingElement;
+  if (root) {
+    box = isScrollable(root) ? root : (Array.from(root.querySelectorAll('*')).find(isScrollable) || root);
+  }
+
+  const grew = await new Promise((resolve) => {
+    let timer = null;
+    const observer = new MutationObserver((mutations) => {
+      for (const m of mutations) {
+        for (const node of m.addedNodes) {
+          if (node.nodeType === 1) {
+            observer.disconnect();
+            clearTimeout(timer);
+            resolve(true);
+            return;
+          }
+        }
+      }
+    });
+    observer.observe(root || document.body, {childList: true, subtree: true});
+    timer = setTimeout(() => { observer.disconnect(); resolve(false); }, timeout);
+    box.scrollBy(0, step);
+  });
+
+  const atEnd = box.scrollTop + box.clientHeight >= box.scrollHeight - 2;
+  const rows = rowSelector
+    ? Array.from((root || document).querySelectorAll(rowSelector)).filter((el) => el.textContent.trim()).length
+    : 0;
+  return {grew, atEnd, rootFound: !rootSelector || !!root, rows};
+}
+"""
+
+
+@dataclass
+class ScrollResult:
+    grew: bool
+    at_end: bool
+    root_found: bool = False
+    rows: int = 0
+
+
+async def scroll_and_wait(page, root_selector: Optional[str] = None, step: int = 800, timeout: float = 3.0,
+                          row_selector: Optional[str] = None) -> ScrollResult:
+    """Прокрутка + ожидание новых строк: возвращается сразу, как только список дорисовался."""
+    result = await page.evaluate(_SCROLL_AND_WAIT_JS, {
+        "rootSelector": root_selector,
+        "rowSelector": row_selector,
+        "step": step,
+        "timeout": int(timeout * 1000),
+    })
+    return ScrollResult(grew=result["grew"], at_end=result["atEnd"],
+                        root_found=result["rootFound"], rows=result["rows"])
+
+
+class ListEndDetector:
+    """
+    Список исчерпан, если несколько прокруток подряд упёрлись в конец без новых строк.
+    Конец засчитывается, только если контейнер списка найден и в нём есть строки: иначе
+    прокручивалась сама страница (модалка не открылась), и «конец» ничего не говорит о списке.
+    """
+
+    def __init__(self, confirmations: int = LIST_END_CONFIRMATIONS):
+        self.confirmations = max(1, int(confirmations))
+        self._hits = 0
+
+    def update(self, result: ScrollResult) -> bool:
+        if result.root_found and result.rows and result.at_end and not result.grew:
+            self._hits += 1
+        else:
+            self._hits = 0
+        return self._hits >= self.confirmations
@@ -0,0 +1,147 @@
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import config
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("proxy_manager")
+
+# Настройки (можно переопределить в config.py)
+FAILURE_THRESHOLD = getattr(config, "PROXY_FAILURE_THRESHOLD", 3)
+COOLDOWN = getattr(config, "PROXY_COOLDOWN", 5 * 60)
+STICKY = getattr(config, "PROXY_STICKY", True)
+LATENCY_ALPHA = 0.3  # вес нового замера в скользящей средней задержки
+
+
+@dataclass
+class ProxyHealth:
+    key: str
+    successes: int = 0
+    failures: int = 0
+    captchas: int = 0
+    consecutive_failures: int = 0
+    latency: Optional[float] = None  # EWMA, сек
+    open_until: float = 0.0  # circuit breaker открыт до этого момента
+
+    @property
+    def success_rate(self) -> float:
+        # сглаживание, чтобы новый прокси не получал вес 0 или 1
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def is_open(self, now: float) -> bool:
+        return self.open_until > now
+
+    def weight(self) -> float:
+        latency = self.latency if self.latency is not None else 10.0
+        captcha_penalty = 1.0 / (1 + self.captchas / max(1, self.successes))
+        return max(0.01, self.success_rate * captcha_penalty / (1 + latency / 10))
+
+    def as_dict(self, now: float) -> dict:
+        return {
+            "proxy": self.key,
+            "successes": self.successes,
+            "failures": self.failures,
+            "captchas": self.captchas,
+            "success_rate": round(self.success_rate, 3),
+            "latency": round(self.latency, 2) if self.latency is not None else None,
+            "circuit": "open" if self.is_open(now) else "closed",
+            "open_for": max(0, round(self.open_until - now)),
+        }
+
+
+def _proxy_key(p: dict) -> str:
+    return f"{p['host']}:{p['port']}"
+
+
+def _to_playwright(p: dict) -> dict:
+    proxy = {
+        "server": f"http://{p['host']}:{p['port']}",
+    }
+    if p.get("username") and p.get("password"):
+        proxy["username"] = p["username"]
+        proxy["password"] = p["password"]
+    return proxy
+
+
+class ProxyManager:
+    """
+    Выбор прокси с учётом здоровья: вес по доле успехов, задержке и капчам,
+    circuit breaker с остыванием для падающих прокси, опционально — липкий прокси на identity.
+    """
+
+    def __init__(self, proxies: List[dict], failure_threshold: int = FAILURE_THRESHOLD,
+                 cooldown: float = COOLDOWN, sticky: bool = STICKY):
+        self._proxies: Dict[str, dict] = {_proxy_key(p): p for p in proxies}
+        self._health: Dict[str, ProxyHealth] = {key: ProxyHealth(key) for key in self._proxies}
+        self._sticky: Dict[str, str] = {}
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.sticky = sticky
+
+    def pick(self, identity: Optional[str] = None) -> Optional[dict]:
+        """Прокси в формате Playwright или None, если прокси не настроены."""
+        if not self._proxies:
+            return None
+        now = time.time()
+        key = self._sticky.get(identity) if (self.sticky and identity) else None
+        if key is None or self._health[key].is_open(now):
+            key = self._choose(now)
+            if self.sticky and identity:
+                self._sticky[identity] = key
+        return _to_playwright(self._proxies[key])
+
+    def _choose(self, now: float) -> str:
+        closed = [h for h in self._health.values() if not h.is_open(now)]
+        if not closed:
+            # все прокси "открыты" — пробуем тот, что остынет раньше всех (half-open)
+            return min(self._health.values(), key=lambda h: h.open_until).key
+        return random.choices(closed, weights=[h.weight() for h in closed])[0].key
+
+    def _get(self, proxy: Optional[dict]) -> Optional[ProxyHealth]:
+        if not proxy:
+            return None
+        server = proxy.get("server", "")
+        return self._health.get(server.split("://", 1)[-1])
+
+    def record(self, proxy: Optional[dict], ok: bool, latency: Optional[float] = None):
+        health = self._get(proxy)
+        if health is None:
+            return
+        if ok:
+            health.successes += 1
+            health.consecutive_failures = 0
+            if latency is not None:
+                health.latency = latency if health.latency is None else (
+                    LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * health.latency)
+        else:
+            health.failures += 1
+            self._fail(health)
+
+    def record_captcha(self, proxy: Optional[dict]):
+        health = self._get(proxy)
+        if health is None:
+            return
+        health.captchas += 1
+        self._fail(health)
+
+    def _fail(self, health: ProxyHealth):
+        health.consecutive_failures += 1
+        if health.consecutive_failures >= self.failure_threshold:
+            health.open_until = time.time() + self.cooldown
+            health.consecutive_failures = 0
+            log.warning(f"Прокси {health.key} отключён на {self.cooldown} сек (circuit open)")
+
+    def is_healthy(self, proxy: Optional[dict]) -> bool:
+        health = self._get(proxy)
+        return health is None or not health.is_open(time.time())
+
+    def stats(self) -> List[dict]:
+        now = time.time()
+        return [h.as_dict(now) for h in self._health.values()]
+
+
+proxy_manager = ProxyManager(config.PROXIES or [])
@@ -0,0 +1,98 @@
+import logging
+import re
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Set, Tuple
+
+import config
+from storage import store
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("registration_index")
+
+# Сколько держится бронь номера, пока пользователь заполняет анкету (можно переопределить в config.py)
+RESERVATION_TTL = getattr(config, "PHONE_RESERVATION_TTL", 60 * 60)
+
+
+def normalize_phone(phone: str) -> str:
+    """'+380 (73) 573-30-94' и '380735733094' — один и тот же номер."""
+    return re.sub(r"\D", "", phone or "")
+
+
+class RegistrationIndex:
+    """
+    Индекс зарегистрированных телефонов / chat_id в памяти.
+    Строится один раз при старте, дальше обновляется вместе с записью в базу.
+    Номер бронируется на время заполнения анкеты, чтобы два человека не зарегистрировали его одновременно.
+    """
+
+    def __init__(self, reservation_ttl: float = RESERVATION_TTL):
+        self.reservation_ttl = reservation_ttl
+        self._phones: Dict[str, int] = {}
+        self._chat_phones: Dict[int, Set[str]] = defaultdict(set)
+        # phone -> (chat_id, expires_at)
+        self._reservations: Dict[str, Tuple[int, float]] = {}
+        self._next_prune = 0.0
+        # все вызовы идут из loop бота/админки, а внутри методов нет await — лок не нужен
+
+    def load(self, rows: Iterable[dict]):
+        self._phones.clear()
+        self._chat_phones.clear()
+        for row in rows:
+            self._add(row)
+        log.info(f"Индекс регистраций: {len(self._phones)} телефонов, {len(self._chat_phones)} chat_id")
+
+    def _add(self, row: dict):
+        chat_id = int(row["chat_id"])
+        phone = normalize_phone(row.get("Телефон", ""))
+        if phone:
+            self._phones[phone] = chat_id
+            self._chat_phones[chat_id].add(phone)
+            self._reservations.pop(phone, None)
+
+    def reserve(self, phone: str, chat_id: int) -> bool:
+        """Забронировать номер за chat_id. False — номер уже зарегистрирован или занят другим."""
+        phone = normalize_phone(phone)
+        now = time.time()
+        self._prune(now)
+        if phone in self._phones:
+            return False
+        holder = self._reservations.get(phone)
+        if holder and holder[0] != chat_id and holder[1] > now:
+            return False
+        self._reservations[phone] = (chat_id, now + self.reservation_ttl)
+        return True
+
+    def _prune(self, now: float):
+        # брошенные анкеты: брони с истёкшим сроком (не чаще раза в минуту)
+        if now < self._next_prune:
+            return
+        self._next_prune = now + 60
+        for phone in [p for p, (_, expires_at) in self._reservations.items() if expires_at <= now]:
+            del self._reservations[phone]
+
+    def release(self, phone: str, chat_id: int):
+        """Снять бронь chat_id с номера (пользователь начал анкету заново или сменил номер)."""
+        phone = normalize_phone(phone)
+        holder = self._reservations.get(phone)
+        if holder and holder[0] == chat_id:
+            del self._reservations[phone]
+
+    def commit(self, row: dict):
+        """Заявка записана в базу — номер из брони становится зарегистрированным."""
+        self._add(row)
+
+    def remove_chat(self, chat_id: int):
+        """Заявки пользователя удалены — освобождаем его номера."""
+        chat_id = int(chat_id)
+        for phone in self._chat_phones.pop(chat_id, set()):
+            self._phones.pop(phone, None)
+
+    def clear(self):
+        self._phones.clear()
+        self._chat_phones.clear()
+
+
+registration_index = RegistrationIndex()
+registration_index.load(store.all())
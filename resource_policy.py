@@ -0,0 +1,113 @@
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+from urllib.parse import urlparse
+
+import config
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("resource_policy")
+
+# Блокировка тяжёлых ресурсов в контекстах проверок (можно выключить в config.py)
+BLOCKING_ENABLED = getattr(config, "RESOURCE_BLOCKING", True)
+
+# Аналитика и трекинг, без которых список подписчиков грузится так же
+ANALYTICS_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "sentry.io",
+    "mon.tiktokv.com",
+    "mon-va.byteoversea.com",
+    "mcs.tiktokw.us",
+    "mcs-va.tiktokv.com",
+    "analytics.tiktok.com",
+)
+
+
+@dataclass
+class ResourcePolicy:
+    block_types: Tuple[str, ...] = ("image", "media", "font")
+    block_hosts: Tuple[str, ...] = ANALYTICS_HOSTS
+    # URL, которые пропускаются всегда (регулярные выражения)
+    allow: Tuple[str, ...] = ()
+    _allow_re: Tuple[re.Pattern, ...] = field(default=(), init=False, repr=False)
+
+    def __post_init__(self):
+        self._allow_re = tuple(re.compile(p) for p in self.allow)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if any(p.search(url) for p in self._allow_re):
+            return False
+        if resource_type in self.block_types:
+            return True
+        host = urlparse(url).hostname or ""
+        return any(host == h or host.endswith("." + h) for h in self.block_hosts)
+
+
+POLICIES: Dict[str, ResourcePolicy] = {
+    "instagram": ResourcePolicy(
+        allow=tuple(getattr(config, "INSTAGRAM_RESOURCE_ALLOWLIST", ())),
+    ),
+    "tiktok": ResourcePolicy(
+        # картинки капчи нужны, чтобы кнопка закрытия капчи отрисовалась
+        allow=tuple(getattr(config, "TIKTOK_RESOURCE_ALLOWLIST", (r"captcha", r"verify"))),
+    ),
+}
+
+
+class ResourceStats:
+    """Счётчики запросов по платформе: пропущено/заблокировано и принятые байты."""
+
+    def __init__(self):
+        self.requests = 0
+        self.blocked = 0
+        self.bytes_received = 0
+        self.blocked_by_type: Counter = Counter()
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "blocked": self.blocked,
+            "bytes_received": self.bytes_received,
+            "blocked_by_type": dict(self.blocked_by_type),
+        }
+
+
+stats: Dict[str, ResourceStats] = {platform: ResourceStats() for platform in POLICIES}
+
+
+async def apply_resource_policy(context, platform: str):
+    """Повесить на контекст context.route с политикой платформы и учёт трафика."""
+    policy = POLICIES[platform]
+    platform_stats = stats[platform]
+
+    def on_response(response):
+        try:
+            platform_stats.bytes_received += int(response.headers.get("content-length", 0))
+        except (TypeError, ValueError):
+            pass
+
+    context.on("response", on_response)
+    if not BLOCKING_ENABLED:
+        return
+
+    async def handle(route):
+        request = route.request
+        platform_stats.requests += 1
+        if policy.should_block(request.url, request.resource_type):
+            platform_stats.blocked += 1
+            platform_stats.blocked_by_type[request.resource_type] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", handle)
+
+
+def resource_stats() -> dict:
+    return {platform: s.as_dict() for platform, s in stats.items()}
@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+import config
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("session_store")
+
+# Пулы сессий по платформам: список файлов cookies на платформу (можно переопределить в config.py)
+SESSION_POOLS = getattr(config, "SESSION_POOLS", None) or {
+    "instagram": [config.INSTAGRAM_COOKIES],
+    "tiktok": [config.TIKTOK_COOKIES],
+}
+STATE_DIR = getattr(config, "SESSION_STATE_DIR", os.path.join("cookies", "state"))
+SESSION_COOLDOWN = getattr(config, "SESSION_COOLDOWN", 15 * 60)
+SESSION_MAX_USES_PER_HOUR = getattr(config, "SESSION_MAX_USES_PER_HOUR", 120)
+
+
+def load_cookies(path: str) -> list:
+    """Прочитать файл cookies (экспорт из браузера) и привести sameSite к формату Playwright."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cookies = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Cookies file not found: {path}")
+    if not isinstance(cookies, list):
+        raise ValueError("Cookies file must contain a JSON list")
+
+    # Нормализация поля sameSite
+    for cookie in cookies:
+        s = cookie.get("sameSite", "").lower()
+        if s == "no_restriction":
+            cookie["sameSite"] = "None"
+        elif s == "unspecified":
+            cookie["sameSite"] = "Lax"
+        elif s == "lax":
+            cookie["sameSite"] = "Lax"
+        elif s == "strict":
+            cookie["sameSite"] = "Strict"
+        else:
+            cookie["sameSite"] = "Lax"
+
+    return cookies
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+@dataclass
+class Session:
+    platform: str
+    cookies_path: str
+    state_path: str
+    uses: int = 0
+    cooldown_until: float = 0.0
+    recent_uses: Deque[float] = field(default_factory=deque)
+    cookies: Optional[list] = None
+    cookies_mtime: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.platform}:{os.path.basename(self.cookies_path)}"
+
+    def cooling(self, now: float) -> bool:
+        return self.cooldown_until > now
+
+
+class SessionStore:
+    """
+    Пул залогиненных сессий на платформу.
+    После проверки, прошедшей под логином, сохраняется storage_state контекста, и следующий
+    контекст этой сессии стартует с него — пока оператор не обновит файл cookies (он новее state). Сессии ротируются по числу использований,
+    перегруженные и словившие капчу уходят на остывание.
+    """
+
+    def __init__(self, pools: Dict[str, List[str]] = SESSION_POOLS, state_dir: str = STATE_DIR,
+                 cooldown: float = SESSION_COOLDOWN, max_uses_per_hour: int = SESSION_MAX_USES_PER_HOUR):
+        self.state_dir = state_dir
+        self.cooldown = cooldown
+        self.max_uses_per_hour = max_uses_per_hour
+        self._sessions: Dict[str, List[Session]] = {}
+        for platform, paths in pools.items():
+            if isinstance(paths, str):
+                paths = [paths]
+            self._sessions[platform] = [
+                Session(platform=platform, cookies_path=path,
+                        state_path=os.path.join(state_dir, f"{platform}_{os.path.splitext(os.path.basename(path))[0]}.json"))
+                for path in paths
+            ]
+
+    def acquire(self, platform: str) -> Session:
+        """Сессия с наименьшей нагрузкой среди не остывающих (или та, что остынет раньше всех)."""
+        sessions = self._sessions[platform]
+        now = time.time()
+        ready = [s for s in sessions if not s.cooling(now)]
+        if not ready:
+            return min(sessions, key=lambda s: s.cooldown_until)
+        return min(ready, key=lambda s: (len(s.recent_uses), s.uses))
+
+    def context_options(self, session: Session) -> dict:
+        """Аргументы new_context: сохранённый storage_state, если он новее файла cookies."""
+        try:
+            state_mtime = os.path.getmtime(session.state_path)
+        except OSError:
+            return {}
+        if state_mtime <= _mtime(session.cookies_path):
+            # cookies обновили вручную — старый state больше не в счёт
+            return {}
+        return {"storage_state": session.state_path}
+
+    def cookies(self, session: Session) -> list:
+        mtime = _mtime(session.cookies_path)
+        if session.cookies is None or mtime != session.cookies_mtime:
+            session.cookies = load_cookies(session.cookies_path)
+            session.cookies_mtime = mtime
+        return session.cookies
+
+    def record_use(self, session: Optional[Session]):
+        if session is None:
+            return
+        now = time.time()
+        session.uses += 1
+        session.recent_uses.append(now)
+        while session.recent_uses and session.recent_uses[0] < now - 3600:
+            session.recent_uses.popleft()
+        if len(session.recent_uses) >= self.max_uses_per_hour:
+            session.cooldown_until = now + self.cooldown
+            log.info(f"Сессия {session.name}: лимит {self.max_uses_per_hour} проверок/час, остывает")
+
+    def cool_down(self, session: Optional[Session]):
+        if session is None:
+            return
+        session.cooldown_until = time.time() + self.cooldown
+        log.warning(f"Сессия {session.name} отправлена на остывание на {self.cooldown} сек")
+
+    def is_ready(self, session: Optional[Session]) -> bool:
+        return session is None or not session.cooling(time.time())
+
+    async def save_state(self, session: Optional[Session], context):
+        """Сохранить storage_state; вызывать только после проверки, прошедшей под логином."""
+        if session is None:
+            return
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            await context.storage_state(path=session.state_path)
+        except Exception as e:
+            log.error(f"Не удалось сохранить storage_state сессии {session.name}: {e}")
+
+    def stats(self) -> List[dict]:
+        now = time.time()
+        return [
+            {
+                "session": s.name,
+                "uses": s.uses,
+                "uses_last_hour": len(s.recent_uses),
+                "cooling_for": max(0, round(s.cooldown_until - now)),
+            }
+            for sessions in self._sessions.values() for s in sessions
+        ]
+
+
+session_store = SessionStore()
@@ -0,0 +1,535 @@
+# storage.py
+import asyncio
+import csv
+import datetime
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("storage")
+
+DB_FILE = getattr(config, "DB_FILE", "applications.db")
+# Сколько хранить ленту изменений админки и как часто её чистить (сек)
+CHANGES_RETENTION = getattr(config, "CHANGES_RETENTION", 7 * 24 * 60 * 60)
+CHANGES_TRIM_INTERVAL = getattr(config, "CHANGES_TRIM_INTERVAL", 10 * 60)
+# Групповой коммит: записи, пришедшие в пределах окна, фиксируются одним fsync
+GROUP_COMMIT_WINDOW = getattr(config, "GROUP_COMMIT_WINDOW", 0.005)
+GROUP_COMMIT_MAX = getattr(config, "GROUP_COMMIT_MAX", 100)
+LEGACY_CSV_FILE = "data.csv"
+
+# Поля заявки: (заголовок CSV / ключ в шаблонах, колонка в SQLite)
+FIELDS = [
+    ("ПІБ", "pib"),
+    ("Телефон", "phone"),
+    ("Instagram", "instagram"),
+    ("TikTok", "tiktok"),
+    ("YouTube Shorts", "youtube"),
+    ("Підписники / Перегляди", "followers"),
+    ("Ідея", "idea"),
+    ("Telegram username", "username"),
+    ("Дата", "created_at"),
+    ("Статус", "status"),
+    ("chat_id", "chat_id"),
+]
+FIELDNAMES = [title for title, _ in FIELDS]
+COLUMNS = [column for _, column in FIELDS]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pib TEXT NOT NULL DEFAULT '',
+    phone TEXT NOT NULL DEFAULT '',
+    instagram TEXT NOT NULL DEFAULT '',
+    tiktok TEXT NOT NULL DEFAULT '',
+    youtube TEXT NOT NULL DEFAULT '',
+    followers TEXT NOT NULL DEFAULT '',
+    idea TEXT NOT NULL DEFAULT '',
+    username TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'Очікує',
+    chat_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_applications_chat_id ON applications(chat_id);
+CREATE INDEX IF NOT EXISTS idx_applications_phone ON applications(phone);
+CREATE INDEX IF NOT EXISTS idx_applications_status ON applications(status);
+CREATE INDEX IF NOT EXISTS idx_applications_created_at ON applications(created_at);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- Журнал изменений статуса (только добавление): кто, когда и с какой причиной
+CREATE TABLE IF NOT EXISTS status_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    reason_key TEXT,
+    moderator TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_status_events_chat_seq ON status_events(chat_id, seq);
+
+-- Лента изменений для админки (курсор since=seq): added / status / deleted / cleared
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    chat_id INTEGER,
+    created_at REAL NOT NULL
+);
+"""
+
+_SELECT = f"SELECT {', '.join(COLUMNS)} FROM applications"
+# Фильтры и сортировки админки: ключ из query string -> SQL (значения только из этих словарей)
+STATUS_FILTERS = {
+    "waiting": ("status = ?", "Очікує"),
+    "accepted": ("status = ?", "Прийнято"),
+    # GLOB, а не LIKE: регистрозависимый префикс SQLite ищет по индексу
+    "rejected": ("status GLOB ?", "Відхилено*"),
+}
+SORTS = {
+    "id": "id",
+    "date": "created_at",
+    "name": "pib",
+    "status": "status",
+}
+
+_INSERT = f"INSERT INTO applications ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+def row_to_dict(row: sqlite3.Row) -> dict:
+    """Строка БД -> dict с ключами как в CSV (их используют шаблоны и уведомления)."""
+    return {title: "" if row[column] is None else str(row[column]) for title, column in FIELDS}
+
+
+def dict_to_values(data: dict) -> List:
+    values = []
+    for title, column in FIELDS:
+        value = data.get(title, "")
+        if column == "chat_id":
+            value = int(value)
+        values.append("" if value is None else value)
+    return values
+
+
+class _AsyncProxy:
+    """store.aio.<method>(...) — тот же метод, выполненный в потоке, чтобы не блокировать event loop."""
+
+    def __init__(self, store: "ApplicationStore"):
+        self._store = store
+
+    def __getattr__(self, name):
+        method = getattr(self._store, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+
+class ApplicationStore:
+    """
+    Хранилище заявок в SQLite (WAL): общий слой для бота и админ-панели.
+    У каждого потока своё соединение; WAL позволяет читать параллельно с записью.
+    """
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self._local = threading.local()
+        self.aio = _AsyncProxy(self)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._listeners: List[Callable[[], None]] = []
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.open_connection()
+            self._local.conn = conn
+        return conn
+
+    def open_connection(self, synchronous: str = "NORMAL", **kwargs) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, **kwargs)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    # ---------------- чтение ----------------
+    def all(self) -> List[dict]:
+        rows = self._connect().execute(f"{_SELECT} ORDER BY id").fetchall()
+        return [row_to_dict(r) for r in rows]
+
+    def get(self, chat_id: int) -> Optional[dict]:
+        row = self._connect().execute(
+            f"{_SELECT} WHERE chat_id = ? ORDER BY id DESC LIMIT 1",
+            (int(chat_id),),
+        ).fetchone()
+        return row_to_dict(row) if row else None
+
+    def get_many(self, chat_ids: Iterable[int]) -> Dict[int, dict]:
+        """Последние заявки для нескольких chat_id одним запросом: {chat_id: заявка}."""
+        ids = sorted({int(c) for c in chat_ids})
+        if not ids:
+            return {}
+        rows = self._connect().execute(
+            f"{_SELECT} WHERE chat_id IN ({', '.join('?' * len(ids))}) ORDER BY id", ids,
+        ).fetchall()
+        # по возрастанию id: более поздняя заявка того же chat_id перезаписывает раннюю
+        return {r["chat_id"]: row_to_dict(r) for r in rows}
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM applications").fetchone()[0]
+
+    def query(self, status: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None,
+              sort: str = "id", order: str = "desc", limit: int = 50, offset: int = 0) -> Tuple[List[dict], int]:
+        """
+        Страница заявок для админки: фильтр по статусу (ключ STATUS_FILTERS) и датам (YYYY-MM-DD,
+        обе границы включительно), сортировка (ключ SORTS). Возвращает (строки, всего под фильтр).
+        """
+        sql_where, params, sql_order = self._filters(status, date_from, date_to, sort, order)
+        conn = self._connect()
+        total = conn.execute(f"SELECT COUNT(*) FROM applications{sql_where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"{_SELECT}{sql_where}{sql_order} LIMIT ? OFFSET ?", params + [int(limit), int(offset)],
+        ).fetchall()
+        return [row_to_dict(r) for r in rows], total
+
+    def iter_query(self, status: Optional[str] = None, date_from: Optional[str] = None,
+                   date_to: Optional[str] = None, sort: str = "id", order: str = "asc",
+                   batch: int = 500) -> Iterator[dict]:
+        """Все заявки под фильтр потоком, по batch строк за раз (для экспорта, память не растёт)."""
+        sql_where, params, sql_order = self._filters(status, date_from, date_to, sort, order)
+        # отдельное соединение: один снимок WAL на всю выгрузку; куски могут читаться
+        # из разных потоков пула (по очереди), поэтому check_same_thread=False
+        conn = self.open_connection(check_same_thread=False)
+        try:
+            cursor = conn.execute(f"{_SELECT}{sql_where}{sql_order}", params)
+            while True:
+                rows = cursor.fetchmany(batch)
+                if not rows:
+                    break
+                for r in rows:
+                    yield row_to_dict(r)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _filters(status: Optional[str], date_from: Optional[str], date_to: Optional[str],
+                 sort: str, order: str) -> Tuple[str, list, str]:
+        where, params = [], []
+        if status in STATUS_FILTERS:
+            clause, value = STATUS_FILTERS[status]
+            where.append(clause)
+            params.append(value)
+        if date_from:
+            where.append("created_at >= ?")
+            params.append(date_from)
+        if date_to:
+            # created_at хранится как 'YYYY-MM-DD HH:MM' — берём всё до конца дня
+            where.append("created_at < ?")
+            params.append(date_to + "~")
+        sql_where = f" WHERE {' AND '.join(where)}" if where else ""
+        column = SORTS.get(sort, "id")
+        direction = "ASC" if order == "asc" else "DESC"
+        return sql_where, params, f" ORDER BY {column} {direction}, id {direction}"
+
+    def version(self) -> Tuple[int, float]:
+        """(последний seq ленты изменений, время последнего изменения) — для ETag/Last-Modified админки."""
+        row = self._connect().execute("SELECT MAX(seq), MAX(created_at) FROM changes").fetchone()
+        return row[0] or 0, row[1] or 0.0
+
+    def changes(self, since: int = 0, limit: int = 500) -> List[dict]:
+        """Изменения после курсора since, по возрастанию seq."""
+        rows = self._connect().execute(
+            "SELECT seq, kind, chat_id, created_at FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+            (int(since), int(limit)),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def add_listener(self, callback: Callable[[], None]):
+        """callback() вызывается после каждого коммита — из того потока, где был коммит."""
+        self._listeners.append(callback)
+
+    def notify_changed(self):
+        """Вызывается после коммита записи — будит подписчиков (SSE-потоки админки)."""
+        with self._lock:
+            self._generation += 1
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                log.error(f"Ошибка подписчика изменений: {e}")
+
+    # ---------------- запись ----------------
+    # Публичные методы пишут напрямую, одной транзакцией на вызов. В работающем боте
+    # все изменения идут через writer (StorageWriter), который вызывает _<метод>(conn, ...)
+    # пачкой внутри одной транзакции.
+    def _write(self, fn, *args, **kwargs):
+        with self._connect() as conn:
+            result = fn(conn, *args, **kwargs)
+        self.notify_changed()
+        return result
+
+    def add(self, data: dict) -> int:
+        return self._write(self._add, data)
+
+    def update_status(self, chat_id: int, status: str, reason_key: Optional[str] = None,
+                      moderator: Optional[str] = None) -> int:
+        """
+        Записать смену статуса в журнал и в applications.status одной транзакцией.
+        Возвращает число заявок пользователя, к которым относится событие (0 — заявка не найдена).
+        """
+        return self._write(self._update_status, chat_id, status, reason_key, moderator)
+
+    def update_statuses(self, chat_ids: Iterable[int], status: str, reason_key: Optional[str] = None,
+                        moderator: Optional[str] = None) -> List[int]:
+        """Массовая смена статуса одной транзакцией; для каждого chat_id — как в update_status."""
+        return self._write(self._update_statuses, chat_ids, status, reason_key, moderator)
+
+    def trim_changes(self) -> int:
+        """Почистить старую ленту изменений админки; возвращает число удалённых записей."""
+        return self._write(self._trim_changes)
+
+    def delete(self, chat_id: int) -> Optional[dict]:
+        """Удалить заявки пользователя; возвращает последнюю из удалённых (для уведомления)."""
+        return self._write(self._delete, chat_id)
+
+    def delete_all(self) -> Tuple[int, Optional[dict]]:
+        """Удалить все заявки; возвращает (количество, последняя заявка)."""
+        return self._write(self._delete_all)
+
+    def _record_change(self, conn: sqlite3.Connection, kind: str, chat_id: Optional[int] = None):
+        conn.execute("INSERT INTO changes (kind, chat_id, created_at) VALUES (?, ?, ?)",
+                     (kind, None if chat_id is None else int(chat_id), time.time()))
+
+    def _add(self, conn: sqlite3.Connection, data: dict) -> int:
+        rowid = conn.execute(_INSERT, dict_to_values(data)).lastrowid
+        self._record_change(conn, "added", data["chat_id"])
+        return rowid
+
+    def _update_status(self, conn: sqlite3.Connection, chat_id: int, status: str,
+                       reason_key: Optional[str] = None, moderator: Optional[str] = None) -> int:
+        count = conn.execute("SELECT COUNT(*) FROM applications WHERE chat_id = ?", (int(chat_id),)).fetchone()[0]
+        if count:
+            # журнал остаётся аудитом, а текущий статус лежит в индексируемой колонке
+            conn.execute(
+                "INSERT INTO status_events (chat_id, status, reason_key, moderator, created_at) VALUES (?, ?, ?, ?, ?)",
+                (int(chat_id), status, reason_key, moderator, datetime.datetime.now().isoformat(timespec="seconds")),
+            )
+            conn.execute("UPDATE applications SET status = ? WHERE chat_id = ?", (status, int(chat_id)))
+            self._record_change(conn, "status", chat_id)
+        return count
+
+    def _update_statuses(self, conn: sqlite3.Connection, chat_ids: Iterable[int], status: str,
+                         reason_key: Optional[str] = None, moderator: Optional[str] = None) -> List[int]:
+        return [self._update_status(conn, chat_id, status, reason_key, moderator) for chat_id in chat_ids]
+
+    def _trim_changes(self, conn: sqlite3.Connection) -> int:
+        # старую ленту изменений чистим, но последнюю запись оставляем — на ней держится версия
+        return conn.execute("DELETE FROM changes WHERE created_at < ? AND seq < (SELECT MAX(seq) FROM changes)",
+                            (time.time() - CHANGES_RETENTION,)).rowcount
+
+    def _delete(self, conn: sqlite3.Connection, chat_id: int) -> Optional[dict]:
+        target = conn.execute(f"{_SELECT} WHERE chat_id = ? ORDER BY id DESC LIMIT 1", (int(chat_id),)).fetchone()
+        if target:
+            conn.execute("DELETE FROM applications WHERE chat_id = ?", (int(chat_id),))
+            self._record_change(conn, "deleted", chat_id)
+        return row_to_dict(target) if target else None
+
+    def _delete_all(self, conn: sqlite3.Connection) -> Tuple[int, Optional[dict]]:
+        count = conn.execute("SELECT COUNT(*) FROM applications").fetchone()[0]
+        last = conn.execute(f"{_SELECT} ORDER BY id DESC LIMIT 1").fetchone()
+        conn.execute("DELETE FROM applications")
+        self._record_change(conn, "cleared")
+        return count, row_to_dict(last) if last else None
+
+    def history(self, chat_id: int) -> List[dict]:
+        """Аудит: все решения по пользователю в порядке записи."""
+        rows = self._connect().execute(
+            "SELECT seq, status, reason_key, moderator, created_at FROM status_events WHERE chat_id = ? ORDER BY seq",
+            (int(chat_id),),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    # ---------------- CSV ----------------
+    def import_csv(self, csv_file: str = LEGACY_CSV_FILE) -> int:
+        """Одноразовый перенос заявок из старого data.csv (повторный вызов ничего не делает)."""
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'csv_imported'").fetchone():
+            return 0
+        if not os.path.exists(csv_file):
+            return 0
+
+        with open(csv_file, "r", encoding="utf-8", newline="") as f:
+            rows = [r for r in csv.DictReader(f) if str(r.get("chat_id", "")).strip()]
+        with conn:
+            conn.executemany(_INSERT, [dict_to_values(r) for r in rows])
+            self._record_change(conn, "cleared")
+            conn.execute("INSERT INTO meta (key, value) VALUES ('csv_imported', ?)", (os.path.abspath(csv_file),))
+        log.info(f"Импортировано {len(rows)} заявок из {csv_file} в {self.path}")
+        return len(rows)
+
+    def export_csv(self, out: IO[str], rows: Optional[Iterable[dict]] = None):
+        """Выгрузка заявок в CSV (CSV — только формат экспорта)."""
+        writer = csv.DictWriter(out, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(self.iter_query() if rows is None else rows)
+
+
+class StorageWriter:
+    """
+    Единственный писатель базы: задача на loop бота с очередью изменений.
+    Изменения, пришедшие в пределах GROUP_COMMIT_WINDOW, применяются одной транзакцией
+    (каждое — в своём SAVEPOINT) и фиксируются одним fsync (synchronous=FULL).
+    Читатели работают через свои WAL-соединения и писателя не ждут.
+    """
+
+    def __init__(self, store: ApplicationStore, window: float = GROUP_COMMIT_WINDOW,
+                 max_batch: int = GROUP_COMMIT_MAX, trim_interval: float = CHANGES_TRIM_INTERVAL):
+        self.store = store
+        self.window = window
+        self.max_batch = max_batch
+        self.trim_interval = trim_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._trimmer: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # соединение писателя живёт в одном выделенном потоке
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-writer")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        self._trimmer = asyncio.create_task(self._trim_loop())
+
+    async def stop(self):
+        """Дописать всё из очереди и остановить писателя."""
+        if not self.running:
+            return
+        self._trimmer.cancel()
+        await asyncio.gather(self._trimmer, return_exceptions=True)
+        await self._queue.put(None)
+        await self._task
+        await self._loop.run_in_executor(self._executor, self._close)
+
+    async def submit(self, op: str, *args, **kwargs):
+        """Поставить изменение (имя метода ApplicationStore) в очередь и дождаться коммита."""
+        if not self.running:
+            # бот ещё не запущен (импорт CSV, CLI) — пишем напрямую
+            return await asyncio.to_thread(getattr(self.store, op), *args, **kwargs)
+        future = self._loop.create_future()
+        await self._queue.put((op, args, kwargs, future))
+        return await future
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = self._loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                results = await self._loop.run_in_executor(
+                    self._executor, self._apply, [(op, args, kwargs) for op, args, kwargs, _ in batch])
+            except Exception as e:
+                log.error(f"Групповой коммит ({len(batch)} изменений) не удался: {e}")
+                results = [(False, e)] * len(batch)
+            for (_, _, _, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    async def _trim_loop(self):
+        """Фоновая чистка старой ленты изменений админки."""
+        while True:
+            await asyncio.sleep(self.trim_interval)
+            try:
+                await self.submit("trim_changes")
+            except Exception as e:
+                log.error(f"Ошибка чистки ленты изменений: {e}")
+
+    def _apply(self, batch) -> List[Tuple[bool, object]]:
+        if self._conn is None:
+            self._conn = self.store.open_connection(synchronous="FULL", isolation_level=None)
+        conn = self._conn
+        results = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for op, args, kwargs in batch:
+                # ошибка одного изменения не откатывает остальные из пачки
+                conn.execute("SAVEPOINT op")
+                try:
+                    results.append((True, getattr(self.store, f"_{op}")(conn, *args, **kwargs)))
+                    conn.execute("RELEASE op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    results.append((False, e))
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        self.store.notify_changed()
+        return results
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+store = ApplicationStore()
+store.import_csv()
+writer = StorageWriter(store)
+
+
+if __name__ == "__main__":
+    # python storage.py export data.csv — выгрузить заявки в CSV
+    if len(sys.argv) == 3 and sys.argv[1] == "export":
+        with open(sys.argv[2], "w", encoding="utf-8", newline="") as f:
+            store.export_csv(f)
+    else:
+        print("Usage: python storage.py export <file.csv>")
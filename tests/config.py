@@ -0,0 +1,11 @@
+# Настройки для тестов: вместо боевого config.py (в репозитории его нет)
+BOT_TOKEN = "123456:TEST-TOKEN-ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+PROXIES = []
+USER_AGENTS = ["Mozilla/5.0 (tests)"]
+INSTAGRAM_COOKIES = "cookies/instagram_cookies.json"
+TIKTOK_COOKIES = "cookies/tiktok_cookies.json"
+PLAYWRIGHT_HEADLESS = True
+PLAYWRIGHT_TIMEOUT = 10000
+
+# краулер подписчиков в тестах не запускаем
+FOLLOWER_CRAWL_ENABLED = False
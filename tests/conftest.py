@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(1, ROOT)
+
+# модули бота при импорте создают базы и файлы в текущем каталоге — уводим их во временный
+os.chdir(tempfile.mkdtemp(prefix="bot-tests-"))
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from aiohttp import BasicAuth, web
+from aiohttp.test_utils import TestClient, TestServer, make_mocked_request
+
+import admin
+from storage import store
+
+AUTH = BasicAuth(admin.ADMIN_USERNAME, admin.ADMIN_PASSWORD)
+
+
+def make_client() -> TestClient:
+    """Свежее приложение с маршрутами админки: admin.app привязывается к первому loop."""
+    app = web.Application(middlewares=[admin.basic_auth])
+    app.add_routes(admin.routes)
+    app.on_startup.append(admin.on_startup)
+    app.on_shutdown.append(admin.on_shutdown)
+    return TestClient(TestServer(app))
+
+
+def add(chat_id):
+    store.add({"ПІБ": f"user {chat_id}", "Telegram username": f"user{chat_id}", "chat_id": chat_id,
+               "Статус": "Очікує"})
+
+
+def test_bulk_answers_before_notifications_are_delivered(monkeypatch):
+    for chat_id in (501, 502, 503):
+        add(chat_id)
+    sent = []
+
+    async def slow_notify(chat_id, text, lane=None):
+        await asyncio.sleep(0.3)
+        if chat_id == 502:
+            raise RuntimeError("bot was blocked by the user")
+        sent.append(chat_id)
+        return True
+
+    monkeypatch.setattr(admin, "notify", slow_notify)
+
+    async def run():
+        client = make_client()
+        await client.start_server()
+        try:
+            resp = await asyncio.wait_for(client.post(
+                "/api/bulk", auth=AUTH, json={"chat_ids": [501, 502, 503, 999], "action": "accept"}), 0.2)
+            body = await resp.json()
+            # ответ пришёл, пока рассылка ещё идёт
+            assert sent == []
+            assert len(admin._notify_tasks) == 1
+        finally:
+            # остановка админки дожидается фоновой рассылки
+            await client.close()
+        return body
+
+    body = asyncio.run(run())
+    assert body["applied"] == 3
+    assert [r["ok"] for r in body["results"]] == [True, True, True, False]
+    assert {r.get("notification") for r in body["results"][:3]} == {"queued"}
+    assert sorted(sent) == [501, 503]
+    assert not admin._notify_tasks
+    assert store.get(502)["Статус"] == "Прийнято"
+
+
+def test_change_feed_reads_items_in_one_query(monkeypatch):
+    since, _ = store.version()
+    for chat_id in (601, 602):
+        add(chat_id)
+    store.update_status(601, "Прийнято")
+    store.delete(602)
+    calls = []
+    get_many = store.get_many
+
+    def counting_get_many(chat_ids):
+        calls.append(list(chat_ids))
+        return get_many(chat_ids)
+
+    monkeypatch.setattr(store, "get_many", counting_get_many)
+    monkeypatch.setattr(store, "get", lambda chat_id: pytest.fail("per-change lookup"))
+
+    async def run():
+        client = make_client()
+        await client.start_server()
+        try:
+            resp = await client.get(f"/api/changes?since={since}", auth=AUTH)
+            return await resp.json()
+        finally:
+            await client.close()
+
+    body = asyncio.run(run())
+    assert [(c["kind"], c["chat_id"]) for c in body["changes"]] == [
+        ("added", 601), ("added", 602), ("status", 601), ("deleted", 602)]
+    assert len(calls) == 1
+    assert body["changes"][0]["item"]["status"] == "Прийнято"
+    assert body["changes"][1]["item"] is None
+
+
+def test_stream_does_not_swallow_cancellation(monkeypatch):
+    # предыдущие тесты уже останавливали админку
+    monkeypatch.setattr(admin, "_closing", False)
+
+    async def run():
+        request = make_mocked_request("GET", "/api/stream")
+        handler = asyncio.create_task(admin.api_stream(request))
+        await asyncio.sleep(0.1)
+        # поток ждёт изменений; отмена (остановка сервера) должна дойти до задачи
+        handler.cancel()
+        await asyncio.gather(handler, return_exceptions=True)
+        return handler
+
+    assert asyncio.run(run()).cancelled()
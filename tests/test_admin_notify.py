@@ -0,0 +1,44 @@
+import asyncio
+
+from admin_notify import AdminNotifier
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(0.01)
+        self.sent.append((chat_id, text))
+
+
+def row(chat_id):
+    return {"ПІБ": f"user {chat_id}", "Telegram username": f"user{chat_id}", "chat_id": chat_id}
+
+
+def test_stop_waits_for_submitted_notices():
+    bot = FakeBot()
+    notifier = AdminNotifier(bot, [100, 200], mode="single")
+
+    async def run():
+        notifier.submit(row(1))
+        notifier.submit(row(2))
+        assert len(notifier._tasks) == 2
+        await notifier.stop()
+
+    asyncio.run(run())
+    assert len(bot.sent) == 4
+    assert not notifier._tasks
+
+
+def test_stop_sends_the_pending_digest():
+    bot = FakeBot()
+    notifier = AdminNotifier(bot, [100], mode="digest", window=60)
+
+    async def run():
+        for chat_id in (1, 2, 3):
+            notifier.submit(row(chat_id))
+        await notifier.stop()
+
+    asyncio.run(run())
+    assert len(bot.sent) == 1
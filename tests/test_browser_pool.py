@@ -0,0 +1,41 @@
+import asyncio
+import logging
+
+from browser_pool import BrowserPool
+
+
+def test_failed_warm_up_is_logged(caplog):
+    pool = BrowserPool(size=1)
+
+    async def broken_start():
+        raise RuntimeError("chromium not installed")
+
+    pool.start = broken_start
+
+    async def run():
+        pool.warm_up()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return pool._warmup
+
+    with caplog.at_level(logging.ERROR, logger="browser_pool"):
+        task = asyncio.run(run())
+    assert task.done()
+    assert "chromium not installed" in caplog.text
+
+
+def test_close_cancels_a_running_warm_up():
+    pool = BrowserPool(size=1)
+
+    async def slow_start():
+        await asyncio.sleep(3600)
+
+    pool.start = slow_start
+
+    async def run():
+        pool.warm_up()
+        await asyncio.sleep(0)
+        await asyncio.wait_for(pool.close(), 1)
+        return pool._warmup
+
+    assert asyncio.run(run()).cancelled()
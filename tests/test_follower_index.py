@@ -0,0 +1,22 @@
+import asyncio
+
+import follower_index
+
+
+def test_stop_crawler_cancels_a_running_crawl(monkeypatch):
+    started = asyncio.Event()
+
+    async def endless_crawl(**kwargs):
+        started.set()
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(follower_index, "run_crawler", endless_crawl)
+
+    async def run():
+        follower_index.start_crawler()
+        await started.wait()
+        task = follower_index._crawler_task
+        await asyncio.wait_for(follower_index.stop_crawler(), 1)
+        return task
+
+    assert asyncio.run(run()).cancelled()
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+
+import pytest
+from aiohttp import ClientSession, web
+
+import check_subscriptions
+from follower_sniffer import FollowerSniffer
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+INSTAGRAM_FOLLOWERS = "/api/v1/friendships/55555/followers/"
+TIKTOK_USER_LIST = "/api/user/list/"
+
+# записанные ответы сайтов: путь -> страницы списка подписчиков по порядку
+RECORDED = {
+    TIKTOK_USER_LIST: ["tiktok_user_list_1.json", "tiktok_user_list_2.json"],
+    INSTAGRAM_FOLLOWERS: ["instagram_followers_1.json", "instagram_followers_2.json"],
+}
+
+TIKTOK_PAGE = f"""<!doctype html><html><body><script>
+(async () => {{
+  for (const page of [0, 1]) {{
+    await fetch("{TIKTOK_USER_LIST}?page=" + page);
+  }}
+}})();
+</script></body></html>"""
+
+
+class RecordedResponse:
+    """То, что sniffer читает у playwright Response: url, ok и json()."""
+
+    def __init__(self, url: str, status: int, body: bytes):
+        self.url = url
+        self.ok = 200 <= status < 300
+        self._body = body
+
+    async def json(self):
+        return json.loads(self._body)
+
+
+async def start_stand_in(port: int = 0):
+    """Локальный стенд, отдающий записанные ответы; возвращает (runner, base_url)."""
+    async def recorded(request: web.Request):
+        page = int(request.query.get("page", 0))
+        with open(os.path.join(FIXTURES, RECORDED[request.path][page]), encoding="utf-8") as f:
+            return web.json_response(json.load(f))
+
+    async def rate_limited(request: web.Request):
+        return web.json_response({"message": "Please wait a few minutes"}, status=429)
+
+    async def tiktok_page(request: web.Request):
+        return web.Response(text=TIKTOK_PAGE, content_type="text/html")
+
+    app = web.Application()
+    for path in RECORDED:
+        app.router.add_get(path, recorded)
+    app.router.add_get("/limited" + TIKTOK_USER_LIST, rate_limited)
+    app.router.add_get("/tiktok", tiktok_page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+async def replay(sniffer: FollowerSniffer, paths):
+    runner, base = await start_stand_in()
+    try:
+        async with ClientSession() as session:
+            for path in paths:
+                async with session.get(base + path) as resp:
+                    await sniffer._on_response(RecordedResponse(str(resp.url), resp.status, await resp.read()))
+    finally:
+        await runner.cleanup()
+
+
+def test_tiktok_match_stops_on_first_page():
+    sniffer = FollowerSniffer("tiktok", "@Bob.Games")
+    asyncio.run(replay(sniffer, [TIKTOK_USER_LIST + "?page=0"]))
+    assert sniffer.found and sniffer.done
+    assert not sniffer.exhausted
+    assert sniffer.usernames == {"alice_ua", "bob.games"}
+
+
+def test_tiktok_list_exhausted_without_match():
+    sniffer = FollowerSniffer("tiktok", "nobody")
+    asyncio.run(replay(sniffer, [TIKTOK_USER_LIST + "?page=0", TIKTOK_USER_LIST + "?page=1"]))
+    assert sniffer.exhausted and not sniffer.found
+    assert sniffer.responses == 2
+    assert sniffer.usernames == {"alice_ua", "bob.games", "carol", "dave_x"}
+
+
+def test_instagram_pages():
+    sniffer = FollowerSniffer("instagram", "proove_fan")
+    asyncio.run(replay(sniffer, [INSTAGRAM_FOLLOWERS + "?page=0"]))
+    assert not sniffer.done
+    asyncio.run(replay(sniffer, [INSTAGRAM_FOLLOWERS + "?page=1"]))
+    assert sniffer.found and sniffer.exhausted
+
+
+def test_foreign_and_failed_responses_are_ignored():
+    sniffer = FollowerSniffer("tiktok", "carol")
+    asyncio.run(replay(sniffer, [INSTAGRAM_FOLLOWERS + "?page=0", "/limited" + TIKTOK_USER_LIST]))
+    assert sniffer.responses == 0
+    assert sniffer.use_dom()
+
+
+def test_sniffer_in_browser_against_stand_in():
+    async_api = pytest.importorskip("playwright.async_api")
+
+    async def run():
+        runner, base = await start_stand_in()
+        try:
+            async with async_api.async_playwright() as p:
+                try:
+                    browser = await p.chromium.launch(headless=True)
+                except Exception as e:
+                    pytest.skip(f"Chromium недоступен: {e}")
+                page = await browser.new_page()
+                sniffer = FollowerSniffer("tiktok", "nobody")
+                sniffer.attach(page)
+                await page.goto(base + "/tiktok")
+                while not sniffer.exhausted and await sniffer.wait(5):
+                    pass
+                await browser.close()
+                return sniffer
+        finally:
+            await runner.cleanup()
+
+    sniffer = asyncio.run(run())
+    assert sniffer.exhausted and sniffer.responses == 2
+
+
+def test_tiktok_live_check_returns_none_when_pool_fails(monkeypatch):
+    class BrokenPool:
+        def context(self, key, factory):
+            raise RuntimeError("Browser pool is closed")
+
+    monkeypatch.setattr(check_subscriptions, "get_pool", lambda *args: BrokenPool())
+    assert asyncio.run(check_subscriptions._check_tiktok_live("proove_gaming_ua", "someone")) is None
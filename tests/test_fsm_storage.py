@@ -0,0 +1,36 @@
+import asyncio
+
+from aiogram.fsm.storage.base import StorageKey
+
+from fsm_storage import SQLiteStorage
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+
+
+def test_concurrent_first_access_keeps_the_write(tmp_path):
+    async def run():
+        storage = SQLiteStorage(str(tmp_path / "fsm.db"), flush_interval=60)
+        await storage.set_state(KEY, "Form:pib")
+        await storage.close()
+
+        # новый процесс: ключа нет в памяти, оба вызова идут читать базу
+        storage = SQLiteStorage(str(tmp_path / "fsm.db"), flush_interval=60)
+        await asyncio.gather(storage.set_state(KEY, "Form:phone"), storage.get_state(KEY))
+        state = await storage.get_state(KEY)
+        await storage.close()
+        return state
+
+    assert asyncio.run(run()) == "Form:phone"
+
+
+def test_state_survives_restart(tmp_path):
+    async def run():
+        storage = SQLiteStorage(str(tmp_path / "fsm.db"), flush_interval=60)
+        await storage.set_data(KEY, {"pib": "Іван"})
+        await storage.close()
+        storage = SQLiteStorage(str(tmp_path / "fsm.db"), flush_interval=60)
+        data = await storage.get_data(KEY)
+        await storage.close()
+        return data
+
+    assert asyncio.run(run()) == {"pib": "Іван"}
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import outbox
+from outbox import OutboundLimiter
+
+
+def test_idle_full_buckets_are_pruned(monkeypatch):
+    monkeypatch.setattr(outbox, "BUCKET_PRUNE_INTERVAL", 0)
+    limiter = OutboundLimiter(chat_rate=1.0, chat_burst=3)
+    now = time.monotonic()
+    limiter._bucket(1).updated = now
+    limiter._bucket(2).updated = now
+    limiter._bucket(2).take(now)
+    limiter._bucket(3).updated = now
+    limiter._bucket(3).drain(now, 30)
+
+    limiter._prune(now + 1.5)
+    # 1 полное, 2 успело наполниться, 3 ещё отбывает retry_after
+    assert set(limiter._chats) == {3}
+    limiter._prune(now + 40)
+    assert limiter._chats == {}
+
+
+def test_buckets_do_not_grow_with_chats(monkeypatch):
+    monkeypatch.setattr(outbox, "BUCKET_PRUNE_INTERVAL", 0)
+    limiter = OutboundLimiter(global_rate=10_000, global_burst=10_000, chat_rate=10_000, chat_burst=3)
+
+    async def make_request(bot, method):
+        return True
+
+    class SendMessage:
+        def __init__(self, chat_id):
+            self.chat_id = chat_id
+
+    async def run():
+        for chat_id in range(1, 501):
+            assert await limiter(make_request, None, SendMessage(chat_id))
+            await asyncio.sleep(0.001)
+        await limiter.close()
+
+    asyncio.run(run())
+    assert limiter.counters["sent"] == 500
+    assert len(limiter._chats) < 10
+
+
+def test_close_stops_the_grantor_and_cancels_waiters():
+    limiter = OutboundLimiter(chat_rate=0.001, chat_burst=1)
+
+    async def run():
+        limiter._bucket(7).take(time.monotonic())
+        # ведро пустое на ~1000 сек — отправка ждёт в очереди
+        waiting = asyncio.create_task(limiter._acquire(7, outbox.Lane.REPLY))
+        await asyncio.sleep(0.05)
+        grantor = limiter._grantor
+        await limiter.close()
+        await asyncio.gather(waiting, return_exceptions=True)
+        return grantor, waiting
+
+    grantor, waiting = asyncio.run(run())
+    assert grantor.cancelled()
+    assert waiting.cancelled()
+    assert limiter.stats()["waiting"] == 0
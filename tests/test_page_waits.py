@@ -0,0 +1,31 @@
+from page_waits import ListEndDetector, ScrollResult
+
+
+def test_list_end_needs_two_stalled_scrolls_of_a_real_list():
+    detector = ListEndDetector(confirmations=2)
+    stalled = ScrollResult(grew=False, at_end=True, root_found=True, rows=12)
+    assert not detector.update(stalled)
+    assert detector.update(stalled)
+
+
+def test_list_end_ignored_when_dialog_missing():
+    detector = ListEndDetector(confirmations=2)
+    # модалка не открылась: прокручивалась сама страница
+    page_scroll = ScrollResult(grew=False, at_end=True, root_found=False, rows=0)
+    assert not any(detector.update(page_scroll) for _ in range(5))
+
+
+def test_list_end_ignored_without_rows():
+    detector = ListEndDetector(confirmations=2)
+    empty = ScrollResult(grew=False, at_end=True, root_found=True, rows=0)
+    assert not any(detector.update(empty) for _ in range(5))
+
+
+def test_growth_resets_the_count():
+    detector = ListEndDetector(confirmations=2)
+    stalled = ScrollResult(grew=False, at_end=True, root_found=True, rows=12)
+    grew = ScrollResult(grew=True, at_end=True, root_found=True, rows=20)
+    assert not detector.update(stalled)
+    assert not detector.update(grew)
+    assert not detector.update(stalled)
+    assert detector.update(stalled)
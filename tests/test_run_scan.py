@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+import check_subscriptions
+from proxy_manager import ProxyManager
+
+PROXY = {"host": "10.0.0.1", "port": 8080}
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+
+    async def new_page(self):
+        page = FakePage()
+        self.pages.append(page)
+        return page
+
+    async def storage_state(self, path):
+        pass
+
+
+class FakePooled:
+    def __init__(self, proxy):
+        self.context = FakeContext()
+        self.info = {"proxy": proxy, "session": None}
+        self.discarded = False
+
+    def discard(self):
+        self.discarded = True
+
+
+@pytest.fixture
+def proxies(monkeypatch):
+    manager = ProxyManager([PROXY], failure_threshold=2, cooldown=60)
+    monkeypatch.setattr(check_subscriptions, "proxy_manager", manager)
+    return manager
+
+
+def health(manager):
+    return manager.stats()[0]
+
+
+def test_timed_out_check_counts_as_proxy_failure(proxies):
+    async def hanging_scan(page):
+        await asyncio.sleep(60)
+
+    pooled = FakePooled(proxies.pick())
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(check_subscriptions._run_scan(pooled, hanging_scan), 0.05)
+
+    asyncio.run(run())
+    assert health(proxies)["failures"] == 1
+    assert pooled.context.pages[0].closed
+
+
+def test_repeated_timeouts_open_the_circuit(proxies):
+    async def hanging_scan(page):
+        await asyncio.sleep(60)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(check_subscriptions._run_scan(FakePooled(proxies.pick()), hanging_scan), 0.05)
+
+    asyncio.run(run())
+    assert health(proxies)["circuit"] == "open"
+
+
+def test_scan_error_and_answer_are_recorded(proxies):
+    async def broken_scan(page):
+        raise RuntimeError("net::ERR_PROXY_CONNECTION_FAILED")
+
+    async def answering_scan(page):
+        return False
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await check_subscriptions._run_scan(FakePooled(proxies.pick()), broken_scan)
+        return await check_subscriptions._run_scan(FakePooled(proxies.pick()), answering_scan)
+
+    assert asyncio.run(run()) is False
+    assert (health(proxies)["failures"], health(proxies)["successes"]) == (1, 1)
+
+
+def test_tiktok_scan_without_a_loaded_profile_has_no_answer(monkeypatch):
+    async def unreachable(page, profile_url, jitter, attempt=1):
+        return False
+
+    class NoPause:
+        async def pause(self, low, high):
+            pass
+
+    class Page:
+        def on(self, event, handler):
+            pass
+
+        def remove_listener(self, event, handler):
+            pass
+
+    monkeypatch.setattr(check_subscriptions, "_open_tiktok_followers", unreachable)
+    monkeypatch.setattr(check_subscriptions, "Jitter", NoPause)
+    assert asyncio.run(check_subscriptions._scan_tiktok_followers(Page(), "proove_gaming_ua", "someone")) is None
+
+
+def test_state_saved_only_after_a_logged_in_scan(proxies, monkeypatch):
+    saved = []
+
+    async def save_state(session, context):
+        saved.append(session)
+
+    monkeypatch.setattr(check_subscriptions.session_store, "save_state", save_state)
+
+    async def logged_out_scan(page):
+        # страница логина/капчи: ответ есть, списка подписчиков не видели
+        return False
+
+    async def logged_in_scan(page):
+        check_subscriptions._mark_logged_in()
+        return False
+
+    async def run():
+        pooled = FakePooled(proxies.pick())
+        await check_subscriptions._run_scan(pooled, logged_out_scan)
+        assert saved == []
+        await check_subscriptions._run_scan(pooled, logged_in_scan)
+        assert len(saved) == 1
+        # флаг не переживает следующую проверку того же контекста
+        await check_subscriptions._run_scan(pooled, logged_out_scan)
+        assert len(saved) == 1
+
+    asyncio.run(run())
@@ -0,0 +1,36 @@
+import json
+import os
+
+from session_store import SessionStore
+
+
+def make_store(tmp_path, cookies):
+    path = tmp_path / "tt.json"
+    path.write_text(json.dumps(cookies))
+    store = SessionStore({"tiktok": [str(path)]}, state_dir=str(tmp_path / "state"))
+    return store, store.acquire("tiktok"), path
+
+
+def test_state_used_only_while_newer_than_cookies(tmp_path):
+    store, session, cookies_path = make_store(tmp_path, [{"name": "sid", "value": "1"}])
+    assert store.context_options(session) == {}
+
+    os.makedirs(store.state_dir)
+    with open(session.state_path, "w") as f:
+        f.write("{}")
+    os.utime(cookies_path, (1000, 1000))
+    assert store.context_options(session) == {"storage_state": session.state_path}
+
+    # оператор положил свежие cookies — state старше них и больше не используется
+    os.utime(cookies_path, None)
+    os.utime(session.state_path, (1000, 1000))
+    assert store.context_options(session) == {}
+
+
+def test_refreshed_cookie_file_is_reread(tmp_path):
+    store, session, cookies_path = make_store(tmp_path, [{"name": "sid", "value": "old"}])
+    assert store.cookies(session)[0]["value"] == "old"
+
+    cookies_path.write_text(json.dumps([{"name": "sid", "value": "new"}]))
+    os.utime(cookies_path, (session.cookies_mtime + 10, session.cookies_mtime + 10))
+    assert store.cookies(session)[0]["value"] == "new"
@@ -0,0 +1,44 @@
+import asyncio
+import os
+import signal
+
+import main
+
+
+def test_sigint_runs_full_shutdown(monkeypatch):
+    calls = []
+
+    async def fake_run_bot():
+        # как polling: работает, пока его не остановят
+        await asyncio.Event().wait()
+
+    async def fake_start_admin():
+        return None
+
+    def recorder(name):
+        async def record(*args, **kwargs):
+            calls.append(name)
+        return record
+
+    monkeypatch.setattr(main, "run_bot", fake_run_bot)
+    monkeypatch.setattr(main, "start_admin", fake_start_admin)
+    monkeypatch.setattr(main, "stop_workers", recorder("stop_workers"))
+    monkeypatch.setattr(main, "stop_crawler", recorder("stop_crawler"))
+    monkeypatch.setattr(main, "shutdown_pool", recorder("shutdown_pool"))
+    monkeypatch.setattr(main.outbound_limiter, "close", recorder("outbox.close"))
+    monkeypatch.setattr(main.writer, "stop", recorder("writer.stop"))
+    monkeypatch.setattr(main.dp.storage, "close", recorder("storage.close"))
+    monkeypatch.setattr(main.follow_cache, "save", lambda: calls.append("follow_cache.save"))
+    monkeypatch.setattr(main.follower_index, "save_all", lambda: calls.append("follower_index.save_all"))
+
+    async def run():
+        asyncio.get_running_loop().call_later(0.2, os.kill, os.getpid(), signal.SIGINT)
+        await asyncio.wait_for(main.main(), 5)
+
+    asyncio.run(run())
+
+    assert calls.index("stop_workers") < calls.index("shutdown_pool") < calls.index("writer.stop")
+    # обход держит слот пула CRAWLER — его прерываем до закрытия пулов
+    assert calls.index("stop_crawler") < calls.index("shutdown_pool")
+    assert calls.index("stop_workers") < calls.index("outbox.close")
+    assert {"storage.close", "follow_cache.save", "follower_index.save_all"} <= set(calls)
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+import storage
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = storage.ApplicationStore(str(tmp_path / "applications.db"))
+    for chat_id in range(1, 6):
+        store.add({"ПІБ": f"user {chat_id}", "chat_id": chat_id, "Статус": "Очікує", "Дата": "2026-01-0%d" % chat_id})
+    store.update_status(2, "Прийнято")
+    store.update_status(3, "Відхилено (spam)", reason_key="spam")
+    return store
+
+
+def plan(store, status, sort="id"):
+    sql_where, params, sql_order = store._filters(status, None, None, sort, "desc")
+    rows = store._connect().execute(f"EXPLAIN QUERY PLAN {storage._SELECT}{sql_where}{sql_order} LIMIT 50", params)
+    return [row["detail"] for row in rows]
+
+
+@pytest.mark.parametrize("status", sorted(storage.STATUS_FILTERS))
+def test_status_filter_searches_the_index(store, status):
+    details = plan(store, status)
+    assert any(d.startswith("SEARCH applications USING INDEX idx_applications_status") for d in details), details
+    # ни подзапросов по журналу, ни полного прохода по таблице
+    assert not any("status_events" in d or "SUBQUERY" in d or d == "SCAN applications" for d in details), details
+
+
+def test_status_sort_walks_the_index(store):
+    details = plan(store, None, sort="status")
+    assert details == ["SCAN applications USING INDEX idx_applications_status"]
+
+
+def test_filters_read_the_materialized_status(store):
+    assert [r["chat_id"] for r in store.query(status="accepted")[0]] == ["2"]
+    assert [r["chat_id"] for r in store.query(status="rejected")[0]] == ["3"]
+    assert store.query(status="waiting")[1] == 3
+    assert [e["status"] for e in store.history(3)] == ["Відхилено (spam)"]
+
+
+def test_writer_trims_the_change_feed_and_stops_cleanly(store, monkeypatch):
+    monkeypatch.setattr(storage, "CHANGES_RETENTION", 0)
+    writer = storage.StorageWriter(store, trim_interval=0.01)
+
+    async def run():
+        writer.start()
+        await writer.submit("add", {"ПІБ": "late", "chat_id": 99, "Статус": "Очікує"})
+        await asyncio.sleep(0.1)
+        await writer.stop()
+        return writer._trimmer
+
+    trimmer = asyncio.run(run())
+    assert trimmer.cancelled()
+    # вся старая лента вычищена, кроме последней записи — на ней держится версия
+    assert len(store.changes()) == 1
@@ -0,0 +1,65 @@
+import asyncio
+
+from verification_queue import VerificationJob, VerificationQueue
+
+
+def job(user_id, username, results, **kwargs):
+    async def on_done(done, ok, error):
+        results.append((done.user_id, done.username, ok))
+
+    return VerificationJob(platform="instagram", target="proove_gaming_ua", username=username,
+                           chat_id=user_id, user_id=user_id, on_done=on_done, **kwargs)
+
+
+def test_resubmitted_handle_replaces_the_waiting_job():
+    checked, results = [], []
+    gate = asyncio.Event()
+
+    async def check(target, username, recheck=False):
+        checked.append(username)
+        await gate.wait()
+        return username == "known_follower"
+
+    async def run():
+        queue = VerificationQueue("instagram", check, workers=1)
+        queue.start()
+        queue.submit(job(1, "someone_else", results))
+        await asyncio.sleep(0)
+        # пользователь 2 ждёт, пока воркер занят пользователем 1, и меняет аккаунт
+        assert queue.submit(job(2, "known_follower", results)) == 1
+        assert queue.submit(job(3, "third", results)) == 2
+        assert queue.submit(job(2, "my_own_account", results)) == 1
+        gate.set()
+        while len(results) < 3:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert checked == ["someone_else", "my_own_account", "third"]
+    assert (2, "my_own_account", False) in results
+    assert all(username != "known_follower" for _, username, _ in results)
+
+
+def test_same_check_while_running_shares_the_result():
+    checked, results = [], []
+    gate = asyncio.Event()
+
+    async def check(target, username, recheck=False):
+        checked.append(username)
+        await gate.wait()
+        return True
+
+    async def run():
+        queue = VerificationQueue("instagram", check, workers=1)
+        queue.start()
+        queue.submit(job(1, "alice", results))
+        await asyncio.sleep(0)
+        assert queue.submit(job(1, "alice", results)) == 1
+        gate.set()
+        while len(results) < 2:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert checked == ["alice"]
+    assert results == [(1, "alice", True), (1, "alice", True)]
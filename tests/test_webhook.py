@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+from aiohttp import ClientSession, web
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from webhook import SECRET_HEADER, WebhookServer
+
+TOKEN = "123456:test-token"
+SECRET = "s3cret"
+
+
+def update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": 42, "type": "private"},
+            "from": {"id": 42, "is_bot": False, "first_name": "Test"},
+            "text": f"message {update_id}",
+        },
+    }
+
+
+async def start_fake_api():
+    """Фейковый Bot API: запоминает вызванные методы и на всё отвечает ok."""
+    calls = []
+
+    async def method(request: web.Request):
+        calls.append((request.match_info["method"], dict(await request.post())))
+        return web.json_response({"ok": True, "result": True})
+
+    app = web.Application()
+    app.router.add_post(f"/bot{TOKEN}/{{method}}", method)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}", calls
+
+
+class Harness:
+    """WebhookServer на свободном порту с ботом, который ходит в фейковый Bot API."""
+
+    def __init__(self, handler):
+        self.dp = Dispatcher()
+        self.dp.message()(handler)
+
+    async def __aenter__(self):
+        self.api_runner, api_url, self.api_calls = await start_fake_api()
+        self.bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)))
+        self.server = WebhookServer(self.dp, self.bot, url="http://127.0.0.1", secret=SECRET, max_concurrency=2)
+        await self.server.start("127.0.0.1", 0)
+        host, port = self.server._runner.addresses[0][:2]
+        self.endpoint = f"http://{host}:{port}{self.server.path}"
+        self.http = ClientSession()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.http.close()
+        await self.server.stop()
+        await self.bot.session.close()
+        await self.api_runner.cleanup()
+
+    async def post(self, body, secret=SECRET) -> int:
+        headers = {SECRET_HEADER: secret} if secret is not None else {}
+        async with self.http.post(self.endpoint, json=body, headers=headers) as resp:
+            return resp.status
+
+
+async def noop(message):
+    pass
+
+
+def test_start_registers_the_webhook():
+    async def run():
+        async with Harness(noop) as h:
+            return h.api_calls
+
+    [(method, params)] = asyncio.run(run())
+    assert method == "setWebhook"
+    assert params["secret_token"] == SECRET
+    # апдейты, накопленные, пока бот был выключен, не выбрасываем
+    assert params.get("drop_pending_updates", "false") == "false"
+
+
+def test_rejects_missing_or_wrong_secret():
+    handled = []
+
+    async def handler(message):
+        handled.append(message.message_id)
+
+    async def run():
+        async with Harness(handler) as h:
+            statuses = [await h.post(update(1), secret=None), await h.post(update(2), secret="wrong")]
+            return statuses, h.server.stats()
+
+    statuses, stats = asyncio.run(run())
+    assert statuses == [401, 401]
+    assert stats["rejected"] == 2
+    assert handled == []
+
+
+def test_rejects_malformed_update():
+    async def run():
+        async with Harness(noop) as h:
+            return await h.post({"update_id": "not a number", "message": []}), h.server.stats()
+
+    status, stats = asyncio.run(run())
+    assert status == 400
+    assert stats["invalid"] == 1
+
+
+def test_concurrency_is_limited():
+    active, peak = 0, 0
+    gate = asyncio.Event()
+
+    async def handler(message):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await gate.wait()
+        active -= 1
+
+    async def run():
+        async with Harness(handler) as h:
+            posts = [asyncio.create_task(h.post(update(i))) for i in range(1, 5)]
+            await asyncio.sleep(0.3)
+            # два апдейта в обработке, ещё два запроса держатся до освобождения места
+            assert active == 2
+            assert sum(p.done() for p in posts) == 2
+            gate.set()
+            return await asyncio.gather(*posts)
+
+    assert asyncio.run(run()) == [200] * 4
+    assert peak == 2
+
+
+def test_stop_drains_accepted_updates():
+    finished = []
+
+    async def handler(message):
+        await asyncio.sleep(0.2)
+        finished.append(message.message_id)
+
+    async def run():
+        async with Harness(handler) as h:
+            assert await h.post(update(1)) == 200
+            assert finished == []
+            await h.server.stop()
+            return list(finished)
+
+    assert asyncio.run(run()) == [1]
+
+
+@pytest.mark.parametrize("url", ["", "example.com", "ftp://example.com"])
+def test_relative_webhook_url_is_rejected(url):
+    server = WebhookServer(Dispatcher(), Bot(TOKEN), url=url, secret=SECRET)
+    with pytest.raises(ValueError):
+        asyncio.run(server.start("127.0.0.1", 0))
@@ -1,33 +1,47 @@
 # tg_bot.py
 import asyncio
 import os
-import csv
 import logging
 import datetime
 import re
 import json
+import inspect
+from typing import Callable, Dict, Optional, Tuple, Type, Union
 
 from aiogram import Bot, Dispatcher, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from aiogram.filters import CommandStart, Command
+from aiogram.filters.callback_data import CallbackData
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import (
     ReplyKeyboardMarkup,
     KeyboardButton,
     ReplyKeyboardRemove,
 )
 
-from kbds.inline import start_kbd, back_kbds, social_no_kbd, admin_panel, admin_choices_kbd
+from kbds.inline import (
+    start_kbd, back_kbds, social_no_kbd, admin_panel, admin_choices_kbd,
+    AdminDecision, DigestOpen, DigestPage,
+)
 
 from dotenv import load_dotenv
 load_dotenv()
 
 import config
-from check_subscriptions import check_instagram_follow, check_tiktok_follow
-
-bot_loop = asyncio.get_event_loop()
+from storage import store, writer
+from registration_index import registration_index
+from browser_pool import get_pool
+import verification_queue as verification
+from verification_queue import VerificationJob
+import follower_index
+from fsm_storage import SQLiteStorage
+from outbox import outbound_limiter, Lane, use_lane
+from admin_notify import AdminNotifier, application_card
+from loop_monitor import loop_monitor, HandlerNameMiddleware
+from webhook import WebhookServer
 
 
 # Настройки
@@ -35,6 +49,11 @@ logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("tg_bot")
 
 BOT_TOKEN = os.getenv("TOKEN") or config.BOT_TOKEN
+# "polling" или "webhook" (настройки webhook — в webhook.py)
+BOT_MODES = ("polling", "webhook")
+BOT_MODE = getattr(config, "BOT_MODE", "polling")
+# свой сервер Bot API (локальный telegram-bot-api или фейковый для тестов); None — api.telegram.org
+TELEGRAM_API_URL = getattr(config, "TELEGRAM_API_URL", None)
 
 ADMINS_FILE = "admins.json"
 
@@ -55,10 +74,49 @@ def add_admin(chat_id: int):
 
 ADMIN_CHAT_IDS = load_admins()
 
-CSV_FILE = "data.csv"
-
-bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher(storage=MemoryStorage())
+session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+bot = Bot(token=BOT_TOKEN, session=session)
+# все исходящие запросы бота проходят через ограничитель скорости
+bot.session.middleware(outbound_limiter)
+dp = Dispatcher(storage=SQLiteStorage())
+admin_notifier = AdminNotifier(bot, ADMIN_CHAT_IDS)
+dp.message.middleware(HandlerNameMiddleware(loop_monitor))
+dp.callback_query.middleware(HandlerNameMiddleware(loop_monitor))
+webhook_server = WebhookServer(dp, bot)
+
+# Таблица обработчиков кнопок: ключ — callback_data простой кнопки или префикс CallbackData.
+# Все нажатия приходят в один хэндлер и находят обработчик одним поиском в словаре.
+callback_routes: Dict[str, Tuple[Callable, Optional[Type[CallbackData]], bool]] = {}
+
+def on_callback(key: Union[str, Type[CallbackData]]):
+    """Регистрирует обработчик кнопки; для CallbackData он получает распакованные данные вторым аргументом."""
+    def register(fn):
+        factory = key if isinstance(key, type) else None
+        prefix = factory.__prefix__ if factory else key
+        callback_routes[prefix] = (fn, factory, "state" in inspect.signature(fn).parameters)
+        return fn
+    return register
+
+@dp.callback_query()
+async def route_callback(callback: types.CallbackQuery, state: FSMContext):
+    data = callback.data or ""
+    route = callback_routes.get(data.split(":", 1)[0])
+    if route is None:
+        # например, кнопки старого формата в уже отправленных сообщениях
+        log.warning(f"Невідома кнопка: {data!r}")
+        await callback.answer("Кнопка застаріла — скористайтеся адмін-панеллю.", show_alert=True)
+        return
+    fn, factory, wants_state = route
+    args = [callback]
+    if factory is not None:
+        try:
+            args.append(factory.unpack(data))
+        except (ValueError, TypeError):
+            await callback.answer("Невірні дані.", show_alert=True)
+            return
+    # в отчёте о блокировке loop — настоящий обработчик, а не маршрутизатор
+    loop_monitor.handlers[asyncio.current_task()] = fn.__name__
+    return await fn(*args, **({"state": state} if wants_state else {}))
 
 # Клавиатура для подписки (юзер будет подписываться на эти аккаунты)
 subscribe_keyboard = types.InlineKeyboardMarkup(inline_keyboard=[
@@ -67,26 +125,6 @@ subscribe_keyboard = types.InlineKeyboardMarkup(inline_keyboard=[
     [types.InlineKeyboardButton(text="Я підписався", callback_data="check_subscription")]
 ])
 
-# Создание файла с заголовками, если нет
-if not os.path.exists(CSV_FILE):
-    with open(CSV_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(
-            [
-                "ПІБ",
-                "Телефон",
-                "Instagram",
-                "TikTok",
-                "YouTube Shorts",
-                "Підписники / Перегляди",
-                "Ідея",
-                "Telegram username",
-                "Дата",
-                "Статус",
-                "chat_id",
-            ]
-        )
-
 # Команды телеграмм бота 
 async def set_commands():
     commands = [
@@ -129,37 +167,16 @@ def extract_username_from_link(url: str) -> str:
         return parts[-1]
     return None
 
-def update_status_in_csv(chat_id: int, status: str, csv_file: str = CSV_FILE):
-    rows = []
-    updated = False
-    with open(csv_file, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if str(row.get("chat_id")) == str(chat_id):
-                row["Статус"] = status
-                updated = True
-            rows.append(row)
-    if updated:
-        with open(csv_file, "w", encoding="utf-8", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=[
-                "ПІБ",
-                "Телефон",
-                "Instagram",
-                "TikTok",
-                "YouTube Shorts",
-                "Підписники / Перегляди",
-                "Ідея",
-                "Telegram username",
-                "Дата",
-                "Статус",
-                "chat_id",
-            ])
-            writer.writeheader()
-            writer.writerows(rows)
-
 # ------------------ Команды ------------------
+async def release_phone(state: FSMContext, chat_id: int):
+    """Снять бронь номера из текущей анкеты (анкету начали заново или номер меняется)."""
+    phone = (await state.get_data()).get("phone")
+    if phone:
+        registration_index.release(phone, chat_id)
+
 @dp.message(CommandStart())
-async def start_cmd(message: types.Message):
+async def start_cmd(message: types.Message, state: FSMContext):
+    await release_phone(state, message.chat.id)
     await message.answer(
         "👋 Привіт! Це бот акції Proove Gaming Challenge! Тобі вже є 18 років?",
         reply_markup=start_kbd,
@@ -177,18 +194,19 @@ async def get_admin_panel(message:types.Message):
         await message.answer("У вас немає доступу до цієї команди")
 
 # ------------------ Кнопки возраст ------------------
-@dp.callback_query(lambda c: c.data == "start_yes")
+@on_callback("start_yes")
 async def user_info(callback: types.CallbackQuery, state: FSMContext):
+    await release_phone(state, callback.message.chat.id)
     await callback.message.answer("🔤 Напиши своє ПІБ:")
     await state.set_state(Form.pib)
 
-@dp.callback_query(lambda c: c.data == "start_no")
+@on_callback("start_no")
 async def start_age_no(callback: types.CallbackQuery):
     await callback.message.answer(
         "Це погано, потрібно щоб вам було від 18 років", reply_markup=back_kbds
     )
 
-@dp.callback_query(lambda c: c.data == "previous_start_message")
+@on_callback("previous_start_message")
 async def previous_start_message(callback: types.CallbackQuery):
     await callback.message.answer(
         "👋 Привіт! Це бот акції Proove Gaming Challenge! Тобі вже є 18 років?",
@@ -207,8 +225,6 @@ async def get_pib(message: types.Message, state: FSMContext):
     await message.answer("📞 Надішли свій номер телефону:", reply_markup=kb)
     await state.set_state(Form.phone)
 
-import csv
-
 @dp.message(Form.phone)
 async def get_phone(message: types.Message, state: FSMContext):
     if not message.contact or not message.contact.phone_number:
@@ -216,21 +232,11 @@ async def get_phone(message: types.Message, state: FSMContext):
         return
 
     phone = message.contact.phone_number
+    # номер из прежней попытки больше не держим
+    await release_phone(state, message.chat.id)
 
-    # Проверяем, есть ли уже такой номер в CSV
-    already_registered = False
-    try:
-        with open(CSV_FILE, "r", encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get("Телефон") == phone:
-                    already_registered = True
-                    break
-    except FileNotFoundError:
-        # Файл может еще не существовать, тогда регистрация возможна
-        pass
-
-    if already_registered:
+    # Проверяем по индексу и бронируем номер, пока заполняется анкета
+    if not registration_index.reserve(phone, message.chat.id):
         await message.answer("❌ Цей номер телефону вже зареєстрований. Повторна реєстрація не дозволена.")
         await state.clear()  # Завершаем состояние, чтобы пользователь мог начать заново или остановить
         return
@@ -269,26 +275,17 @@ async def get_instagram(message: types.Message, state: FSMContext):
     # Run check against our target account(s) — example "proove_gaming"
     target_instagram = "proove_gaming_ua"  # change if needed
 
-    await message.answer("⏳ Перевіряю підписку в Instagram... Будь ласка, зачекай.")
-    try:
-        ok = await asyncio.wait_for(check_instagram_follow(target_instagram, user_username), timeout=120)
-    except asyncio.TimeoutError:
-        await message.answer("❌ Перевірка зайняла забагато часу. Спробуйте пізніше.")
-        return
-    except Exception as e:
-        await message.answer(f"❌ Помилка перевірки: {e}")
-        return
-
-    if ok:
-        await message.answer("✅ Ви підписані на Instagram! Продовжуємо анкету.")
-        await message.answer("🔗 Введи посилання на свій TikTok профіль:")
-        await state.set_state(Form.tiktok)
-    else:
-        await message.answer(
-            "❌ Ми не знайшли вашу підписку на Instagram. Підпишіться на proove_gaming_ua і натисніть 'Я підписався'.",
-            reply_markup=subscribe_keyboard
-        )
-        await state.set_state(Form.check_subscription)
+    position = verification.submit(VerificationJob(
+        platform="instagram",
+        target=target_instagram,
+        username=user_username,
+        chat_id=message.chat.id,
+        user_id=message.from_user.id,
+        on_done=on_instagram_checked,
+        timeout=120,
+        payload={"expected_state": Form.instagram.state},
+    ))
+    await message.answer(f"⏳ Перевіряю підписку в Instagram... Ви #{position} у черзі, будь ласка, зачекай.")
 
 @dp.message(Form.tiktok)
 async def get_tiktok(message: types.Message, state: FSMContext):
@@ -314,29 +311,19 @@ async def get_tiktok(message: types.Message, state: FSMContext):
     await state.update_data(tiktok=text)
 
     target_tiktok = "proove_gaming_ua"
-    await message.answer("⏳ Перевіряю підписку в TikTok... Будь ласка, зачекай.")
-    try:
-        ok = await asyncio.wait_for(check_tiktok_follow(target_tiktok, user_username), timeout=380)
-    except asyncio.TimeoutError:
-        await message.answer("❌ Перевірка зайняла забагато часу. Спробуйте пізніше.", reply_markup=back_kbds)
-        return
-    except Exception as e:
-        await message.answer(f"❌ Помилка перевірки: {e}")
-        return
-
-    if ok:
-        await message.answer("✅ Ви підписані на TikTok! Продовжуємо анкету.")
-        # Вместо youtube — сразу followers
-        await message.answer("👥 Введи кількість підписників або середні перегляди:")
-        await state.set_state(Form.followers)
-    else:
-        await message.answer(
-            "❌ Ми не знайшли вашу підписку на TikTok. Підпишіться на proove_gaming_ua і натисніть 'Я підписався'.",
-            reply_markup=subscribe_keyboard
-        )
-        await state.set_state(Form.check_subscription)
-
-@dp.callback_query(lambda c: c.data == "check_subscription")
+    position = verification.submit(VerificationJob(
+        platform="tiktok",
+        target=target_tiktok,
+        username=user_username,
+        chat_id=message.chat.id,
+        user_id=message.from_user.id,
+        on_done=on_tiktok_checked,
+        timeout=380,
+        payload={"expected_state": Form.tiktok.state},
+    ))
+    await message.answer(f"⏳ Перевіряю підписку в TikTok... Ви #{position} у черзі, будь ласка, зачекай.")
+
+@on_callback("check_subscription")
 async def check_subscription_again(callback: types.CallbackQuery, state: FSMContext):
     # Отвечаем сразу, чтобы не получить ошибку из-за таймаута
     await callback.answer("Перевірка триває, зачекайте...", show_alert=False)
@@ -344,43 +331,30 @@ async def check_subscription_again(callback: types.CallbackQuery, state: FSMCont
     data = await state.get_data()
     ig_link = data.get("instagram")
     tt_link = data.get("tiktok")
+    # результат применяется, только если пользователь всё ещё на этом шаге
+    expected_state = await state.get_state()
 
     if ig_link and ig_link != "Немає":
         username = extract_username_from_link(ig_link)
         if username:
-            await callback.message.answer("⏳ Перевіряю Instagram...")
-            try:
-                ok = await asyncio.wait_for(check_instagram_follow("proove_gaming_ua", username), timeout=120)
-            except Exception as e:
-                await callback.message.answer(f"❌ Помилка при перевірці: {e}")
-                return
-            if ok:
-                await callback.message.answer("✅ Підписка на Instagram підтверджена. Продовжуємо.")
-                if not tt_link or tt_link == "Немає":
-                    await callback.message.answer("🔗 Введи посилання на свій TikTok профіль:")
-                    await state.set_state(Form.tiktok)
-                    return
-            else:
-                await callback.message.answer("❌ Все ще не бачимо підписки в Instagram. Перевірте та спробуйте ще.")
-                return
-
-    if tt_link and tt_link != "Немає":
-        username = extract_username_from_link(tt_link)
-        if username:
-            await callback.message.answer("⏳ Перевіряю TikTok...")
-            try:
-                ok = await asyncio.wait_for(check_tiktok_follow("proove_gaming_ua", username), timeout=120)
-            except Exception as e:
-                await callback.message.answer(f"❌ Помилка при перевірці: {e}")
-                return
-            if ok:
-                await callback.message.answer("✅ Підписка на TikTok підтверджена. Продовжуємо.")
-                await callback.message.answer("👥 Введи кількість підписників або середні перегляди:")
-                await state.set_state(Form.followers)
-                return
-            else:
-                await callback.message.answer("❌ Все ще не бачимо підписки в TikTok. Перевірте та спробуйте ще.")
-                return
+            position = verification.submit(VerificationJob(
+                platform="instagram",
+                target="proove_gaming_ua",
+                username=username,
+                chat_id=callback.message.chat.id,
+                user_id=callback.from_user.id,
+                on_done=on_instagram_rechecked,
+                timeout=120,
+                recheck=True,
+                payload={"tt_link": tt_link, "expected_state": expected_state},
+            ))
+            await callback.message.answer(f"⏳ Перевіряю Instagram... Ви #{position} у черзі.")
+            return
+
+    if tt_link and tt_link != "Немає" and submit_tiktok_recheck(
+            callback.message.chat.id, callback.from_user.id, tt_link, expected_state):
+        await callback.message.answer("⏳ Перевіряю TikTok...")
+        return
 
     # Если ни по Instagram, ни по TikTok подписка не найдена:
     await callback.message.answer(
@@ -388,6 +362,114 @@ async def check_subscription_again(callback: types.CallbackQuery, state: FSMCont
         reply_markup=subscribe_keyboard,
     )
 
+# ------------------ Результаты проверок из очереди ------------------
+def user_state(job: VerificationJob) -> FSMContext:
+    return dp.fsm.get_context(bot=bot, chat_id=job.chat_id, user_id=job.user_id)
+
+async def on_instagram_checked(job: VerificationJob, ok, error):
+    state = user_state(job)
+    if await state.get_state() != job.payload["expected_state"]:
+        # пользователь уже ушёл с этого шага (например, /start заново)
+        return
+
+    if isinstance(error, asyncio.TimeoutError):
+        await bot.send_message(job.chat_id, "❌ Перевірка зайняла забагато часу. Спробуйте пізніше.")
+        return
+    if error is not None:
+        await bot.send_message(job.chat_id, f"❌ Помилка перевірки: {error}")
+        return
+
+    if ok:
+        await bot.send_message(job.chat_id, "✅ Ви підписані на Instagram! Продовжуємо анкету.")
+        await bot.send_message(job.chat_id, "🔗 Введи посилання на свій TikTok профіль:")
+        await state.set_state(Form.tiktok)
+    else:
+        await bot.send_message(
+            job.chat_id,
+            "❌ Ми не знайшли вашу підписку на Instagram. Підпишіться на proove_gaming_ua і натисніть 'Я підписався'.",
+            reply_markup=subscribe_keyboard
+        )
+        await state.set_state(Form.check_subscription)
+
+async def on_tiktok_checked(job: VerificationJob, ok, error):
+    state = user_state(job)
+    if await state.get_state() != job.payload["expected_state"]:
+        return
+
+    if isinstance(error, asyncio.TimeoutError):
+        await bot.send_message(job.chat_id, "❌ Перевірка зайняла забагато часу. Спробуйте пізніше.", reply_markup=back_kbds)
+        return
+    if error is not None:
+        await bot.send_message(job.chat_id, f"❌ Помилка перевірки: {error}")
+        return
+
+    if ok:
+        await bot.send_message(job.chat_id, "✅ Ви підписані на TikTok! Продовжуємо анкету.")
+        # Вместо youtube — сразу followers
+        await bot.send_message(job.chat_id, "👥 Введи кількість підписників або середні перегляди:")
+        await state.set_state(Form.followers)
+    else:
+        await bot.send_message(
+            job.chat_id,
+            "❌ Ми не знайшли вашу підписку на TikTok. Підпишіться на proove_gaming_ua і натисніть 'Я підписався'.",
+            reply_markup=subscribe_keyboard
+        )
+        await state.set_state(Form.check_subscription)
+
+def submit_tiktok_recheck(chat_id: int, user_id: int, tt_link: str, expected_state: Optional[str]) -> bool:
+    username = extract_username_from_link(tt_link)
+    if not username:
+        return False
+    verification.submit(VerificationJob(
+        platform="tiktok",
+        target="proove_gaming_ua",
+        username=username,
+        chat_id=chat_id,
+        user_id=user_id,
+        on_done=on_tiktok_rechecked,
+        timeout=120,
+        recheck=True,
+        payload={"expected_state": expected_state},
+    ))
+    return True
+
+async def on_instagram_rechecked(job: VerificationJob, ok, error):
+    state = user_state(job)
+    if await state.get_state() != job.payload["expected_state"]:
+        return
+
+    if error is not None:
+        await bot.send_message(job.chat_id, f"❌ Помилка при перевірці: {error}")
+        return
+    if not ok:
+        await bot.send_message(job.chat_id, "❌ Все ще не бачимо підписки в Instagram. Перевірте та спробуйте ще.")
+        return
+
+    await bot.send_message(job.chat_id, "✅ Підписка на Instagram підтверджена. Продовжуємо.")
+    tt_link = job.payload.get("tt_link")
+    if not tt_link or tt_link == "Немає":
+        await bot.send_message(job.chat_id, "🔗 Введи посилання на свій TikTok профіль:")
+        await state.set_state(Form.tiktok)
+        return
+
+    if submit_tiktok_recheck(job.chat_id, job.user_id, tt_link, job.payload["expected_state"]):
+        await bot.send_message(job.chat_id, "⏳ Перевіряю TikTok...")
+
+async def on_tiktok_rechecked(job: VerificationJob, ok, error):
+    state = user_state(job)
+    if await state.get_state() != job.payload["expected_state"]:
+        return
+
+    if error is not None:
+        await bot.send_message(job.chat_id, f"❌ Помилка при перевірці: {error}")
+        return
+    if ok:
+        await bot.send_message(job.chat_id, "✅ Підписка на TikTok підтверджена. Продовжуємо.")
+        await bot.send_message(job.chat_id, "👥 Введи кількість підписників або середні перегляди:")
+        await state.set_state(Form.followers)
+    else:
+        await bot.send_message(job.chat_id, "❌ Все ще не бачимо підписки в TikTok. Перевірте та спробуйте ще.")
+
 # @dp.message(Form.youtube)
 # async def get_youtube(message: types.Message, state: FSMContext):
 #     text = message.text.strip()
@@ -414,7 +496,7 @@ async def get_followers(message: types.Message, state: FSMContext):
     await message.answer("💡 Опиши ідею для безпечного та креативного знищення старої клавіатури:")
     await state.set_state(Form.idea)
 
-@dp.callback_query(lambda c: c.data == "no_social_account")
+@on_callback("no_social_account")
 async def no_social_account(callback: types.CallbackQuery, state: FSMContext):
     current_state = await state.get_state()
     if current_state == Form.instagram.state:
@@ -436,49 +518,56 @@ async def get_idea(message: types.Message, state: FSMContext):
     date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
     chat_id = message.chat.id
 
-    row = [
-        data.get("pib", ""),
-        data.get("phone", ""),
-        data.get("instagram", ""),
-        data.get("tiktok", ""),
-        data.get("youtube", ""),
-        data.get("followers", ""),
-        data.get("idea", ""),
-        username,
-        date,
-        "Очікує",
-        chat_id,
-    ]
-
-    with open(CSV_FILE, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(row)
-
-    for admin_id in ADMIN_CHAT_IDS:
-        try:
-            await bot.send_message(
-                chat_id=admin_id,
-                text=f"📥 Нова заявка:\n\n"
-                    f"👤 ПІБ: {data.get('pib','')}\n"
-                    f"📱 Телефон: {data.get('phone','')}\n"
-                    f"📷 Instagram: {data.get('instagram','')}\n"
-                    f"🎵 TikTok: {data.get('tiktok','')}\n"
-                    f"▶️ YouTube Shorts: {data.get('youtube','')}\n"
-                    f"👥 Підписники / Перегляди: {data.get('followers','')}\n"
-                    f"💡 Ідея: {data.get('idea','')}\n"
-                    f"📅 Дата: {date}\n"
-                    f"👤 Telegram: @{username}\n"
-                    f"🧾 Статус: Очікує",
-                parse_mode=ParseMode.HTML,
-                reply_markup=admin_choices_kbd(chat_id, username)
-            )
-        except Exception as e:
-            log.error(f"Не вдалося надіслати повідомлення адміну {admin_id}: {e}")
+    if not registration_index.reserve(data.get("phone", ""), chat_id):
+        # бронь истекла, и номер успел зарегистрировать кто-то другой
+        await message.answer("❌ Цей номер телефону вже зареєстрований. Повторна реєстрація не дозволена.")
+        await state.clear()
+        return
 
+    row = {
+        "ПІБ": data.get("pib", ""),
+        "Телефон": data.get("phone", ""),
+        "Instagram": data.get("instagram", ""),
+        "TikTok": data.get("tiktok", ""),
+        "YouTube Shorts": data.get("youtube", ""),
+        "Підписники / Перегляди": data.get("followers", ""),
+        "Ідея": data.get("idea", ""),
+        "Telegram username": username,
+        "Дата": date,
+        "Статус": "Очікує",
+        "chat_id": chat_id,
+    }
+    await writer.submit("add", row)
+    registration_index.commit(row)
+
+    # админам — в фоне (по одной или сводкой), ответ пользователю не ждёт рассылку
+    admin_notifier.submit(row)
 
     await message.answer("✅ Дякуємо! Твою заявку прийнято. Ми зв’яжемося з тобою найближчим часом!")
     await state.clear()
 
+@on_callback(DigestPage)
+async def handle_digest_page(callback: types.CallbackQuery, callback_data: DigestPage):
+    rendered = admin_notifier.render(callback_data.digest_id, callback_data.page)
+    if rendered is None:
+        await callback.answer("Зведення застаріло — відкрийте адмін-панель.", show_alert=True)
+        return
+    text, markup = rendered
+    await callback.message.edit_text(text, parse_mode=ParseMode.HTML, reply_markup=markup)
+    await callback.answer()
+
+@on_callback(DigestOpen)
+async def handle_digest_open(callback: types.CallbackQuery, callback_data: DigestOpen):
+    row = await store.aio.get(callback_data.chat_id)
+    if row is None:
+        await callback.answer("Заявку не знайдено (можливо, видалена).", show_alert=True)
+        return
+    await callback.message.answer(
+        application_card(row), parse_mode=ParseMode.HTML,
+        reply_markup=admin_choices_kbd(callback_data.chat_id),
+    )
+    await callback.answer()
+
 # --------------- Admin decisions ---------------
 reject_reasons = {
     "1": "❌Ваша заявка відхилена\nСценарій не відповідає вимогам челенджу. (Ознайомтесь із правилами та спробуйте знову.)",
@@ -487,36 +576,41 @@ reject_reasons = {
     "4": "❌ Ваша заявка відхилена\nМаксимальна кількість учасників досягнута. Дякуємо, що ви є частиною Proove Gaming👾",
 }
 
-@dp.callback_query(lambda c: c.data and c.data.startswith("admin_accept_"))
-async def handle_accept(callback: types.CallbackQuery):
-    parts = callback.data.split("_", 3)
-    if len(parts) < 4:
-        await callback.answer("Невірні дані.", show_alert=True)
-        return
-    user_id_str = parts[2]
-    safe_username = parts[3]
-    try:
-        user_id = int(user_id_str)
-    except ValueError:
-        await callback.answer("Невірний chat_id.", show_alert=True)
-        return
-    username = safe_username.replace("__", "_")
+def moderator_name(user: types.User) -> str:
+    return f"tg:{user.id}" + (f" @{user.username}" if user.username else "")
 
-    update_status_in_csv(user_id, "Прийнято")
+@on_callback(AdminDecision)
+async def handle_decision(callback: types.CallbackQuery, callback_data: AdminDecision):
+    if callback_data.reason:
+        await handle_reject(callback, callback_data.chat_id, callback_data.reason)
+    else:
+        await handle_accept(callback, callback_data.chat_id)
+
+async def application_username(user_id: int) -> str:
+    """username заявителя из базы (в callback_data его больше нет)."""
+    row = await store.aio.get(user_id)
+    return row.get("Telegram username", "") if row else ""
+
+async def handle_accept(callback: types.CallbackQuery, user_id: int):
+    if not await writer.submit("update_status", user_id, "Прийнято", moderator=moderator_name(callback.from_user)):
+        await callback.answer("Заявку не знайдено (можливо, видалена).", show_alert=True)
+        return
+    username = await application_username(user_id)
 
     try:
-        await bot.send_message(user_id, (
-            "✅Ваша заявка на участь у розіграші прийнята! \n\n"
-            "Наступні кроки:\n"
-            "1. Зніміть відео та опублікуйте його у своїх соцмережах Instagram або TikTok до 30.08.\n"
-            "2. Обов’язково відмітьте акаунти Proove Gaming та додайте хештег #ProoveGamingChallenge.\n"
-            "3. Надішліть посилання на ваше відео у Telegram @pgchallenge.\n\n"
-            "Результати розіграшу та імена переможців (Топ-3) будуть оголошені 04.09 на наших офіційних сторінках:\n"
-            "Instagram\n"
-            "TikTok\n\n"
-            "Бажаємо успіху!\n"
-            "https://www.tiktok.com/@proove_gaming_ua?_t=ZM-8yohKjOALuI"
-        ))
+        with use_lane(Lane.NOTICE):
+            await bot.send_message(user_id, (
+                "✅Ваша заявка на участь у розіграші прийнята! \n\n"
+                "Наступні кроки:\n"
+                "1. Зніміть відео та опублікуйте його у своїх соцмережах Instagram або TikTok до 30.08.\n"
+                "2. Обов’язково відмітьте акаунти Proove Gaming та додайте хештег #ProoveGamingChallenge.\n"
+                "3. Надішліть посилання на ваше відео у Telegram @pgchallenge.\n\n"
+                "Результати розіграшу та імена переможців (Топ-3) будуть оголошені 04.09 на наших офіційних сторінках:\n"
+                "Instagram\n"
+                "TikTok\n\n"
+                "Бажаємо успіху!\n"
+                "https://www.tiktok.com/@proove_gaming_ua?_t=ZM-8yohKjOALuI"
+            ))
         await callback.message.edit_text(f"Рішення 'прийнято' застосовано для користувача @{username} ({user_id}).")
     except Exception as e:
         await callback.message.edit_text(f"❌ Не вдалося надіслати повідомлення користувачу: {e}")
@@ -524,29 +618,18 @@ async def handle_accept(callback: types.CallbackQuery):
     await callback.answer("Заявка прийнята!")
 
 
-@dp.callback_query(lambda c: c.data and c.data.startswith("admin_reject_"))
-async def handle_reject(callback: types.CallbackQuery):
-    parts = callback.data.split("_", 4)
-    if len(parts) < 5:
-        await callback.answer("Невірні дані.", show_alert=True)
-        return
-    reason_key = parts[2]  # reject reason number: "1", "2", ...
-    user_id_str = parts[3]
-    safe_username = parts[4]
-
-    try:
-        user_id = int(user_id_str)
-    except ValueError:
-        await callback.answer("Невірний chat_id.", show_alert=True)
+async def handle_reject(callback: types.CallbackQuery, user_id: int, reason_key: str):
+    if not await writer.submit("update_status", user_id, f"Відхилено ({reason_key})", reason_key=reason_key,
+                               moderator=moderator_name(callback.from_user)):
+        await callback.answer("Заявку не знайдено (можливо, видалена).", show_alert=True)
         return
-
-    username = safe_username.replace("__", "_")
-    update_status_in_csv(user_id, f"Відхилено ({reason_key})")
+    username = await application_username(user_id)
 
     reason_text = reject_reasons.get(reason_key, "❌ Ваша заявка відхилена.")
 
     try:
-        await bot.send_message(user_id, reason_text)
+        with use_lane(Lane.NOTICE):
+            await bot.send_message(user_id, reason_text)
         await callback.message.edit_text(f"Рішення 'відхилено' (причина {reason_key}) застосовано для користувача @{username} ({user_id}).")
     except Exception as e:
         await callback.message.edit_text(f"❌ Не вдалося надіслати повідомлення користувачу: {e}")
@@ -559,10 +642,10 @@ class AdminFSM(StatesGroup):
     waiting_chat_id = State()
 
 # Обработчик кнопки "Добавить нового админа"
-@dp.callback_query(lambda c: c.data == "add_new_admin")
+@on_callback("add_new_admin")
 async def add_new_admin_callback(callback: types.CallbackQuery, state: FSMContext):
-    # Проверяем, что это админ
-    admins = load_admins()
+    # Проверяем, что это админ (файл читаем не в потоке loop)
+    admins = await asyncio.to_thread(load_admins)
     if callback.from_user.id not in admins:
         await callback.answer("❌ У вас нет прав администратора", show_alert=True)
         return
@@ -579,7 +662,7 @@ async def receive_new_admin(message: types.Message, state: FSMContext):
         await message.answer("❌ Некорректный chat_id. Введите число.")
         return
 
-    admins = add_admin(new_admin_id)
+    admins = await asyncio.to_thread(add_admin, new_admin_id)
     await message.answer(f"✅ Пользователь {new_admin_id} добавлен в админы!\nТекущие админы: {admins}")
     await state.clear()
 
@@ -587,8 +670,15 @@ async def receive_new_admin(message: types.Message, state: FSMContext):
 
 # ------------------ Запуск ------------------
 async def run_bot():
-    
-    await bot.delete_webhook(drop_pending_updates=True)
+    # опечатка в режиме не должна тихо превращаться в polling
+    if BOT_MODE not in BOT_MODES:
+        log.error(f"Неизвестный BOT_MODE {BOT_MODE!r}, допустимо: {', '.join(BOT_MODES)}")
+        raise ValueError(f"Unknown BOT_MODE {BOT_MODE!r}")
+    if BOT_MODE == "webhook":
+        webhook_server.validate()
+    else:
+        # снимаем webhook, если бот раньше работал в этом режиме
+        await bot.delete_webhook(drop_pending_updates=True)
     await set_commands()
 
     try:
@@ -598,7 +688,22 @@ async def run_bot():
         log.error(f"Ошибка подключения бота: {e}")
         raise
 
-    await dp.start_polling(bot)
+    loop_monitor.start()
+
+    # прогреваем браузеры для проверок подписок заранее
+    get_pool().warm_up()
+    verification.start_workers()
+    writer.start()
+    if follower_index.CRAWL_ENABLED:
+        follower_index.start_crawler()
+
+    if BOT_MODE == "webhook":
+        await webhook_server.start()
+        # апдейты принимает webhook_server; задача живёт до отмены из main.shutdown()
+        await asyncio.Event().wait()
+    else:
+        # сигналы обрабатывает main.py, иначе после Ctrl-C остановится только polling
+        await dp.start_polling(bot, handle_signals=False)
 
 # if __name__ == "__main__":
 #     try:
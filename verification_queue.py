@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import config
+from check_subscriptions import check_instagram_follow, check_tiktok_follow
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("verification_queue")
+
+# Количество одновременных проверок на платформу (можно переопределить в config.py)
+INSTAGRAM_WORKERS = getattr(config, "VERIFY_WORKERS_INSTAGRAM", 2)
+TIKTOK_WORKERS = getattr(config, "VERIFY_WORKERS_TIKTOK", 1)
+
+
+@dataclass
+class VerificationJob:
+    platform: str
+    target: str
+    username: str
+    chat_id: int
+    user_id: int
+    # on_done(job, ok, error) — вызывается воркером, когда проверка завершена
+    on_done: Callable[["VerificationJob", Optional[bool], Optional[BaseException]], Awaitable[None]]
+    timeout: float = 120
+    # повторная проверка по кнопке «Я підписався»: отрицательный ответ из кеша не используется
+    recheck: bool = False
+    payload: dict = field(default_factory=dict)
+
+
+def _same_check(a: VerificationJob, b: VerificationJob) -> bool:
+    return (a.target, a.username, a.recheck) == (b.target, b.username, b.recheck)
+
+
+class VerificationQueue:
+    """Очередь проверок подписки одной платформы с фиксированным числом воркеров."""
+
+    def __init__(self, platform: str, check: Callable[..., Awaitable[bool]], workers: int):
+        self.platform = platform
+        self.check = check
+        self.workers = max(1, int(workers))
+        # в очереди — user_id; сама заявка берётся из _waiting в момент запуска
+        self._queue: Optional[asyncio.Queue] = None
+        self._waiting: "OrderedDict[int, VerificationJob]" = OrderedDict()
+        # user_id -> выполняемая проверка и повторные заявки, которые ждут её результата
+        self._running: Dict[int, List[VerificationJob]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        for user_id in self._waiting:
+            self._queue.put_nowait(user_id)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        log.info(f"Очередь {self.platform}: запущено {self.workers} воркер(ов)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def position(self, user_id: int) -> Optional[int]:
+        """Место пользователя в очереди (1 — следующий), None если его там нет."""
+        for i, key in enumerate(self._waiting, start=1):
+            if key == user_id:
+                return i
+        return None
+
+    def __len__(self):
+        return len(self._waiting)
+
+    def submit(self, job: VerificationJob) -> int:
+        """
+        Поставить проверку в очередь. Повторная заявка того же пользователя не дублируется:
+        пока ждёт — заменяет прежнюю на её месте (пользователь мог указать другой аккаунт),
+        пока выполняется та же проверка — получит её результат.
+        """
+        if job.user_id in self._waiting:
+            # в asyncio.Queue лежит user_id, так что воркер возьмёт уже новую заявку
+            self._waiting[job.user_id] = job
+            return self.position(job.user_id)
+        running = self._running.get(job.user_id)
+        if running and _same_check(running[0], job):
+            running.append(job)
+            return 1
+        self._waiting[job.user_id] = job
+        if self._queue is not None:
+            self._queue.put_nowait(job.user_id)
+        return len(self._waiting)
+
+    async def _worker(self, index: int):
+        while True:
+            user_id = await self._queue.get()
+            job = self._waiting.pop(user_id, None)
+            if job is None:
+                self._queue.task_done()
+                continue
+            jobs = self._running[job.user_id] = [job]
+            ok, error = None, None
+            try:
+                ok = await asyncio.wait_for(self.check(job.target, job.username, recheck=job.recheck), timeout=job.timeout)
+            except Exception as e:
+                error = e
+                log.warning(f"Проверка {self.platform} @{job.username} завершилась ошибкой: {e!r}")
+            finally:
+                if self._running.get(job.user_id) is jobs:
+                    del self._running[job.user_id]
+            try:
+                for done in jobs:
+                    try:
+                        await done.on_done(done, ok, error)
+                    except Exception as e:
+                        log.exception(f"Ошибка доставки результата проверки {self.platform} для {done.chat_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+queues: Dict[str, VerificationQueue] = {
+    "instagram": VerificationQueue("instagram", check_instagram_follow, INSTAGRAM_WORKERS),
+    "tiktok": VerificationQueue("tiktok", check_tiktok_follow, TIKTOK_WORKERS),
+}
+
+
+def submit(job: VerificationJob) -> int:
+    return queues[job.platform].submit(job)
+
+
+def start_workers():
+    for queue in queues.values():
+        queue.start()
+
+
+async def stop_workers():
+    for queue in queues.values():
+        await queue.stop()
@@ -0,0 +1,123 @@
+import asyncio
+import hmac
+import logging
+import secrets
+from collections import Counter
+from typing import Optional, Set
+from urllib.parse import urlsplit
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+
+import config
+
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("webhook")
+
+# Настройки (можно переопределить в config.py)
+# WEBHOOK_URL — публичный адрес, по которому Telegram достучится до WEBHOOK_HOST:WEBHOOK_PORT
+WEBHOOK_URL = getattr(config, "WEBHOOK_URL", "")
+WEBHOOK_PATH = getattr(config, "WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_HOST = getattr(config, "WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = getattr(config, "WEBHOOK_PORT", 8443)
+# без заданного секрета генерируется новый при каждом запуске (set_webhook всё равно вызывается)
+WEBHOOK_SECRET = getattr(config, "WEBHOOK_SECRET", None) or secrets.token_urlsafe(32)
+WEBHOOK_MAX_CONCURRENCY = getattr(config, "WEBHOOK_MAX_CONCURRENCY", 20)
+# True — при запуске выбросить апдейты, накопленные в Telegram, пока бот был выключен
+WEBHOOK_DROP_PENDING_UPDATES = getattr(config, "WEBHOOK_DROP_PENDING_UPDATES", False)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """
+    Приём апдейтов через webhook. Telegram получает 200 сразу, апдейт обрабатывается в фоне;
+    одновременно обрабатывается не больше max_concurrency апдейтов — при заполнении
+    запрос держится до освобождения места, и Telegram сам придерживает следующие.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, url: str = WEBHOOK_URL, path: str = WEBHOOK_PATH,
+                 secret: str = WEBHOOK_SECRET, max_concurrency: int = WEBHOOK_MAX_CONCURRENCY,
+                 drop_pending_updates: bool = WEBHOOK_DROP_PENDING_UPDATES):
+        self.dp = dp
+        self.bot = bot
+        self.url = url.rstrip("/") + path
+        self.path = path
+        self.secret = secret
+        self.max_concurrency = max_concurrency
+        self.drop_pending_updates = drop_pending_updates
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._runner: Optional[web.AppRunner] = None
+        self.counters: Counter = Counter()
+
+    def validate(self):
+        """Адрес для set_webhook должен быть абсолютным: без WEBHOOK_URL получится один путь."""
+        parts = urlsplit(self.url)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            log.error(f"WEBHOOK_URL не задан или не абсолютный: {self.url!r}")
+            raise ValueError(f"Webhook URL must be absolute http(s), got {self.url!r}")
+
+    async def start(self, host: str = WEBHOOK_HOST, port: int = WEBHOOK_PORT):
+        self.validate()
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        await self.bot.set_webhook(
+            self.url, secret_token=self.secret, max_connections=self.max_concurrency,
+            allowed_updates=self.dp.resolve_used_update_types(),
+            drop_pending_updates=self.drop_pending_updates,
+        )
+        log.info(f"Webhook {self.url} слушает {host}:{port}")
+
+    async def stop(self):
+        """Перестать принимать апдейты и дождаться уже принятых. Webhook в Telegram остаётся:
+        новые апдейты копятся у Telegram до следующего запуска (если не задан
+        WEBHOOK_DROP_PENDING_UPDATES); переход на polling снимает webhook сам."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret):
+            self.counters["rejected"] += 1
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except ValueError as e:
+            self.counters["invalid"] += 1
+            log.warning(f"Некорректный апдейт: {e}")
+            return web.Response(status=400)
+
+        await self._slots.acquire()
+        self.counters["received"] += 1
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: Update):
+        try:
+            result = await self.dp.feed_update(self.bot, update)
+            # как при polling: хэндлер может вернуть метод API вместо явного вызова
+            if isinstance(result, TelegramMethod):
+                await self.bot(result)
+        except Exception as e:
+            self.counters["errors"] += 1
+            log.exception(f"Ошибка обработки апдейта {update.update_id}: {e}")
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "in_flight": len(self._tasks),
+            "max_concurrency": self.max_concurrency,
+        }